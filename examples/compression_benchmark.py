@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+
+"""
+This example program compares the file size and the read and write times of
+uncompressed and gzip compressed .res files. It generates synthetic Gaussian
+responses that resemble a CCD, a grating and a microcalorimeter response and
+writes each of them with different compression levels. The results can be used
+to choose between disk footprint and load latency for a dataset.
+
+Usage: python compression_benchmark.py [output directory]
+"""
+
+import os
+import sys
+import time
+import tempfile
+import numpy as np
+from pyspextools.io import Res
+
+# Typical response sizes: (name, energy range in keV, number of channels, FWHM in eV, width of a group in FWHM)
+responses = [('CCD', (0.1, 12.0), 1024, 120.0, 6.0),
+             ('Grating', (0.3, 2.5), 8192, 1.5, 10.0),
+             ('Microcalorimeter', (0.3, 12.0), 23400, 5.0, 10.0)]
+
+# Compression settings to compare (False is uncompressed, numbers are gzip levels)
+levels = [False, 1, 6, 9]
+
+
+def gaussian_response(erange, nchan, fwhm, width):
+    """Create a single component response with a Gaussian redistribution function on an
+    energy grid equal to the channel grid. The FWHM scales with the square root of the energy,
+    such that the response values differ from group to group like in real responses."""
+
+    res = Res()
+
+    edges = np.linspace(erange[0], erange[1], nchan + 1)
+    step = edges[1] - edges[0]
+    sigma = fwhm * 1E-3 / (2.0 * np.sqrt(2.0 * np.log(2.0)))
+
+    # Number of channels per group and first channel of each group
+    nc = max(1, int(np.ceil(width * fwhm * 1E-3 / step)))
+    center = np.arange(nchan)
+    ic1 = np.clip(center - nc // 2, 0, nchan - nc) + 1
+
+    res.nchan = np.array([nchan])
+    res.neg = np.array([nchan])
+    res.sector = np.array([1])
+    res.region = np.array([1])
+    res.ncomp = 1
+    res.nsector = 1
+    res.nregion = 1
+
+    res.eg1 = edges[:-1]
+    res.eg2 = edges[1:]
+    res.ic1 = ic1
+    res.nc = np.full(nchan, nc, dtype=int)
+    res.ic2 = res.ic1 + res.nc - 1
+
+    # Response values of all groups at once
+    energy = (edges[:-1] + edges[1:]) / 2.0
+    sigma = (sigma * np.sqrt(energy))[:, np.newaxis]
+    chan = (ic1[:, np.newaxis] - 1 + np.arange(nc)[np.newaxis, :])
+    offset = (chan - center[:, np.newaxis]) * step
+    res.resp = (np.exp(-offset ** 2 / (2.0 * sigma ** 2)) * step / (sigma * np.sqrt(2.0 * np.pi))).ravel()
+
+    res.empty = False
+
+    return res
+
+
+def main():
+    if len(sys.argv) > 1:
+        outdir = sys.argv[1]
+    else:
+        outdir = tempfile.mkdtemp()
+
+    print("{0:<18} {1:>6} {2:>12} {3:>10} {4:>10} {5:>10}".format('Response', 'Level', 'Elements', 'Size (MB)',
+                                                                   'Write (s)', 'Read (s)'))
+
+    for (name, erange, nchan, fwhm, width) in responses:
+        res = gaussian_response(erange, nchan, fwhm, width)
+
+        for level in levels:
+            resfile = os.path.join(outdir, '{0}_{1}.res'.format(name, level if level else 0))
+
+            t0 = time.perf_counter()
+            res.write_file(resfile, overwrite=True, compress=level)
+            t1 = time.perf_counter()
+
+            # Read the file and make sure all the columns are in memory
+            tres = Res()
+            tres.read_file(resfile)
+            np.sum(tres.resp)
+            t2 = time.perf_counter()
+
+            size = os.path.getsize(resfile) / 1024. ** 2
+            print("{0:<18} {1:>6} {2:>12} {3:>10.2f} {4:>10.2f} {5:>10.2f}".format(name, level if level else '-',
+                                                                                   res.resp.size, size, t1 - t0,
+                                                                                   t2 - t1))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,5 @@
 #!/usr/bin/env python
 
-from .badchannels import *
\ No newline at end of file
+from .badchannels import *
+from .components import *
+from .stack import *
@@ -1,16 +1,23 @@
 #!/usr/bin/env python
 
+import os
+
 from pyspextools.io.region import Region
+from pyspextools.io.dataset import Dataset
 import pyspextools.messages as message
+import pyspextools.parallel as parallel
 
 import numpy as np
 
 
-def clean_region(reg):
-    """Remove bad channels and channels with zero response from the region.
+def clean_region(reg, verbose=True):
+    """Remove bad channels and channels with zero response from the region. For responses with multiple
+    components, a channel is only removed if it has zero response in all components.
 
     :param reg: Input Region object.
     :type reg: pyspextools.io.Region
+    :param verbose: Print the progress and the number of removed channels, groups and elements.
+    :type verbose: bool
     """
 
     if not isinstance(reg, Region):
@@ -25,35 +32,38 @@ def clean_region(reg):
         message.error("The input spo object is empty.")
         return -1
 
-    message.proc_start("Identify bad channels in spectrum and response matrix and re-index matrix")
+    if verbose:
+        message.proc_start("Identify bad channels in spectrum and response matrix and re-index matrix")
 
-    (chanmask, groupmask, respmask) = __get_bad_channel_masks(reg)
+    masks = __get_bad_channel_masks(reg)
 
-    if not isinstance(chanmask, np.ndarray):
+    if not isinstance(masks, tuple):
+        if verbose:
+            message.proc_end(1)
         return -1
 
-    message.proc_end(0)
+    (chanmask, groupmask, respmask) = masks
 
     # Print number of good and bad channels
     goodchan = np.sum(chanmask)
     badchan = chanmask.size - goodchan
 
-    print("Number of good channels: {0}".format(goodchan))
-    print("Number of bad channels:  {0}".format(badchan))
+    if verbose:
+        message.proc_end(0)
+        print("Number of good channels: {0}".format(goodchan))
+        print("Number of bad channels:  {0}".format(badchan))
 
     if goodchan == 0:
         message.error("All channels appear to be bad. Please check your input files.")
         return -1
 
-    message.proc_start("Removing bad channels from spectral region")
+    if verbose:
+        message.proc_start("Removing bad channels from spectral region")
 
     # Fix binning issues first. Make sure bin ends before bad channel and starts after bad channel.
-    for i in np.arange(reg.spo.nchan):
-        if not chanmask[i]:
-            if i != 0:
-                reg.spo.last[i-1] = True
-            if i != reg.spo.nchan - 1:
-                reg.spo.first[i+1] = True
+    badmask = np.logical_not(chanmask)
+    reg.spo.last[:-1][badmask[1:]] = True
+    reg.spo.first[1:][badmask[:-1]] = True
 
     spo = reg.spo
 
@@ -72,31 +82,32 @@ def clean_region(reg):
     spo.last = reg.spo.last[chanmask]
 
     # Count the number of good channels
-    for i in np.arange(spo.nregion):
-        spo.nchan[i] = np.sum(chanmask)
+    spo.nchan[:] = np.sum(chanmask)
 
     # Check the consistency of the new object
     stat = spo.check()
 
     # Show result to user
-    message.proc_end(stat)
+    if verbose:
+        message.proc_end(stat)
 
     # Copy the filtered object to the original region
     reg.spo = spo
 
-    # Print number of good and bad groups
-    badgroup = groupmask.size - np.sum(groupmask)
+    if verbose:
+        # Print number of good and bad groups
+        badgroup = groupmask.size - np.sum(groupmask)
 
-    print("Number of original groups:       {0}".format(groupmask.size))
-    print("Number of zero-response groups:  {0}".format(badgroup))
+        print("Number of original groups:       {0}".format(groupmask.size))
+        print("Number of zero-response groups:  {0}".format(badgroup))
 
-    # Print number of removed response elements
-    badelements = respmask.size - np.sum(respmask)
+        # Print number of removed response elements
+        badelements = respmask.size - np.sum(respmask)
 
-    print("Number of original response elements:  {0}".format(respmask.size))
-    print("Number of bad response elements:       {0}".format(badelements))
+        print("Number of original response elements:  {0}".format(respmask.size))
+        print("Number of bad response elements:       {0}".format(badelements))
 
-    message.proc_start("Removing bad channels from response matrix")
+        message.proc_start("Removing bad channels from response matrix")
 
     # Mask response array
     reg.res.resp = reg.res.resp[respmask]
@@ -112,21 +123,80 @@ def clean_region(reg):
     if reg.res.area_scal:
         reg.res.relarea = reg.res.relarea[groupmask]
 
-    eg_start = 0
-
-    for icomp in np.arange(reg.res.ncomp):
-        reg.res.nchan[icomp] = np.sum(chanmask)
-        eg_end = reg.res.neg[icomp] + eg_start
-        reg.res.neg[icomp] = np.sum(groupmask[eg_start:eg_end])
-        eg_start = eg_end + 1
+    # Count the remaining groups of each component
+    compindex = np.repeat(np.arange(reg.res.neg.size), reg.res.neg)
+    reg.res.neg = np.bincount(compindex[groupmask], minlength=reg.res.neg.size)
+    reg.res.nchan[:] = np.sum(chanmask)
 
     stat = reg.res.check()
 
-    message.proc_end(stat)
+    if verbose:
+        message.proc_end(stat)
 
     return reg
 
 
+def clean_dataset(dataset, workers=None, processes=False):
+    """Remove bad channels and channels with zero response from all the regions in a dataset. The
+    regions are independent, so they are cleaned in parallel on a thread pool, or on a process pool
+    if processes is True. The cleaned regions replace the original regions in the dataset.
+
+    :param dataset: Input Dataset object.
+    :type dataset: pyspextools.io.Dataset
+    :param workers: Maximum number of parallel workers (default: determined by the executor).
+    :type workers: int
+    :param processes: Use a process pool instead of a thread pool?
+    :type processes: bool
+    """
+
+    if not isinstance(dataset, Dataset):
+        message.error("The input object is not of type Dataset.")
+        return -1
+
+    if len(dataset.regions) == 0:
+        message.error("The input dataset does not contain any regions.")
+        return -1
+
+    # Regions are copied to the worker processes, so lazily read files must be loaded first
+    if processes:
+        for reg in dataset.regions:
+            reg.spo.load()
+            reg.res.load()
+
+    if workers is None:
+        workers = min(len(dataset.regions), os.cpu_count() or 1)
+
+    message.proc_start("Removing bad channels from {0} regions".format(len(dataset.regions)))
+
+    tasks = [(clean_region, (reg,), {'verbose': False}) for reg in dataset.regions]
+    results = parallel.run_tasks(tasks, workers=workers, processes=processes)
+
+    # Reassemble the dataset from the cleaned regions
+    failed = []
+    for i, result in enumerate(results):
+        if isinstance(result, Region):
+            dataset.regions[i] = result
+        else:
+            failed.append(i)
+
+    message.proc_end(len(failed))
+
+    for i in failed:
+        if isinstance(results[i], Exception):
+            message.error("Cleaning region {0} failed ({1}: {2})".format(i + 1, type(results[i]).__name__,
+                                                                         results[i]))
+        else:
+            message.error("Cleaning region {0} failed.".format(i + 1))
+
+    if len(failed) != 0:
+        return -1
+
+    for i, reg in enumerate(dataset.regions):
+        print("Region {0}: {1} good channels".format(i + 1, reg.spo.nchan[0]))
+
+    return dataset
+
+
 def __get_bad_channel_masks(reg):
     """Identify channels with zero response.
 
@@ -141,7 +211,7 @@ def __get_bad_channel_masks(reg):
         message.error("Mismatch in number of channels in spo object.")
         return -1
 
-    if chanmask.size != reg.res.nchan[0]:
+    if np.any(reg.res.nchan != chanmask.size):
         message.error("Mismatch in number of channels between res and spo object.")
         return -1
 
@@ -159,59 +229,48 @@ def __get_bad_channel_masks(reg):
         message.error("Mismatch between the number of response elements in the GROUP and RESP extensions.")
         return -1
 
-    ir = 0
+    if np.any(reg.res.ic2 - reg.res.ic1 + 1 != reg.res.nc):
+        message.error("Error: Mismatch in number of channels.")
 
-    # Loop over groups to find zero response elements and finalize channel mask
-    for ie in np.arange(reg.res.eg1.size):
-        ic1 = reg.res.ic1[ie]  # Original first channel of group
-        ic2 = reg.res.ic2[ie]  # Original last channel of group
-        # Masking entire group if response is zero
-        #grsum = np.sum(reg.res.resp[ir:ir+reg.res.nc[ie]+1])
-        #if grsum <= 0.0:
-        #    groupmask[ie] = False
+    used = reg.res.nc > 0
+    if np.any(reg.res.ic1[used] < 1) or np.any(reg.res.ic1[used] + reg.res.nc[used] - 1 > chanmask.size):
+        message.error("Response elements refer to channels outside the channel range.")
+        return -1
 
-        for j in np.arange(reg.res.nc[ie]):
-            ic = ic1 + j - 1  # -1 because Python array starts at 0, not 1
-            if ic > ic2 - 1:
-                message.error("Error: Mismatch in number of channels.")
-            if reg.res.resp[ir] <= 0.0:
-                chanmask[ic] = False or chanmask[ic]
-            else:
-                chanmask[ic] = True
+    # The channel-major index lists the response elements of every channel. Because all components have the
+    # same number of channels, the channel of an element in the index is its position modulo the channel count.
+    index = reg.res.channel_index()
+    idxchan = np.repeat(np.arange(index.indptr.size - 1), np.diff(index.indptr)) % chanmask.size
 
-            ir = ir + 1
+    # A channel is good if at least one response element in the channel (in any component) is positive
+    positive = reg.res.resp[index.element] > 0.0
+    chanmask = np.bincount(idxchan[positive], minlength=chanmask.size) > 0
 
     chanmask = np.logical_and(chanmask, reg.spo.used)
 
-    # Loop over groups to set the new channel boundaries and fill respmask
-    newie = 0  # Index of energy bins
-    ir = 0  # Index of response elements in original array (at maximum reg.res.resp.size)
-
-    for ie in np.arange(reg.res.eg1.size):
+    # Channel (zero-based) of every response element in the original order
+    elchan = np.empty(respmask.size, dtype=np.int64)
+    elchan[index.element] = idxchan
+    elgroup = np.repeat(np.arange(reg.res.nc.size), reg.res.nc)
 
-        ic1 = reg.res.ic1[ie]  # Original first channel of group
-        first = True  # Is this the first channel of the group?
-        newnc = 0
+    # Response elements in good channels are kept
+    respmask = chanmask[elchan]
 
-        for j in np.arange(reg.res.nc[ie]):
-            ic = ic1 + j - 1
-            if chanmask[ic] and groupmask[ie]:  # If channel is good and group is good
-                newnc = newnc + 1  # Count number of good channels in group
-                if first:  # If this is the first good bin of the group, set ic1
-                    first = False
-                    reg.res.ic1[ie] = np.sum(chanmask[0:ic]) + 1
-            else:
-                respmask[ir] = False
+    # Number of good channels before each channel, used to re-index the first channel of each group
+    goodbefore = np.cumsum(chanmask) - chanmask
 
-            ir = ir + 1
+    newnc = np.bincount(elgroup[respmask], minlength=groupmask.size)
 
-        # Set new ic1, ic2 and nc
-        reg.res.ic2[ie] = reg.res.ic1[ie] + newnc - 1
-        reg.res.nc[ie] = reg.res.ic2[ie] - reg.res.ic1[ie] + 1
+    # Set new ic1, ic2 and nc. The first good channel of a group is the first good channel at or after ic1.
+    # Groups without good channels keep their original ic1.
+    # The ic1 array is replaced rather than changed in place, such that the cached channel index is rebuilt.
+    hasgood = newnc > 0
+    ic1 = np.array(reg.res.ic1)
+    ic1[hasgood] = goodbefore[ic1[hasgood] - 1] + 1
+    reg.res.ic1 = ic1
+    reg.res.ic2 = reg.res.ic1 + newnc - 1
+    reg.res.nc = reg.res.ic2 - reg.res.ic1 + 1
 
-        if newnc == 0:
-            groupmask[ie] = False
-        else:
-            newie = newie + 1
+    groupmask = hasgood
 
     return chanmask, groupmask, respmask
@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+
+from pyspextools.io.region import Region
+from pyspextools.io.res import Res
+import pyspextools.messages as message
+
+import numpy as np
+
+
+def component_contributions(res, index=2.0):
+    """Return the fractional contribution of every response component to the total count rate of its region.
+    A reference power-law photon spectrum (N(E) ~ E^-index) is folded through each component and the
+    number of counts of each component is divided by the total number of counts of all the components in the
+    same sector and region. An index of 0 corresponds to a flat photon spectrum.
+
+    :param res: Input response object.
+    :type res: pyspextools.io.Res
+    :param index: Photon index of the reference power-law spectrum.
+    :type index: float
+    """
+
+    if not isinstance(res, Res):
+        message.error("The input object is not of type Res.")
+        return -1
+
+    eg1 = np.array(res.eg1, dtype=float)
+    eg2 = np.array(res.eg2, dtype=float)
+
+    # Number of photons of the reference spectrum in each group (analytic integral over the group)
+    if index == 1.0:
+        flux = np.log(eg2 / np.where(eg1 > 0., eg1, eg2))
+    else:
+        flux = (eg2 ** (1. - index) - np.where(eg1 > 0., eg1, eg2) ** (1. - index)) / (1. - index)
+
+    # Groups starting at zero energy: use the value at the group centre instead of the integral
+    zero = eg1 <= 0.
+    if np.any(zero):
+        flux[zero] = (0.5 * eg2[zero]) ** (-index) * eg2[zero]
+
+    # Sum the response of each group and fold the reference spectrum through it
+    elgroup = np.repeat(np.arange(res.nc.size), res.nc)
+    grouprsp = np.bincount(elgroup, weights=res.resp, minlength=res.nc.size)
+    if res.area_scal:
+        grouprsp = grouprsp * res.relarea
+
+    compindex = np.repeat(np.arange(res.neg.size), res.neg)
+    counts = np.bincount(compindex, weights=flux * grouprsp, minlength=res.neg.size)
+
+    # Normalize the counts to the total of each sector and region
+    keys = np.array(res.sector, dtype=int) * (int(np.amax(res.region)) + 1) + np.array(res.region, dtype=int)
+    (_, inverse) = np.unique(keys, return_inverse=True)
+    total = np.bincount(inverse, weights=counts)[inverse]
+
+    fraction = np.zeros(res.neg.size)
+    fraction[total > 0.] = counts[total > 0.] / total[total > 0.]
+
+    return fraction
+
+
+def prune_components(reg, threshold=1.e-3, index=2.0, labels=None, verbose=True):
+    """Remove response components that contribute less than a threshold fraction of the counts in their region.
+    The contributions are calculated by folding a reference power-law spectrum through each component (see
+    component_contributions). For grating spectra, where every order is a component, this removes the weak
+    higher orders, which saves calculation time in the fit. The contribution of every component is reported.
+    The strongest component of each region is always kept.
+
+    :param reg: Input Region object.
+    :type reg: pyspextools.io.Region
+    :param threshold: Minimum fractional contribution of a component to keep it.
+    :type threshold: float
+    :param index: Photon index of the reference power-law spectrum.
+    :type index: float
+    :param labels: Label of each component in the report (for example the grating order).
+    :type labels: list
+    :param verbose: Print the contribution of every component.
+    :type verbose: bool
+    """
+
+    if not isinstance(reg, Region):
+        message.error("The input object is not of type Region.")
+        return -1
+
+    if reg.res.empty:
+        message.error("The input res object is empty.")
+        return -1
+
+    if labels is not None and len(labels) != reg.res.neg.size:
+        message.error("The number of labels does not match the number of components.")
+        return -1
+
+    fraction = component_contributions(reg.res, index=index)
+    if not isinstance(fraction, np.ndarray):
+        return -1
+
+    remove = fraction < threshold
+
+    # Never remove the strongest component of a region
+    keys = np.array(reg.res.sector, dtype=int) * (int(np.amax(reg.res.region)) + 1) + np.array(reg.res.region)
+    for key in np.unique(keys):
+        select = np.where(keys == key)[0]
+        remove[select[np.argmax(fraction[select])]] = False
+
+    if verbose:
+        print("Contribution of the response components (photon index {0}):".format(index))
+        for i in range(fraction.size):
+            label = labels[i] if labels is not None else i + 1
+            status = "removed" if remove[i] else "kept"
+            print("  Component {0:>4}: {1:10.3e}  {2}".format(label, fraction[i], status))
+        print("Number of removed components: {0}".format(np.sum(remove)))
+
+    if not np.any(remove):
+        return reg
+
+    stat = reg.del_components(np.where(remove)[0] + 1)
+    if stat != 0:
+        return -1
+
+    return reg
@@ -1,6 +1,7 @@
 #!/usr/bin/env python
 
 import math
+import numpy as np
 import pyspextools.messages as message
 
 
@@ -19,20 +20,42 @@ def gaussrsp(x, mu, fwhm, dfwhm):
     :type dfwhm: float
     """
 
+    resp = gaussrsp_array(x, mu, fwhm, dfwhm)
+    if not isinstance(resp, np.ndarray):
+        return -1
+
+    return float(resp)
+
+
+def gaussrsp_array(x, mu, fwhm, dfwhm):
+    """Vectorized version of gaussrsp. The energy values (x) and centers of the Gauss function (mu) can be
+    arrays of any shape that can be broadcast against each other, for example a 2-D array of channel energies
+    with one row per energy bin and a column of the bin centers. Returns an array with the response values.
+
+    :param x: X values to calculate the response for.
+    :type x: numpy.ndarray
+    :param mu: Centers of the Gauss function.
+    :type mu: numpy.ndarray
+    :param fwhm: The full-width at half maximum of the detector resolution (FWHM in eV at 1 keV).
+    :type fwhm: float
+    :param dfwhm: Gradient of the detector resolution as a function of energy.
+    :type dfwhm: float
+    """
+
+    x = np.asarray(x, dtype=float)
+    mu = np.asarray(mu, dtype=float)
+
     # FWHM at the center energy of the response
     fwhm_mu = fwhm + dfwhm * (mu - 1.0)
-    if fwhm_mu <= 0.:
+    if np.any(fwhm_mu <= 0.):
         message.error('The FWHM has become (less than) 0 in the provided energy range. '
                       'Please check your input gradient.')
         return -1
 
-    # Convert the FWHM to sigma
-    sigma = fwhm_mu / (2.0 * math.sqrt(2.0*math.log(2.0)))
-
-    # Convert sigma to keV
-    sigma = sigma * 1E-3
+    # Convert the FWHM to sigma in keV
+    sigma = fwhm_mu / (2.0 * math.sqrt(2.0*math.log(2.0))) * 1E-3
 
-    # Calculate the response value for this response element x
-    resp = 1./(sigma * math.sqrt(2.*math.pi)) * math.exp(-(x-mu)**2/(2. * sigma**2))
+    # Calculate the response values for the response elements x
+    resp = 1./(sigma * math.sqrt(2.*math.pi)) * np.exp(-(x-mu)**2/(2. * sigma**2))
 
-    return resp
\ No newline at end of file
+    return resp
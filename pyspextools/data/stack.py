@@ -0,0 +1,192 @@
+#!/usr/bin/env python
+
+import copy
+
+from pyspextools.io.region import Region
+import pyspextools.messages as message
+
+import numpy as np
+
+
+class RegionStack:
+    """Stack of the spectra and responses of several observations of the same source, which results in a single
+    SPEX region. The regions are added one at a time, such that only the running sums and one observation need
+    to be kept in memory. All regions need to have the same channel grid.
+
+    The source and background counts are summed per channel and divided by the summed exposure, so the stacked
+    rates are exposure-weighted averages. The errors are propagated in quadrature. The stacked response is the
+    sum of the responses of the regions, where every response element is weighted with the exposure of its
+    channel in that region and divided by the summed exposure of the channel. The components of the responses
+    are merged into a single component with Res.merge_components.
+
+    :ivar nstack: Number of regions in the stack.
+    :vartype nstack: int
+    """
+
+    def __init__(self):
+        self.nstack = 0         # Number of regions in the stack
+
+        self.__spo = None       # Spectrum of the first region (channel grid, grouping and systematics)
+        self.__res = None       # Sum of the exposure-weighted responses
+        self.__sums = {}        # Running sums of the spectra per channel
+
+    # -----------------------------------------------------
+    # Add a region to the stack
+    # -----------------------------------------------------
+
+    def add(self, reg):
+        """Add the spectrum and response of a region to the stack. The region must contain one region with
+        the same channels as the regions that are already in the stack.
+
+        :param reg: Input Region object.
+        :type reg: pyspextools.io.Region
+        """
+
+        if not isinstance(reg, Region):
+            message.error("The input object is not of type Region.")
+            return -1
+
+        if reg.spo.empty or reg.res.empty:
+            message.error("The input region is empty.")
+            return -1
+
+        if reg.spo.nregion != 1 or np.unique(reg.res.region).size != 1 or np.unique(reg.res.sector).size != 1:
+            message.error("The input object contains more than one region.")
+            return -1
+
+        reg.spo.load()
+        reg.res.load()
+
+        spo = reg.spo
+        if self.__spo is not None:
+            if spo.nchan[0] != self.__spo.nchan[0] or not np.allclose(spo.echan1, self.__spo.echan1) or \
+                    not np.allclose(spo.echan2, self.__spo.echan2):
+                message.error("The channels of the region do not match the channels of the stack.")
+                return -1
+            if reg.res.resp_der != self.__res.resp_der:
+                message.error("The response derivatives of the region do not match those of the stack.")
+                return -1
+
+        # Weight every response element with the exposure of its channel
+        res = self.__weighted_response(reg.res, spo.tints)
+
+        # Sum the counts per channel
+        tints = np.array(spo.tints, dtype=float)
+        brat = np.array(spo.brat, dtype=float) if spo.brat_exist else np.zeros(tints.size)
+        counts = {'tints': tints,
+                  'src': spo.ochan * tints,
+                  'var_src': (spo.dochan * tints) ** 2,
+                  'bkg': spo.mbchan * tints,
+                  'var_bkg': (spo.dbchan * tints) ** 2,
+                  'bkg_brat': spo.mbchan * tints * brat,
+                  'brat': brat * tints}
+
+        if self.__spo is None:
+            self.__spo = copy.deepcopy(spo)
+            self.__res = res
+            self.__sums = counts
+        else:
+            for name in counts:
+                self.__sums[name] = self.__sums[name] + counts[name]
+            self.__spo.used = self.__spo.used & spo.used
+            self.__spo.brat_exist = self.__spo.brat_exist or spo.brat_exist
+            self.__res.append_components([res])
+
+        if self.__res.ncomp > 1:
+            self.__res.merge_components(np.arange(self.__res.ncomp) + 1)
+
+        self.nstack = self.nstack + 1
+
+        return 0
+
+    @staticmethod
+    def __weighted_response(res, tints):
+        """Return a copy of the response with a single region, in which every response element is multiplied
+        with the exposure of its channel and the relative area of its group."""
+
+        res = copy.deepcopy(res)
+
+        elgroup = np.repeat(np.arange(res.nc.size), res.nc)
+        chan = res.ic1[elgroup] + np.arange(elgroup.size) - np.repeat(np.cumsum(res.nc) - res.nc, res.nc)
+        weight = tints[chan - 1]
+        if res.area_scal:
+            weight = weight * res.relarea[elgroup]
+            res.area_scal = False
+            res.relarea = np.ones(res.nc.size)
+
+        res.resp = res.resp * weight
+        if res.resp_der:
+            res.dresp = res.dresp * weight
+
+        res.sector[:] = 1
+        res.region[:] = 1
+        res.nsector = 1
+        res.nregion = 1
+
+        return res
+
+    # -----------------------------------------------------
+    # Return the stacked region
+    # -----------------------------------------------------
+
+    def region(self):
+        """Return a Region object with the stacked spectrum and response."""
+
+        if self.nstack == 0:
+            message.error("The stack is empty.")
+            return -1
+
+        sums = self.__sums
+        tints = sums['tints']
+        good = tints > 0.
+
+        def per_second(value):
+            rate = np.zeros(tints.size)
+            rate[good] = value[good] / tints[good]
+            return rate
+
+        spo = copy.deepcopy(self.__spo)
+        spo.tints = tints
+        spo.ochan = per_second(sums['src'])
+        spo.dochan = per_second(np.sqrt(sums['var_src']))
+        spo.mbchan = per_second(sums['bkg'])
+        spo.dbchan = per_second(np.sqrt(sums['var_bkg']))
+
+        # Backscale ratio of the summed background counts, or the exposure-weighted ratio without background
+        spo.brat = per_second(sums['brat'])
+        bkg = sums['bkg'] != 0.
+        spo.brat[bkg] = sums['bkg_brat'][bkg] / sums['bkg'][bkg]
+
+        # Divide the summed response elements by the summed exposure of their channel
+        res = copy.deepcopy(self.__res)
+        elgroup = np.repeat(np.arange(res.nc.size), res.nc)
+        chan = res.ic1[elgroup] + np.arange(elgroup.size) - np.repeat(np.cumsum(res.nc) - res.nc, res.nc)
+        weight = np.zeros(tints.size)
+        weight[good] = 1. / tints[good]
+        res.resp = res.resp * weight[chan - 1]
+        if res.resp_der:
+            res.dresp = res.dresp * weight[chan - 1]
+
+        reg = Region()
+        reg.spo = spo
+        reg.res = res
+        reg.label = "stack"
+
+        return reg
+
+
+def stack_regions(regions):
+    """Stack the spectra and responses of a list of regions into a single region (see RegionStack).
+    Returns the stacked region.
+
+    :param regions: List of Region objects with the same channel grid.
+    :type regions: list
+    """
+
+    stack = RegionStack()
+
+    for reg in regions:
+        if stack.add(reg) != 0:
+            return -1
+
+    return stack.region()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+
+# =========================================================
+"""
+Methods to skip conversions whose input files and options did not change.
+A fingerprint of the input files and conversion options is stored as a HISTORY
+line in the primary header of the output files. If the outputs already contain
+the fingerprint of the current inputs, the conversion can be skipped.
+"""
+# =========================================================
+
+import os
+import json
+import hashlib
+import astropy.io.fits as fits
+import pyspextools
+
+# Prefix of the HISTORY line that contains the fingerprint
+history_prefix = "Input fingerprint: "
+
+
+def file_digest(filename, chunksize=1048576):
+    """Return the hash of the contents of a file as a hexadecimal string.
+
+    :param filename: Name of the file.
+    :type filename: str
+    :param chunksize: Number of bytes to read at once.
+    :type chunksize: int
+    """
+
+    digest = hashlib.blake2b(digest_size=20)
+
+    with open(filename, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunksize), b''):
+            digest.update(chunk)
+
+    return digest.hexdigest()
+
+
+def fingerprint(files, options, digests=None):
+    """Return the fingerprint of a conversion, which combines the hashes of the contents of the input files, the
+    conversion options and the pyspextools version. The file names themselves are not part of the fingerprint,
+    such that moving a directory does not trigger a new conversion.
+
+    :param files: Dictionary with the role (for example 'rmffile') and name of every input file. Files that are
+        None are ignored.
+    :type files: dict
+    :param options: Dictionary with the options that change the output of the conversion.
+    :type options: dict
+    :param digests: Dictionary with already known hashes of files (optional, for example from a response catalog).
+    :type digests: dict
+    """
+
+    if digests is None:
+        digests = {}
+
+    hashes = {}
+    for (role, filename) in files.items():
+        if filename is not None:
+            hashes[role] = digests[filename] if filename in digests else file_digest(filename)
+
+    content = json.dumps({'version': pyspextools.__version__, 'files': hashes, 'options': options},
+                         sort_keys=True, default=str)
+
+    return hashlib.blake2b(content.encode(), digest_size=20).hexdigest()
+
+
+def history_line(value):
+    """Return the HISTORY line to store a fingerprint in the output files.
+
+    :param value: Fingerprint.
+    :type value: str
+    """
+    return history_prefix + value
+
+
+def read_fingerprint(filename):
+    """Return the fingerprint stored in the primary header of a FITS file, or None if the file does not exist
+    or contains no fingerprint.
+
+    :param filename: Name of the FITS file.
+    :type filename: str
+    """
+
+    if not os.path.isfile(filename):
+        return None
+
+    try:
+        header = fits.getheader(filename, 0)
+    except OSError:
+        return None
+
+    for line in header.get('HISTORY', []):
+        line = str(line)
+        if line.startswith(history_prefix):
+            return line[len(history_prefix):].strip()
+
+    return None
+
+
+def up_to_date(outputs, value):
+    """Return True if all output files exist and contain the given fingerprint.
+
+    :param outputs: List of output file names.
+    :type outputs: list
+    :param value: Fingerprint of the current inputs.
+    :type value: str
+    """
+    return all(read_fingerprint(filename) == value for filename in outputs)
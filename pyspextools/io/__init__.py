@@ -11,8 +11,11 @@ from .arf import Arf
 from .region import Region
 from .dataset import Dataset
 from .ogip import OGIPRegion
+from .ogip import ResponseCache, find_companion_files
 from .tg import TGRegion
+from .catalog import ResponseCatalog
 
 from .convert import *
+from .store import read_store, write_store, spex_to_store, store_to_spex
 
 
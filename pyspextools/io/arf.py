@@ -39,6 +39,9 @@ class Arf:
         self.Order = 0                                  # Grating order (for grating arrays, else 0)
         self.Grating = 0                                # Grating instrument (if available, 1 = HEG, 2 = MEG, 3 = LEG)
 
+        self._aligned = {}                              # Cache of effective areas aligned to response grids
+        self._aligned_arrays = None                     # Arrays the cached effective areas were derived from
+
     def read(self, arffile):
         """Read the effective area from an OGIP ARF file.
 
@@ -72,12 +75,78 @@ class Arf:
         # Check for NULL values
         nans = np.isnan(self.EffArea)
         if np.any(nans):
-            for i in np.arange(self.EffArea.size):
-                if nans[i]:
-                   self.EffArea[i] = 0.0
+            self.EffArea[nans] = 0.0
 
         return 0
 
+    # -----------------------------------------------------
+    # Align the effective area to a response energy grid
+    # -----------------------------------------------------
+
+    def aligned_area(self, elow, ehigh, rebuild=False):
+        """Return the effective area on the energy grid of a response matrix. If the grid is identical to the
+        ARF grid, the effective area is returned directly. Otherwise, the effective area is rebinned by
+        averaging over the overlap of each response bin with the ARF bins, which conserves the integral of
+        the effective area over energy. The result is cached for every response grid, so that multiple
+        matrix extensions or orders on the same grid are aligned only once. If the ARF arrays are
+        replaced, the cache is rebuilt automatically. Use rebuild=True after changing them in place.
+
+        :param elow: Lower energy boundaries of the response bins.
+        :type elow: numpy.ndarray
+        :param ehigh: Upper energy boundaries of the response bins.
+        :type ehigh: numpy.ndarray
+        :param rebuild: Discard the cached effective areas.
+        :type rebuild: bool
+        """
+
+        elow = np.asarray(elow, dtype=float)
+        ehigh = np.asarray(ehigh, dtype=float)
+
+        arrays = (self.LowEnergy, self.HighEnergy, self.EffArea)
+        if rebuild or self._aligned_arrays is None or \
+                any(a is not b for a, b in zip(arrays, self._aligned_arrays)):
+            self._aligned = {}
+            self._aligned_arrays = arrays
+
+        key = (elow.size, elow.tobytes(), ehigh.tobytes())
+        if key not in self._aligned:
+            self._aligned[key] = self.__align(elow, ehigh)
+
+        return self._aligned[key]
+
+    def __align(self, elow, ehigh):
+        """Calculate the effective area on a response energy grid (see aligned_area)."""
+
+        area = np.asarray(self.EffArea, dtype=float)
+
+        # Fast path: identical grids. The first low energy is not compared, because it is
+        # sometimes different in otherwise identical grids.
+        if elow.size == self.LowEnergy.size and np.array_equal(ehigh, self.HighEnergy) and \
+                np.array_equal(elow[1:], self.LowEnergy[1:]):
+            return area.copy()
+
+        # Sort the ARF bins in energy and calculate the cumulative integral of the effective area
+        # at the bin boundaries
+        order = np.argsort(self.LowEnergy, kind='stable')
+        alow = np.asarray(self.LowEnergy, dtype=float)[order]
+        ahigh = np.asarray(self.HighEnergy, dtype=float)[order]
+        edges = np.append(alow[0], ahigh)
+        integral = np.append(0., np.cumsum(area[order] * (ahigh - alow)))
+
+        # The integral is linear within an ARF bin, so the overlap of each response bin with the ARF bins
+        # follows from interpolating it at the response bin boundaries. Outside the ARF grid the area is zero.
+        width = ehigh - elow
+        aligned = np.zeros(elow.size, dtype=float)
+        wide = width > 0.
+        aligned[wide] = (np.interp(ehigh[wide], edges, integral) -
+                         np.interp(elow[wide], edges, integral)) / width[wide]
+
+        # Bins without width get the area of the ARF bin at their energy
+        if not np.all(wide):
+            aligned[~wide] = np.interp(elow[~wide], (alow + ahigh) / 2.0, area[order])
+
+        return aligned
+
     def write(self, arffile, telescop=None, instrume=None, filter=None, overwrite=False):
         """Write an OGIP compatible ARF file (Non-grating format).
 
@@ -0,0 +1,286 @@
+#!/usr/bin/env python
+
+# =========================================================
+"""
+  Python module with a catalog of OGIP response and effective
+  area files. The catalog is built from the FITS headers and
+  small tables only, and can be saved to disk, such that finding
+  the responses for a spectrum does not require opening all the
+  files again.
+
+  This module contains the class:
+
+    RESPONSECATALOG:  Header index of RMF and ARF files in a directory tree
+
+  Dependencies:
+    - astropy.io.fits:     Read FITS headers
+    - numpy:               Array operations
+"""
+# =========================================================
+
+import os
+import json
+import fnmatch
+import numpy as np
+import astropy.io.fits as fits
+import pyspextools.messages as message
+from pyspextools.incremental import file_digest
+
+
+# =========================================================
+# Response catalog class
+# =========================================================
+
+class ResponseCatalog:
+    """Catalog of the RMF and ARF files in a directory tree. For every file, the catalog contains the
+    information from the headers that is needed to match responses to spectra, like the grating order (TG_M
+    or ORDER), grating part (TG_PART), instrument and number of channels, together with the energy range and
+    a hash of the file contents. The energy range of an RMF is the range of its channels (EBOUNDS) and the
+    energy range of an ARF is the range of its effective area bins. When a tree is scanned again, files with an
+    unchanged size and modification time are not opened again.
+
+    :ivar entries: Dictionary with the catalog entry (a dictionary) for every absolute file name.
+    :vartype entries: dict
+    """
+
+    # File name patterns of the files in the catalog and their file type
+    patterns = {'*.rmf': 'rmf', '*.rmf.gz': 'rmf', '*.arf': 'arf', '*.arf.gz': 'arf'}
+
+    def __init__(self):
+        """Initialize an empty response catalog."""
+        self.entries = {}
+
+    # -----------------------------------------------------
+    # Scan a directory tree
+    # -----------------------------------------------------
+
+    def scan(self, root):
+        """Add all the RMF and ARF files in a directory tree to the catalog. Files with the same size and
+        modification time as in the catalog are not read again. Entries of files in the tree that no longer
+        exist are removed. Returns the number of files that were (re-)read.
+
+        :param root: Root directory of the tree to scan.
+        :type root: str
+        """
+
+        root = os.path.abspath(root)
+        found = set()
+        nread = 0
+
+        for (dirpath, dirnames, filenames) in os.walk(root):
+            dirnames.sort()
+            for name in sorted(filenames):
+                kind = self.__file_type(name)
+                if kind is None:
+                    continue
+
+                filename = os.path.join(dirpath, name)
+                found.add(filename)
+                stat = os.stat(filename)
+
+                entry = self.entries.get(filename)
+                if entry is not None and entry['size'] == stat.st_size and entry['mtime'] == stat.st_mtime:
+                    continue
+
+                entry = self.__read_entry(filename, kind)
+                if entry is None:
+                    continue
+                entry['size'] = stat.st_size
+                entry['mtime'] = stat.st_mtime
+                self.entries[filename] = entry
+                nread = nread + 1
+
+        # Remove files from the scanned tree that have disappeared
+        for filename in list(self.entries.keys()):
+            if filename.startswith(root + os.sep) and filename not in found:
+                del self.entries[filename]
+
+        return nread
+
+    def __file_type(self, name):
+        """Return the file type (rmf or arf) of a file name, or None if it is not a response file."""
+        for (pattern, kind) in self.patterns.items():
+            if fnmatch.fnmatch(name, pattern):
+                return kind
+        return None
+
+    @staticmethod
+    def __read_entry(filename, kind):
+        """Read the catalog information for one file from its headers. Returns None if the file cannot be read."""
+
+        entry = {'type': kind, 'order': None, 'part': None, 'instrume': None, 'telescop': None, 'detchans': None,
+                 'emin': None, 'emax': None}
+
+        try:
+            with fits.open(filename) as hdulist:
+                if kind == 'rmf':
+                    names = [hdu.name for hdu in hdulist]
+                    if 'MATRIX' in names:
+                        header = hdulist['MATRIX'].header
+                    elif 'SPECRESP MATRIX' in names:
+                        header = hdulist['SPECRESP MATRIX'].header
+                    else:
+                        message.warning("No MATRIX extension found in {0}.".format(filename))
+                        return None
+                    order = header.get('ORDER', header.get('TG_M'))
+                    ebounds = hdulist['EBOUNDS']
+                    emin = np.amin(ebounds.data['E_MIN'])
+                    emax = np.amax(ebounds.data['E_MAX'])
+                    detchans = header.get('DETCHANS', ebounds.header.get('NAXIS2'))
+                else:
+                    specresp = hdulist['SPECRESP']
+                    header = specresp.header
+                    order = header.get('TG_M')
+                    emin = np.amin(specresp.data['ENERG_LO'])
+                    emax = np.amax(specresp.data['ENERG_HI'])
+                    detchans = header.get('DETCHANS')
+
+                entry['order'] = int(order) if order is not None else None
+                entry['part'] = int(header['TG_PART']) if 'TG_PART' in header else None
+                entry['instrume'] = header.get('INSTRUME', hdulist[0].header.get('INSTRUME'))
+                entry['telescop'] = header.get('TELESCOP', hdulist[0].header.get('TELESCOP'))
+                entry['detchans'] = int(detchans) if detchans is not None else None
+                entry['emin'] = float(emin)
+                entry['emax'] = float(emax)
+        except (OSError, KeyError, ValueError) as exc:
+            message.warning("Could not read {0} for the catalog ({1}).".format(filename, exc))
+            return None
+
+        entry['hash'] = file_digest(filename)
+
+        return entry
+
+    # -----------------------------------------------------
+    # Query the catalog
+    # -----------------------------------------------------
+
+    def query(self, directory=None, pattern=None, kind=None, part=None, order=None, instrume=None):
+        """Return a sorted list of the files in the catalog that match all the given criteria. The file names
+        are returned relative to the given directory in the same form as glob would (directory + '/' + name).
+
+        :param directory: Directory that contains the files (not its subdirectories).
+        :type directory: str
+        :param pattern: File name pattern (for example 'heg*.rmf.gz').
+        :type pattern: str
+        :param kind: File type ('rmf' or 'arf').
+        :type kind: str
+        :param part: Grating part (TG_PART, 1 = HEG, 2 = MEG, 3 = LEG).
+        :type part: int
+        :param order: Grating order (TG_M or ORDER).
+        :type order: int
+        :param instrume: Instrument name.
+        :type instrume: str
+        """
+
+        if directory is not None:
+            absdir = os.path.abspath(directory)
+
+        files = []
+        for (filename, entry) in self.entries.items():
+            if directory is not None and os.path.dirname(filename) != absdir:
+                continue
+            if pattern is not None and not fnmatch.fnmatch(os.path.basename(filename), pattern):
+                continue
+            if kind is not None and entry['type'] != kind:
+                continue
+            if part is not None and entry['part'] != part:
+                continue
+            if order is not None and entry['order'] != order:
+                continue
+            if instrume is not None and entry['instrume'] != instrume:
+                continue
+
+            if directory is not None:
+                files.append(directory + '/' + os.path.basename(filename))
+            else:
+                files.append(filename)
+
+        return sorted(files)
+
+    def entry(self, filename):
+        """Return the catalog entry of a file, or None if the file is not in the catalog or has changed since
+        it was catalogued.
+
+        :param filename: File name.
+        :type filename: str
+        """
+
+        filename = os.path.abspath(filename)
+        entry = self.entries.get(filename)
+        if entry is None or not os.path.isfile(filename):
+            return None
+
+        stat = os.stat(filename)
+        if entry['size'] != stat.st_size or entry['mtime'] != stat.st_mtime:
+            return None
+
+        return entry
+
+    def orders(self, filenames):
+        """Return a list with the grating order of every file, or None if one of the files is not in the
+        catalog or has no order.
+
+        :param filenames: List of file names.
+        :type filenames: list
+        """
+
+        orders = []
+        for filename in filenames:
+            entry = self.entry(filename)
+            if entry is None or entry['order'] is None:
+                return None
+            orders.append(entry['order'])
+
+        return orders
+
+    def digests(self, filenames):
+        """Return a dictionary with the hash of the contents of every file that is in the catalog and did
+        not change since it was catalogued. This avoids hashing the files again.
+
+        :param filenames: List of file names.
+        :type filenames: list
+        """
+
+        digests = {}
+        for filename in filenames:
+            entry = self.entry(filename)
+            if entry is not None:
+                digests[filename] = entry['hash']
+
+        return digests
+
+    # -----------------------------------------------------
+    # Read and write the catalog
+    # -----------------------------------------------------
+
+    def write(self, filename):
+        """Write the catalog to a JSON file.
+
+        :param filename: Name of the catalog file.
+        :type filename: str
+        """
+
+        with open(filename, 'w') as f:
+            json.dump({'entries': self.entries}, f, indent=1, sort_keys=True)
+
+        return 0
+
+    def read(self, filename):
+        """Read the catalog from a JSON file written by the write method.
+
+        :param filename: Name of the catalog file.
+        :type filename: str
+        """
+
+        if not os.path.isfile(filename):
+            message.error("Catalog file {0} not found.".format(filename))
+            return 1
+
+        try:
+            with open(filename, 'r') as f:
+                self.entries = json.load(f)['entries']
+        except (ValueError, KeyError):
+            message.error("Catalog file {0} could not be read.".format(filename))
+            return 1
+
+        return 0
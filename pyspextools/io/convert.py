@@ -1,8 +1,11 @@
 #!/usr/bin/env python
 
 import pyspextools.messages as message
+import pyspextools.parallel as parallel
 import numpy as np
 import math
+import copy
+import os
 
 from .region import Region
 from .res import Res
@@ -230,11 +233,7 @@ def rmf_to_res(rmf, matext=0, arf=None):
     # Read the total number of groups (which is neg in SPEX format)
     res.neg = np.append(res.neg, rmf.matrix[matext].NumberTotalGroups)
 
-    res.eg1 = np.zeros(res.neg, dtype=float)
-    res.eg2 = np.zeros(res.neg, dtype=float)
-    res.nc = np.zeros(res.neg, dtype=int)
-    res.ic1 = np.zeros(res.neg, dtype=int)
-    res.ic2 = np.zeros(res.neg, dtype=int)
+    neg = int(res.neg[0])
 
     # Read the total number of matrix elements
     nm = rmf.matrix[matext].NumberTotalElements
@@ -244,54 +243,51 @@ def rmf_to_res(rmf, matext=0, arf=None):
     res.ncomp = 1
 
     # Read the energy bin boundaries and group information
-    g = 0  # Index for the group number
-    m = 0  # Index for the matrix element number
-    for i in np.arange(rmf.matrix[matext].NumberEnergyBins):
-        # Number of response groups for this energy bin
-        ngrp = rmf.matrix[matext].NumberGroups[i]
-        for j in np.arange(ngrp):
-            # Energy bin boundaries
-            if rmf.matrix[matext].LowEnergy[i] <= 0.:
-                res.eg1[g] = 1e-7
-                message.warning("Lowest energy boundary is 0. Set to 1E-7 to avoid problems.")
-            else:
-                res.eg1[g] = rmf.matrix[matext].LowEnergy[i]
-
-            res.eg2[g] = rmf.matrix[matext].HighEnergy[i]
-            if res.eg2[g] <= res.eg1[g]:
-                message.error("Discontinous bins in energy array in channel {0}. Please check the numbers.".format(
-                    i + 1))
-                return
-
-            res.nc[g] = rmf.matrix[matext].NumberChannelsGroup[g]
-            # Add the start channel to the IC to correct for cases where we start at channel 0/1
-            res.ic1[g] = rmf.matrix[matext].FirstChannelGroup[g]
-            ic2 = res.ic1[g] + res.nc[g] - 1
-            res.ic2[g] = ic2
-
-            if input_area:
-                # Interpolate the effective area in case the response energy bins do not match the arf bins
-                # Center energy of response bin
-                renergy = (res.eg1[g] + res.eg2[g]) / 2.0
-                area = np.interp(renergy, arf.CentEnergy, arf.EffArea)
-            else:
-                area = 1.0
+    mat = rmf.matrix[matext]
+    ngroup = np.asarray(mat.NumberGroups, dtype=int)
+    egroup = np.repeat(np.arange(mat.NumberEnergyBins), ngroup)
 
-            for k in np.arange(res.nc[g]):
-                res.resp[m] = rmf.matrix[matext].Matrix[m] * area
-                if res.resp[m] < 0.0:
-                    res.resp[m] = 0.0
-                m = m + 1
-            g = g + 1
-
-    if g > res.neg:
+    if egroup.size != neg:
         message.error("Mismatch between number of groups.")
         return 0
 
-    if m > nm:
+    # Energy bin boundaries
+    elow = np.asarray(mat.LowEnergy, dtype=float)
+    ehigh = np.asarray(mat.HighEnergy, dtype=float)
+    res.eg1 = elow[egroup]
+    res.eg2 = ehigh[egroup]
+    if np.any(res.eg1 <= 0.):
+        res.eg1[res.eg1 <= 0.] = 1e-7
+        message.warning("Lowest energy boundary is 0. Set to 1E-7 to avoid problems.")
+
+    discontinuous = np.flatnonzero(res.eg2 <= res.eg1)
+    if discontinuous.size != 0:
+        message.error("Discontinous bins in energy array in channel {0}. Please check the numbers.".format(
+            egroup[discontinuous[0]] + 1))
+        return
+
+    # Copy the group arrays: the res arrays are edited in place later (for example by clean_region), which must
+    # not change the Rmf object, because it can be shared between conversions through a response cache.
+    res.nc = np.array(mat.NumberChannelsGroup[:neg], dtype=int)
+    # Add the start channel to the IC to correct for cases where we start at channel 0/1
+    res.ic1 = np.array(mat.FirstChannelGroup[:neg], dtype=int)
+    res.ic2 = res.ic1 + res.nc - 1
+
+    if np.sum(res.nc) > nm:
         message.error("Mismatch between number of matrix elements.")
         return 0
 
+    # Effective area for every energy bin of the response. The alignment with the response grid is
+    # cached in the ARF object.
+    if input_area:
+        area = arf.aligned_area(elow, ehigh)[egroup]
+    else:
+        area = np.ones(neg, dtype=float)
+
+    m = int(np.sum(res.nc))
+    res.resp[:m] = mat.Matrix[:m] * np.repeat(area, res.nc)
+    res.resp[res.resp < 0.0] = 0.0
+
     # Convert matrix to m**2 units for SPEX
     if input_area:
         if arf.ARFUnits == "cm2":
@@ -308,3 +304,57 @@ def rmf_to_res(rmf, matext=0, arf=None):
     res.empty = False
 
     return res
+
+
+# -----------------------------------------------------
+# Convert several OGIP matrices into one res object
+# -----------------------------------------------------
+
+
+def rmfs_to_res(jobs, workers=None, processes=True):
+    """Convert a list of OGIP response matrices to SPEX format and combine them into one res object, with one
+    component for every matrix. This is used for RMF files with multiple matrix extensions and for the orders of
+    grating spectra. Every job is a tuple (rmf, matext, arf), which are the arguments of rmf_to_res. The
+    conversions run concurrently on a process pool, but the components always end up in the order of
+    the job list. This method returns a pyspextools Res object or 1 if one of the conversions failed.
+
+    :param jobs: List of (rmf, matext, arf) tuples.
+    :type jobs: list
+    :param workers: Maximum number of worker processes (default: number of jobs, limited by the number of CPUs).
+    :type workers: int
+    :param processes: Use a process pool instead of a thread pool?
+    :type processes: bool
+    """
+
+    if len(jobs) == 0:
+        message.error("No response matrices to convert.")
+        return 1
+
+    if workers is None:
+        workers = min(len(jobs), os.cpu_count() or 1)
+
+    tasks = []
+    for (rmf, matext, arf) in jobs:
+        if processes and isinstance(rmf, Rmf) and rmf.NumberMatrixExt > 1:
+            # Only send the matrix extension that is converted to the worker process
+            single = copy.copy(rmf)
+            single.matrix = [rmf.matrix[matext]]
+            single.NumberMatrixExt = 1
+            tasks.append((rmf_to_res, (single,), {'matext': 0, 'arf': arf}))
+        else:
+            tasks.append((rmf_to_res, (rmf,), {'matext': matext, 'arf': arf}))
+
+    results = parallel.run_tasks(tasks, workers=workers, processes=processes)
+
+    # Results that are not a Res object are failures. Note that rmf_to_res also returns 0 on some errors.
+    status = [0 if isinstance(result, Res) else result if isinstance(result, Exception) else 1
+              for result in results]
+    labels = ["Conversion of response matrix {0} failed.".format(i + 1) for i in range(len(jobs))]
+    if parallel.report_failures(status, labels) != 0:
+        return 1
+
+    # Merge the components in one pass
+    res = results[0]
+    res.append_components(results[1:])
+
+    return res
@@ -16,15 +16,19 @@
     - numpy:      Array operations
     - spo:        The spo class from this pyspextools data module
     - res:        The res class from this pyspextools data module
+    - store:      The native binary store from this pyspextools data module
 """
 # =========================================================
 
 import numpy as np
 import pyspextools.messages as message
+import pyspextools.parallel as parallel
 
 from .region import Region
+from .region import write_spo_res
 from .spo import Spo
 from .res import Res
+from . import store
 
 
 # =========================================================
@@ -66,19 +70,17 @@ class Dataset:
         :type label: str
         """
 
-        # Read the spo and res files in a temporary object
-        tspo = Spo()
-        tspo.read_file(spofile)
-
-        tres = Res()
-        tres.read_file(resfile)
-
         # Create new region
         reg = Region()
 
-        # Return desired region and save into local region object
-        reg.spo = tspo.return_region(iregion)
-        reg.res = tres.return_region(isector, iregion)
+        # Read only the rows of the desired region from the files into the local region object.
+        # The spo and res files are read concurrently.
+        results = parallel.run_tasks([(reg.spo.read_region, (spofile, iregion), {}),
+                                      (reg.res.read_region, (resfile, isector, iregion), {})])
+        nfail = parallel.report_failures(results, ["Cannot read region from spo file.",
+                                                   "Cannot read region from res file."])
+        if nfail != 0:
+            return 1
 
         # Adapt region number to local set
         reg.res.region = reg.res.region + len(self.regions)
@@ -108,17 +110,56 @@ class Dataset:
         :type resfile: str
         """
 
-        # Read the spo and res files in a temporary object
+        # Read the spo and res files concurrently in a temporary object
         tspo = Spo()
-        tspo.read_file(spofile)
-
         tres = Res()
-        tres.read_file(resfile)
+
+        results = parallel.run_tasks([(tspo.read_file, (spofile,), {}), (tres.read_file, (resfile,), {})])
+        nfail = parallel.report_failures(results, ["Reading SPO file {0} failed.".format(spofile),
+                                                   "Reading RES file {0} failed.".format(resfile)], status=False)
+        if nfail != 0:
+            return 1
+
+        return self.__add_all_regions(tspo, tres)
+
+    # -----------------------------------------------------
+    # Read all the regions from a native binary store.
+    # -----------------------------------------------------
+
+    def read_store(self, path, mmap=True):
+        """Read all the regions from a native binary store directory (see pyspextools.io.store) and add
+        them to the dataset. The columns are memory-mapped if mmap is True.
+
+        :param path: Directory name of the store.
+        :type path: str
+        :param mmap: Memory-map the uncompressed columns?
+        :type mmap: bool
+        """
+
+        result = store.read_store(path, mmap=mmap)
+        if not isinstance(result, tuple):
+            return 1
+
+        (tspo, tres) = result
+        if tspo is None or tres is None:
+            message.error("Store {0} does not contain both a spectrum and a response.".format(path))
+            return 1
+
+        return self.__add_all_regions(tspo, tres)
+
+    def __add_all_regions(self, tspo, tres):
+        """Split a spo and res object into regions and add them to the dataset.
+
+        :param tspo: Spo object containing all the regions.
+        :type tspo: pyspextools.io.Spo
+        :param tres: Res object containing all the regions.
+        :type tres: pyspextools.io.Res
+        """
 
         # Check if the number of regions in both files are the same
         if tspo.nregion != tres.nregion:
             print("Error: the spo and res files do not have the same number of regions!")
-            return
+            return 1
 
         # Read the response configuration
         config = self.read_config(tres)
@@ -148,6 +189,8 @@ class Dataset:
 
         self.update_config()
 
+        return 0
+
     # -----------------------------------------------------
     # Append a region object to the dataset
     # -----------------------------------------------------
@@ -177,8 +220,9 @@ class Dataset:
     # Write one region to a spo and res file.
     # -----------------------------------------------------
 
-    def write_region(self, spofile, resfile, iregion, exp_rate=True, overwrite=False, history=None):
-        """Write one region to a spo and res file.
+    def write_region(self, spofile, resfile, iregion, exp_rate=True, overwrite=False, history=None, index=False,
+                     compress=False):
+        """Write one region to a spo and res file. The two files are written concurrently.
 
         :param spofile: File name of the input .spo file.
         :type spofile: str
@@ -192,23 +236,26 @@ class Dataset:
         :type overwrite: bool
         :param history: History information.
         :type history: List/Array of strings
+        :param index: Write a component offset index to the res file.
+        :type index: bool
+        :param compress: Write gzip compressed files (True or a compression level from 1 to 9).
+        :type compress: bool or int
         """
 
         if len(self.regions) >= iregion > 0:
-            self.regions[iregion - 1].spo.write_file(spofile, exp_rate=exp_rate, overwrite=overwrite, history=history)
-            self.regions[iregion - 1].res.write_file(resfile, overwrite=overwrite, history=history)
+            return self.regions[iregion - 1].write_files(spofile, resfile, exp_rate=exp_rate, overwrite=overwrite,
+                                                         history=history, index=index, compress=compress)
         else:
             print("Error: region number not found!")
             return 1
 
-        return 0
-
     # -----------------------------------------------------
     # Write all the regions to a spo and res file.
     # -----------------------------------------------------
 
-    def write_all_regions(self, spofile, resfile, exp_rate=True, overwrite=False, history=None):
-        """Write all regions in the data object to spo and res.
+    def write_all_regions(self, spofile, resfile, exp_rate=True, overwrite=False, history=None, index=False,
+                          compress=False):
+        """Write all regions in the data object to spo and res. The two files are written concurrently.
 
         :param spofile: File name of the input .spo file.
         :type spofile: str
@@ -220,7 +267,45 @@ class Dataset:
         :type overwrite: bool
         :param history: History information.
         :type history: List/Array of strings
+        :param index: Write a component offset index to the res file.
+        :type index: bool
+        :param compress: Write gzip compressed files (True or a compression level from 1 to 9).
+        :type compress: bool or int
         """
+        (tspo, tres) = self.__combine_regions()
+
+        # Write the spo and res file concurrently
+        return write_spo_res(tspo, tres, spofile, resfile, exp_rate=exp_rate, overwrite=overwrite, history=history,
+                             index=index, compress=compress)
+
+    # -----------------------------------------------------
+    # Write all the regions to a native binary store.
+    # -----------------------------------------------------
+
+    def write_store(self, path, compress=None, overwrite=False):
+        """Write all regions in the data object to a native binary store directory (see pyspextools.io.store).
+        The compress option can be True to compress all columns, or a list of column names to compress.
+
+        :param path: Directory name of the store.
+        :type path: str
+        :param compress: Columns to compress with gzip (True for all columns).
+        :type compress: bool or list
+        :param overwrite: Overwrite an existing store?
+        :type overwrite: bool
+        """
+
+        (tspo, tres) = self.__combine_regions()
+
+        stat = store.write_store(path, spo=tspo, res=tres, compress=compress, overwrite=overwrite)
+        if stat != 0:
+            message.error("Writing store failed.")
+            return 1
+
+        return 0
+
+    def __combine_regions(self):
+        """Combine the regions in the dataset into one spo and one res object."""
+
         tspo = Spo()
         tres = Res()
 
@@ -230,17 +315,7 @@ class Dataset:
             tres.add_res_region(ireg.res, isector=self.config[i, 0], iregion=self.config[i, 1])
             i = i + 1
 
-        stat = tspo.write_file(spofile, exp_rate=exp_rate, overwrite=overwrite, history=history)
-        if stat != 0:
-            message.error("Writing SPO file failed.")
-            return 1
-
-        stat = tres.write_file(resfile, overwrite=overwrite, history=history)
-        if stat != 0:
-            message.error("Writing RES file failed.")
-            return 1
-
-        return 0
+        return tspo, tres
 
     # -----------------------------------------------------
     # Function to read the response configuration
@@ -0,0 +1,191 @@
+#!/usr/bin/env python
+
+# =========================================================
+"""
+  Python module with index structures for fast lookups in
+  SPEX response and spectrum objects.
+
+  This module contains the class:
+
+    CHANNELINDEX:  Channel-major index of the response elements
+    ENERGYINDEX:   Binary search index for energy bins and channel numbers
+
+  Dependencies:
+    - numpy:      Array operations
+"""
+# =========================================================
+
+import numpy as np
+
+
+# =========================================================
+# Channel index class
+# =========================================================
+
+class ChannelIndex:
+    """The response elements in a res object are stored energy-major: group by group,
+    with the channels of each group stored next to each other. This class contains the
+    transposed (channel-major) index, such that all the response elements that fall into
+    a given channel can be found without scanning all the groups. The index is built from
+    the neg, nchan, ic1 and nc arrays of a res object.
+
+    :ivar choff: Offset of the first channel of each component in the index.
+    :vartype choff: numpy.ndarray
+    :ivar indptr: Start position of each channel in the element and group arrays (size: total channels + 1).
+    :vartype indptr: numpy.ndarray
+    :ivar element: Positions of the response elements in the resp array, sorted by channel.
+    :vartype element: numpy.ndarray
+    :ivar group: Group (energy row) of each response element, sorted by channel.
+    :vartype group: numpy.ndarray
+    """
+
+    def __init__(self, neg, nchan, ic1, nc):
+        """Build the channel-major index from the component and group arrays of a response.
+
+        :param neg: Number of energy groups for each component.
+        :type neg: numpy.ndarray
+        :param nchan: Number of channels for each component.
+        :type nchan: numpy.ndarray
+        :param ic1: First channel of each group.
+        :type ic1: numpy.ndarray
+        :param nc: Number of channels in each group.
+        :type nc: numpy.ndarray
+        """
+
+        neg = np.asarray(neg, dtype=np.int64)
+        nchan = np.asarray(nchan, dtype=np.int64)
+        nc = np.asarray(nc, dtype=np.int64)
+
+        # Channel offset of each component
+        self.choff = np.cumsum(nchan) - nchan
+
+        # Group and (zero-based) channel of every response element
+        nelement = int(np.sum(nc))
+        elgroup = np.repeat(np.arange(nc.size), nc)
+        gstart = np.cumsum(nc) - nc
+        grpcomp = np.repeat(np.arange(neg.size), neg)
+        key = (self.choff[grpcomp] + np.asarray(ic1, dtype=np.int64) - 1 - gstart)[elgroup] + np.arange(nelement)
+
+        # Number of elements per channel and the start position of every channel
+        counts = np.bincount(key, minlength=int(np.sum(nchan)))
+        self.indptr = np.zeros(counts.size + 1, dtype=np.int64)
+        np.cumsum(counts, out=self.indptr[1:])
+
+        # Within a group the channels increase, so the key consists of sorted runs and the stable sort is
+        # close to linear.
+        self.element = np.argsort(key, kind='stable')
+        self.group = elgroup[self.element]
+
+    def rows(self, channel, icomp=1):
+        """Return the range of positions in the element and group arrays for a channel.
+
+        :param channel: Channel number (starting at 1).
+        :type channel: int
+        :param icomp: Component number (starting at 1).
+        :type icomp: int
+        """
+        ich = self.choff[icomp - 1] + channel - 1
+        return self.indptr[ich], self.indptr[ich + 1]
+
+    def counts(self, icomp=1):
+        """Return the number of response elements in every channel of a component.
+
+        :param icomp: Component number (starting at 1).
+        :type icomp: int
+        """
+        start = self.choff[icomp - 1]
+        end = self.choff[icomp] if icomp < self.choff.size else self.indptr.size - 1
+        return np.diff(self.indptr[start:end + 1])
+
+
+# =========================================================
+# Energy index class
+# =========================================================
+
+class EnergyIndex:
+    """Binary search index for a grid of energy bins, like the model energy groups of a
+    res object or the channels of a spo object. The index returns the row of the bin that
+    contains a given energy, or the row that belongs to a given channel number, in
+    O(log n) time. The bins are assumed not to overlap, but can be in any order (for example
+    swapped channel arrays). Bins with identical boundaries are allowed, in which case the first
+    row is returned. Energies and numbers that are not found return -1.
+
+    :ivar elow: Lower bin boundaries in increasing order.
+    :vartype elow: numpy.ndarray
+    :ivar ehigh: Upper bin boundaries, sorted like elow.
+    :vartype ehigh: numpy.ndarray
+    :ivar erows: Row numbers of the bins, sorted like elow.
+    :vartype erows: numpy.ndarray
+    :ivar numbers: Bin (channel) numbers in increasing order.
+    :vartype numbers: numpy.ndarray
+    :ivar nrows: Row numbers of the bins, sorted like numbers.
+    :vartype nrows: numpy.ndarray
+    """
+
+    def __init__(self, elow, ehigh, numbers=None, offset=0):
+        """Build the index for a grid of energy bins.
+
+        :param elow: Lower energy boundaries of the bins.
+        :type elow: numpy.ndarray
+        :param ehigh: Upper energy boundaries of the bins.
+        :type ehigh: numpy.ndarray
+        :param numbers: Number of each bin, for example the channel number (default: 1 to the number of bins).
+        :type numbers: numpy.ndarray
+        :param offset: Offset added to the returned row numbers (for bins that are part of a larger array).
+        :type offset: int
+        """
+
+        elow = np.asarray(elow)
+        ehigh = np.asarray(ehigh)
+        rows = np.arange(elow.size) + offset
+
+        order = np.argsort(elow, kind='stable')
+        self.elow = elow[order]
+        self.ehigh = ehigh[order]
+        self.erows = rows[order]
+
+        if numbers is None:
+            numbers = np.arange(1, elow.size + 1)
+        numbers = np.asarray(numbers)
+
+        order = np.argsort(numbers, kind='stable')
+        self.numbers = numbers[order]
+        self.nrows = rows[order]
+
+    def energy_row(self, energy):
+        """Return the row of the bin that contains the energy (elow < energy < ehigh). The input can
+        be a number or an array.
+
+        :param energy: Energy or array of energies to look up.
+        :type energy: float or numpy.ndarray
+        """
+
+        energy = np.asarray(energy)
+        if self.elow.size == 0:
+            return np.full(energy.shape, -1)[()]
+
+        # Last bin with a lower boundary below the energy. If several bins have the same lower boundary,
+        # like multiple response groups in one energy bin, take the first one.
+        pos = np.searchsorted(self.elow, energy, side='left') - 1
+        pos = np.clip(pos, 0, None)
+        pos = np.searchsorted(self.elow, self.elow[pos], side='left')
+        found = np.logical_and(self.elow[pos] < energy, self.ehigh[pos] > energy)
+
+        return np.where(found, self.erows[pos], -1)[()]
+
+    def number_row(self, number):
+        """Return the row of the bin with the given (channel) number. The input can be a number or an array.
+
+        :param number: Number or array of numbers to look up.
+        :type number: int or numpy.ndarray
+        """
+
+        number = np.asarray(number)
+        if self.numbers.size == 0:
+            return np.full(number.shape, -1)[()]
+
+        pos = np.searchsorted(self.numbers, number, side='left')
+        pos = np.clip(pos, 0, self.numbers.size - 1)
+        found = self.numbers[pos] == number
+
+        return np.where(found, self.nrows[pos], -1)[()]
@@ -1,16 +1,27 @@
 #!/usr/bin/env python
 
+import os
+import threading
+import collections
 import pyspextools.messages as message
+import pyspextools.parallel as parallel
+import astropy.io.fits as fits
 import numpy as np
 
 from .region import Region
 from .res import Res
 from .spo import Spo
+from .index import EnergyIndex
 from .pha import Pha
 from .rmf import Rmf
 from .arf import Arf
 from .convert import pha_to_spo
 from .convert import rmf_to_res
+from .convert import rmfs_to_res
+
+# Header keywords of the SPECTRUM extension that refer to companion files
+companion_keywords = [('bkgfile', 'BACKFILE'), ('rmffile', 'RESPFILE'), ('arffile', 'ANCRFILE'),
+                      ('corrfile', 'CORRFILE')]
 
 
 class OGIPRegion(Region):
@@ -68,9 +79,13 @@ class OGIPRegion(Region):
     # Read a set of OGIP files into a region
     # -----------------------------------------------------
 
-    def read_region(self, phafile, rmffile, bkgfile=None, arffile=None, corrfile=None, grouping=False, force_poisson=False):
+    def read_region(self, phafile, rmffile=None, bkgfile=None, arffile=None, corrfile=None, grouping=False,
+                    force_poisson=False, auto=False, cache=None):
         """Add an OGIP spectrum and response to a SPEX region. The pha and rmf file names
         are mandatory. If needed, a background file and effective area file can be added.
+        If auto is True, the files that are not given are taken from the BACKFILE, RESPFILE,
+        ANCRFILE and CORRFILE keywords in the PHA file (see find_companion_files). A
+        ResponseCache object can be provided to re-use responses that are shared between spectra.
 
         :param phafile: Name of the PHA file to read.
         :type phafile: str
@@ -86,25 +101,38 @@ class OGIPRegion(Region):
         :type grouping: bool
         :param force_poisson: Force the calculation of Poisson errors (default: False)
         :type force_poisson: bool
+        :param auto: Find the files that are not given from the PHA header keywords?
+        :type auto: bool
+        :param cache: Cache for the RMF and ARF files (optional).
+        :type cache: pyspextools.io.ogip.ResponseCache
         """
 
-        # Read the source PHA file
-        self.read_source_pha(phafile, force_poisson=force_poisson)
-
-        # Read the background PHA file if specified:
-        if bkgfile is not None:
-            self.read_background_pha(bkgfile, force_poisson=force_poisson)
-
-        # Read a correction spectrum if specified:
-        if corrfile is not None:
-            self.read_corr(corrfile)
+        # Find the companion files from the PHA header
+        if auto:
+            files = find_companion_files(phafile)
+            if not isinstance(files, dict):
+                return 1
+            if bkgfile is None:
+                bkgfile = files['bkgfile']
+            if rmffile is None:
+                rmffile = files['rmffile']
+            if arffile is None:
+                arffile = files['arffile']
+            if corrfile is None:
+                corrfile = files['corrfile']
+
+        if rmffile is None:
+            message.error("No response matrix file specified.")
+            return 1
 
-        # Read the response matrix
-        self.read_rmf(rmffile)
+        # Read all the files concurrently and report the results in a fixed order
+        files = load_ogip_files(phafile, rmffile, bkgfile=bkgfile, arffile=arffile, corrfile=corrfile,
+                                force_poisson=force_poisson, cache=cache)
 
-        # Read the effective area
-        if arffile is not None:
-            self.read_arf(arffile)
+        nfail = self.__add_loaded_files(files)
+        if nfail != 0:
+            message.error("Not all OGIP files could be read.")
+            return 1
 
         # Should the spectrum grouping remain?
         self.save_grouping = grouping
@@ -124,6 +152,64 @@ class OGIPRegion(Region):
             message.error("OGIP to spex conversion failed.")
             return 1
 
+        return 0
+
+    def __add_loaded_files(self, files):
+        """Add the objects returned by load_ogip_files to the region and report which files were read.
+        Returns the number of files that could not be read.
+
+        :param files: Dictionary with the read objects (see load_ogip_files).
+        :type files: dict
+        """
+
+        steps = [('spec', Pha, "Read source PHA spectrum", "Unable to read source PHA file."),
+                 ('back', Pha, "Read background PHA spectrum", "Unable to read background PHA file."),
+                 ('corr', Pha, "Read correction spectrum", "Unable to read CORR file."),
+                 ('resp', Rmf, "Read RMF response matrix", "Unable to read RMF/RSP file."),
+                 ('area', Arf, "Read ARF effective area", "Unable to read ARF file.")]
+
+        nfail = 0
+
+        for (key, objtype, text, error) in steps:
+            obj = files[key]
+            if obj is None:
+                continue
+
+            message.proc_start(text)
+            if isinstance(obj, objtype):
+                message.proc_end(0)
+            else:
+                message.proc_end(1)
+                message.error(error)
+                if isinstance(obj, Exception):
+                    print("{0}: {1}".format(type(obj).__name__, obj))
+                nfail = nfail + 1
+                continue
+
+            if key == 'spec':
+                self.spec = obj
+                self.input_spec = True
+            elif key == 'back':
+                self.back = obj
+                self.input_back = True
+            elif key == 'corr':
+                self.corr = obj
+                self.input_corr = True
+            elif key == 'resp':
+                self.resp = obj
+                self.input_resp = True
+            elif key == 'area':
+                self.area = obj
+                self.input_area = True
+
+        # Check if first channel of spectrum is zero:
+        if self.input_spec and self.spec.FirstChannel == 0:
+            self.first_channel_zero = True
+        else:
+            self.first_channel_zero = False
+
+        return nfail
+
     # -----------------------------------------------------
     # Add OGIP objects to the OGIP region and convert
     # -----------------------------------------------------
@@ -228,11 +314,12 @@ class OGIPRegion(Region):
                 return 1
 
             message.proc_start("Convert OGIP response to res format")
-            res = rmf_to_res(self.resp, matext=0, arf=self.area)
             if self.resp.NumberMatrixExt > 1:
-                for i in range(self.resp.NumberMatrixExt-1):
-                    rescomp = rmf_to_res(self.resp, matext=i+1, arf=self.area)
-                    res.append_component(rescomp, iregion=1, isector=1)
+                # Convert the matrix extensions concurrently, one component per extension
+                jobs = [(self.resp, i, self.area) for i in range(self.resp.NumberMatrixExt)]
+                res = rmfs_to_res(jobs)
+            else:
+                res = rmf_to_res(self.resp, matext=0, arf=self.area)
 
             if isinstance(res, Res):
                 self.res = res
@@ -322,14 +409,24 @@ class OGIPRegion(Region):
     # Read an OGIP rmf file
     # -----------------------------------------------------
 
-    def read_rmf(self, rmffile):
+    def read_rmf(self, rmffile, cache=None):
         """Open rmf file containing the response matrix.
 
         :param rmffile: RMF file name to read.
         :type rmffile: str
+        :param cache: Cache to get the response from, if it was read before (optional).
+        :type cache: pyspextools.io.ogip.ResponseCache
         """
         message.proc_start("Read RMF response matrix")
-        stat = self.resp.read(rmffile)
+        if cache is not None:
+            resp = cache.rmf(rmffile)
+            if isinstance(resp, Rmf):
+                self.resp = resp
+                stat = 0
+            else:
+                stat = 1
+        else:
+            stat = self.resp.read(rmffile)
         if stat != 0:
             message.proc_end(stat)
             message.error("Unable to read RMF/RSP file.")
@@ -342,16 +439,26 @@ class OGIPRegion(Region):
     # Read an OGIP arf file
     # -----------------------------------------------------
 
-    def read_arf(self, arffile):
+    def read_arf(self, arffile, cache=None):
         """Read arf file containing the effective area.
 
         :param arffile: ARF file name to read.
         :type arffile: str
+        :param cache: Cache to get the effective area from, if it was read before (optional).
+        :type cache: pyspextools.io.ogip.ResponseCache
         """
 
         if arffile is not None:
             message.proc_start("Read ARF effective area")
-            stat = self.area.read(arffile)
+            if cache is not None:
+                area = cache.arf(arffile)
+                if isinstance(area, Arf):
+                    self.area = area
+                    stat = 0
+                else:
+                    stat = 1
+            else:
+                stat = self.area.read(arffile)
             if stat != 0:
                 message.proc_end(stat)
                 message.error("Unable to read ARF file.")
@@ -425,30 +532,29 @@ class OGIPRegion(Region):
 
         # Check the OGIP response object
         # Check the channel indices for the first group with useful data
-        # Find such a group first in OGIP response:
-        i = 0
-        while True:
-            # Find an energy bin with at least one response group.
-            if self.resp.matrix[ext].NumberGroups[i] == 0:
-                i = i + 1
-            else:
-                break
+        # Find an energy bin with at least one response group in the OGIP response:
+        nonzero = np.flatnonzero(self.resp.matrix[ext].NumberGroups)
+        if nonzero.size == 0:
+            message.warning("No response groups found in matrix extension. Not auto-detecting shifts.")
+            return 1
+        i = nonzero[0]
 
         # Save the energy boundaries and calculate the average model energy for the group
         elow = self.resp.matrix[ext].LowEnergy[i]
         ehigh = self.resp.matrix[ext].HighEnergy[i]
         target_energy = (elow + ehigh) / 2.0
 
-        # For this group, save the first channel of the group (F_CHAN)
-        fchan = self.resp.matrix[ext].FirstChannelGroup[i]
+        # For this group, save the first channel of the group (F_CHAN). Since all previous energy bins
+        # have no groups, this is the first group in the matrix.
+        fchan = self.resp.matrix[ext].FirstChannelGroup[0]
 
         # Find the array index for this channel number
-        j = 0
-        while True:
-            if self.resp.ebounds.Channel[j] != fchan:
-                j = j + 1
-            else:
-                break
+        ebounds = EnergyIndex(self.resp.ebounds.ChannelLowEnergy, self.resp.ebounds.ChannelHighEnergy,
+                              numbers=self.resp.ebounds.Channel)
+        j = ebounds.number_row(fchan)
+        if j < 0:
+            message.warning("Channel {0} not found in the EBOUNDS extension. Not auto-detecting shifts.".format(fchan))
+            return 1
 
         # For this array index, the corresponding channel energy boundaries should be:
         lchan = self.resp.ebounds.ChannelLowEnergy[j]
@@ -456,21 +562,17 @@ class OGIPRegion(Region):
         target_channel = (lchan + hchan) / 2.0
 
         # Now find the same group and channel in the SPEX format objects
-        # Find the group in the res object for the same model energy bin (with target_energy):
-        s = 0
-        while True:
-            if self.res.eg1[s] < target_energy and self.res.eg2[s] > target_energy:
-                break
-            else:
-                s = s + 1
+        # Find the group in the res object for the same model energy bin (with target_energy).
+        # Every matrix extension is a separate component in the res object.
+        icomp = ext + 1 if ext < self.res.neg.size else 1
+        s = self.res.energy_index(icomp).energy_row(target_energy)
 
         # Find the target channel number in spo file
-        t = 0
-        while True:
-            if self.spo.echan1[t] < target_channel and self.spo.echan2[t] > target_channel:
-                break
-            else:
-                t = t + 1
+        t = self.spo.energy_index(1).energy_row(target_channel)
+
+        if s < 0 or t < 0:
+            message.warning("Could not match the response group to the channel grid. Not auto-detecting shifts.")
+            return 1
 
         # Corresponding first channel of this group according to SPEX format
         ic1 = self.res.ic1[s]
@@ -606,3 +708,201 @@ class OGIPRegion(Region):
             print("")
 
         print("===========================================================")
+
+
+# =========================================================
+# Load OGIP files concurrently
+# =========================================================
+
+def load_ogip_files(phafile, rmffile, bkgfile=None, arffile=None, corrfile=None, force_poisson=False, cache=None,
+                    workers=None):
+    """Read the OGIP files of a region concurrently on a thread pool. Most of the read time is spent in file
+    I/O, gzip decompression and FITS parsing of independent files, which can overlap. The response matrix,
+    usually the largest file, is started first. The method returns a dictionary with the keys spec, back,
+    corr, resp and area. The values are the read objects, None if the file was not given, or the error code or
+    exception if reading the file failed.
+
+    :param phafile: Name of the PHA file to read.
+    :type phafile: str
+    :param rmffile: Name of the RMF file to read.
+    :type rmffile: str
+    :param bkgfile: Name of the background PHA file to read (optional).
+    :type bkgfile: str
+    :param arffile: Name of the ARF file to read (optional).
+    :type arffile: str
+    :param corrfile: Name of the Correction file to read (optional).
+    :type corrfile: str
+    :param force_poisson: Force the calculation of Poisson errors (default: False)
+    :type force_poisson: bool
+    :param cache: Cache for the RMF and ARF files (optional).
+    :type cache: pyspextools.io.ogip.ResponseCache
+    :param workers: Maximum number of threads (default: one per file).
+    :type workers: int
+    """
+
+    inputs = [('resp', rmffile, Rmf, {}),
+              ('area', arffile, Arf, {}),
+              ('spec', phafile, Pha, {'force_poisson': force_poisson}),
+              ('back', bkgfile, Pha, {'force_poisson': force_poisson}),
+              ('corr', corrfile, Pha, {})]
+
+    files = {'spec': None, 'back': None, 'corr': None, 'resp': None, 'area': None}
+
+    keys = []
+    tasks = []
+    for (key, filename, objtype, kwargs) in inputs:
+        if filename is None:
+            continue
+        keys.append(key)
+        tasks.append((__read_ogip_file, (filename, objtype, kwargs, cache), {}))
+
+    results = parallel.run_tasks(tasks, workers=workers)
+
+    for (key, result) in zip(keys, results):
+        files[key] = result
+
+    return files
+
+
+def __read_ogip_file(filename, objtype, kwargs, cache):
+    """Read one OGIP file and return the object, or the error code if reading failed.
+
+    :param filename: Name of the file to read.
+    :type filename: str
+    :param objtype: Class of the object (Pha, Rmf or Arf).
+    :type objtype: class
+    :param kwargs: Keyword arguments for the read method.
+    :type kwargs: dict
+    :param cache: Cache for the RMF and ARF files (optional).
+    :type cache: pyspextools.io.ogip.ResponseCache
+    """
+
+    if cache is not None and objtype is Rmf:
+        return cache.rmf(filename)
+    if cache is not None and objtype is Arf:
+        return cache.arf(filename)
+
+    obj = objtype()
+    stat = obj.read(filename, **kwargs)
+    if stat != 0:
+        return stat
+
+    return obj
+
+
+# =========================================================
+# Find companion files and cache responses
+# =========================================================
+
+def find_companion_files(phafile, header=None):
+    """Find the background, response, effective area and correction files of a PHA spectrum from the
+    BACKFILE, RESPFILE, ANCRFILE and CORRFILE keywords in the SPECTRUM extension. Relative file names
+    are resolved relative to the directory of the PHA file. The method returns a dictionary with the keys
+    bkgfile, rmffile, arffile and corrfile. Keywords that are missing, set to 'none' or refer to files that
+    do not exist are returned as None.
+
+    :param phafile: Name of the PHA file.
+    :type phafile: str
+    :param header: Header of the SPECTRUM extension, if already read (optional).
+    :type header: astropy.io.fits.Header
+    """
+
+    if header is None:
+        try:
+            header = fits.getheader(phafile, 'SPECTRUM')
+        except (OSError, KeyError):
+            message.error("Could not read the SPECTRUM extension of {0}.".format(phafile))
+            return 1
+
+    files = {}
+    for (name, keyword) in companion_keywords:
+        value = header.get(keyword)
+        if value is None or str(value).strip().lower() in ('', 'none'):
+            files[name] = None
+            continue
+
+        filename = str(value).strip()
+        if not os.path.isabs(filename):
+            filename = os.path.join(os.path.dirname(phafile), filename)
+
+        if os.path.isfile(filename):
+            files[name] = filename
+        else:
+            message.warning("File {0} from the {1} keyword in {2} not found.".format(filename, keyword, phafile))
+            files[name] = None
+
+    return files
+
+
+class ResponseCache:
+    """Cache for RMF and ARF objects, such that responses that are shared by many spectra are read only once.
+    The least recently used objects are removed when the cache is full. The objects in the cache are shared,
+    so they should not be modified by the user.
+
+    :ivar maxsize: Maximum number of objects in the cache.
+    :vartype maxsize: int
+    :ivar hits: Number of times an object was found in the cache.
+    :vartype hits: int
+    :ivar misses: Number of times an object had to be read from file.
+    :vartype misses: int
+    """
+
+    def __init__(self, maxsize=8):
+        """Initialize an empty response cache.
+
+        :param maxsize: Maximum number of objects in the cache.
+        :type maxsize: int
+        """
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.__objects = collections.OrderedDict()
+        self.__lock = threading.Lock()
+
+    def rmf(self, rmffile):
+        """Return the Rmf object for a file, reading it only if it is not in the cache.
+
+        :param rmffile: RMF file name.
+        :type rmffile: str
+        """
+        return self.__get(rmffile, Rmf)
+
+    def arf(self, arffile):
+        """Return the Arf object for a file, reading it only if it is not in the cache.
+
+        :param arffile: ARF file name.
+        :type arffile: str
+        """
+        return self.__get(arffile, Arf)
+
+    def __get(self, filename, objtype):
+        """Return an object from the cache, or read it and add it to the cache.
+
+        :param filename: File name of the object.
+        :type filename: str
+        :param objtype: Class of the object (Rmf or Arf).
+        :type objtype: class
+        """
+
+        key = (objtype.__name__, os.path.realpath(filename))
+
+        # The cache can be used from several threads, so the bookkeeping is protected by a lock.
+        # Files are read outside the lock, such that different files can be read in parallel.
+        with self.__lock:
+            if key in self.__objects:
+                self.hits = self.hits + 1
+                self.__objects.move_to_end(key)
+                return self.__objects[key]
+            self.misses = self.misses + 1
+
+        obj = objtype()
+        stat = obj.read(filename)
+        if stat != 0:
+            return 1
+
+        with self.__lock:
+            self.__objects[key] = obj
+            if len(self.__objects) > self.maxsize:
+                self.__objects.popitem(last=False)
+
+        return obj
@@ -3,6 +3,7 @@
 import pyspextools.messages as message
 import numpy as np
 import math
+import copy
 import astropy.io.fits as fits
 
 from .pha import Pha
@@ -155,6 +156,8 @@ class Pha2:
 
     def combine_orders(self, grating):
         """Combine the orders for spectra from the same grating (1 = HETG, 2 = METG, 3 = LETG).
+        The spectra in the Pha2 object are not changed, such that the orders of each grating can be
+        combined from the same object.
 
         :param grating: Grating number to combine the orders for.
         :type grating: int
@@ -172,7 +175,7 @@ class Pha2:
             return 1
 
         # Create new PHA file to output (set first row as default).
-        srcpha = self.phalist[tocombine[0]]
+        srcpha = copy.deepcopy(self.phalist[tocombine[0]])
         bkgpha = Pha()
         bkgpha.StatError = np.zeros(srcpha.DetChans, dtype=float)
 
@@ -24,6 +24,7 @@ import numpy as np
 from pyspextools.io.spo import Spo
 from pyspextools.io.res import Res
 import pyspextools.messages as message
+import pyspextools.parallel as parallel
 
 
 # =========================================================
@@ -84,6 +85,25 @@ class Region:
         for i in np.arange(self.res.region.size):
             self.res.region[i] = self.res.region[i] + amount
 
+    def del_components(self, icomps):
+        """Remove response components from this region. Component numbers start at 1.
+
+        :param icomps: List of component numbers to be removed.
+        :type icomps: list
+        """
+
+        return self.res.del_components(icomps)
+
+    def merge_components(self, icomps):
+        """Replace response components of this region by a single component with the summed response.
+        Component numbers start at 1.
+
+        :param icomps: List of component numbers to be merged.
+        :type icomps: list
+        """
+
+        return self.res.merge_components(icomps)
+
     def check(self, nregion=False):
         """Check whether spectrum and response are compatible
         and whether the arrays really consist of one region (if nregion flag is set).
@@ -107,6 +127,30 @@ class Region:
 
         return 0
 
+    def write_files(self, spofile, resfile, exp_rate=True, overwrite=False, history=None, index=False,
+                    compress=False):
+        """Write the spectrum and response of this region to a spo and res file. The two files are
+        independent, so they are written concurrently. Errors of both writes are reported.
+
+        :param spofile: File name of the output .spo file.
+        :type spofile: str
+        :param resfile: File name of the output .res file.
+        :type resfile: str
+        :param exp_rate: Write an EXP_RATE column or not.
+        :type exp_rate: bool
+        :param overwrite: Should we overwrite existing files?
+        :type overwrite: bool
+        :param history: History information.
+        :type history: List/Array of strings
+        :param index: Write a component offset index to the res file.
+        :type index: bool
+        :param compress: Write gzip compressed files (True or a compression level from 1 to 9).
+        :type compress: bool or int
+        """
+
+        return write_spo_res(self.spo, self.res, spofile, resfile, exp_rate=exp_rate, overwrite=overwrite,
+                             history=history, index=index, compress=compress)
+
     def show(self, isector=1, iregion=1):
         """Show a summary of the region metadata.
 
@@ -126,3 +170,44 @@ class Region:
 
         print(" --------------------  Response  -------------------------")
         self.res.show(isector=isector, iregion=iregion)
+
+
+def write_spo_res(spo, res, spofile, resfile, exp_rate=True, overwrite=False, history=None, index=False,
+                  compress=False):
+    """Write a spo and res object to file concurrently on a thread pool. Most of the write time is spent in
+    FITS encoding and file I/O, which can overlap for the two independent files. Returns 0 if both files were
+    written successfully.
+
+    :param spo: Spo object to write.
+    :type spo: pyspextools.io.Spo
+    :param res: Res object to write.
+    :type res: pyspextools.io.Res
+    :param spofile: File name of the output .spo file.
+    :type spofile: str
+    :param resfile: File name of the output .res file.
+    :type resfile: str
+    :param exp_rate: Write an EXP_RATE column or not.
+    :type exp_rate: bool
+    :param overwrite: Should we overwrite existing files?
+    :type overwrite: bool
+    :param history: History information.
+    :type history: List/Array of strings
+    :param index: Write a component offset index to the res file.
+    :type index: bool
+    :param compress: Write gzip compressed files (True or a compression level from 1 to 9).
+    :type compress: bool or int
+    """
+
+    tasks = [(spo.write_file, (spofile,), {'exp_rate': exp_rate, 'overwrite': overwrite, 'history': history,
+                                            'compress': compress}),
+             (res.write_file, (resfile,), {'overwrite': overwrite, 'history': history, 'index': index,
+                                           'compress': compress})]
+
+    results = parallel.run_tasks(tasks)
+
+    nfail = parallel.report_failures(results, ["Writing SPO file {0} failed.".format(spofile),
+                                               "Writing RES file {0} failed.".format(resfile)])
+    if nfail != 0:
+        return 1
+
+    return 0
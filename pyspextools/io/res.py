@@ -17,9 +17,11 @@
 # =========================================================
 
 import pyspextools.messages as message
+from .index import ChannelIndex, EnergyIndex
 import astropy.io.fits as fits
 import numpy as np
 import datetime
+import gzip
 import math
 import os
 
@@ -90,6 +92,9 @@ class Res:
 
     :ivar swap: Should the channel order be swapped?
     :vartype swap: bool
+
+    :ivar lazy: Are columns loaded from a memory-mapped file when first used?
+    :vartype lazy: bool
     """
 
     def __init__(self):
@@ -133,6 +138,35 @@ class Res:
         # Should channel order be swapped?
         self.swap = False
 
+        # Lazy loading of columns from a memory-mapped file
+        self.lazy = False
+        self._lazyfile = None
+        self._lazycols = {}
+
+        # Cached channel-major index and the arrays it was built from
+        self._chanindex = None
+        self._chanindex_arrays = None
+
+        # Cached energy indices for each component and the arrays they were built from
+        self._energyindex = {}
+        self._energyindex_arrays = None
+
+    # -----------------------------------------------------
+    # Load a lazy column from the memory-mapped file on first use
+    # -----------------------------------------------------
+
+    def __getattr__(self, name):
+        """Load a column of a lazily read .res file when it is first used."""
+        lazycols = self.__dict__.get('_lazycols')
+        if not lazycols or name not in lazycols:
+            raise AttributeError("'Res' object has no attribute '{0}'".format(name))
+
+        (extname, colname) = lazycols.pop(name)
+        value = self._lazyfile[extname].data[colname]
+        setattr(self, name, value)
+
+        return value
+
     # -----------------------------------------------------
     # Function to add a response from another region
     # -----------------------------------------------------
@@ -219,18 +253,214 @@ class Res:
         :type iregion: int
         """
 
-        stat = self.get_mask(isector, iregion)
-        if stat != 0:
-            print("Error: Cannot remove region.")
+        return self.del_regions([(isector, iregion)])
+
+    # -----------------------------------------------------
+    # Function to remove a list of regions from a response
+    # -----------------------------------------------------
+
+    def del_regions(self, regions):
+        """Remove several regions at once. The components, groups and response elements of all
+        regions in the list are marked first, after which all columns are compacted in a single pass.
+        Region numbers refer to the numbering before the deletion.
+
+        :param regions: List of (sector, region) combinations to be removed.
+        :type regions: list
+        """
+
+        regions = np.unique(np.array(regions, dtype=int).reshape(-1, 2), axis=0)
+
+        # Mark the rows in SPEX_RESP_ICOMP that belong to the regions to be removed
+        mask_icomp = np.zeros(self.neg.size, dtype=bool)
+        for isector, iregion in regions:
+            select = (self.sector == isector) & (self.region == iregion)
+            if not np.any(select):
+                message.error("Requested sector {0} and region {1} not available.".format(isector, iregion))
+                print("Error: Cannot remove region.")
+                return -1
+            mask_icomp = mask_icomp | select
+
+        self.__remove_components(mask_icomp)
+
+        # Fix the region numbers: every removed region shifts the trailing regions down by one
+        removed = np.sort(regions[:, 1])
+        self.region = self.region - np.searchsorted(removed, self.region, side='left')
+
+        self.nregion = self.nregion - regions.shape[0]
+
+        return 0
+
+    # -----------------------------------------------------
+    # Function to remove a list of components from a response
+    # -----------------------------------------------------
+
+    def del_components(self, icomps):
+        """Remove response components. The components, groups and response elements are compacted in a single
+        pass. Component numbers start at 1 and refer to the numbering before the deletion. All regions must
+        keep at least one component.
+
+        :param icomps: List of component numbers to be removed.
+        :type icomps: list
+        """
+
+        icomps = np.unique(np.array(icomps, dtype=int))
+        if icomps.size == 0:
+            return 0
+
+        if icomps[0] < 1 or icomps[-1] > self.neg.size:
+            message.error("Requested component number is not available.")
+            return -1
+
+        mask_icomp = np.zeros(self.neg.size, dtype=bool)
+        mask_icomp[icomps - 1] = True
+
+        # Check that no region loses all its components
+        keys = self.sector * (np.amax(self.region) + 1) + self.region
+        if np.unique(keys[~mask_icomp]).size != np.unique(keys).size:
+            message.error("Cannot remove all components of a region.")
+            return -1
+
+        self.__remove_components(mask_icomp)
+
+        return 0
+
+    # -----------------------------------------------------
+    # Function to merge components into a single component
+    # -----------------------------------------------------
+
+    def merge_components(self, icomps):
+        """Replace a list of components by a single component with the summed response. The components must
+        belong to the same sector and region and have the same number of channels. The responses are summed
+        on a common energy grid, which contains all the group boundaries of the components. Groups are then
+        derived again from the runs of consecutive channels in every energy bin. The merged component takes the
+        place of the first component in the list. Component numbers start at 1.
+
+        :param icomps: List of component numbers to be merged.
+        :type icomps: list
+        """
+
+        icomps = np.unique(np.array(icomps, dtype=int))
+        if icomps.size < 2:
+            message.error("At least two components are needed for a merge.")
+            return -1
+
+        if icomps[0] < 1 or icomps[-1] > self.neg.size:
+            message.error("Requested component number is not available.")
+            return -1
+
+        sel = icomps - 1
+        if np.unique(self.sector[sel]).size != 1 or np.unique(self.region[sel]).size != 1:
+            message.error("Only components of the same sector and region can be merged.")
+            return -1
+
+        if np.unique(self.nchan[sel]).size != 1:
+            message.error("Only components with the same number of channels can be merged.")
             return -1
 
-        mask = np.invert(self.mask_resp)
+        mask_icomp = np.zeros(self.neg.size, dtype=bool)
+        mask_icomp[sel] = True
+        mask_group = np.repeat(mask_icomp, self.neg)
+        mask_resp = np.repeat(mask_group, self.nc)
+
+        eg1 = self.eg1[mask_group]
+        eg2 = self.eg2[mask_group]
+        ic1 = self.ic1[mask_group]
+        nc = self.nc[mask_group]
+
+        # The relative area of the groups is included in the summed response
+        resp = np.array(self.resp[mask_resp], dtype=float)
+        if self.resp_der:
+            dresp = np.array(self.dresp[mask_resp], dtype=float)
+        if self.area_scal:
+            relarea = np.repeat(self.relarea[mask_group], nc)
+            resp = resp * relarea
+            if self.resp_der:
+                dresp = dresp * relarea
+
+        # Common energy grid and the range of energy bins covered by every group
+        bounds = np.unique(np.concatenate((eg1, eg2)))
+        b1 = np.searchsorted(bounds, eg1)
+        nsub = np.searchsorted(bounds, eg2) - b1
+
+        # Channel number of every response element
+        elgroup = np.repeat(np.arange(nc.size), nc)
+        estart = np.cumsum(nc) - nc
+        chan = ic1[elgroup] + np.arange(elgroup.size) - estart[elgroup]
+
+        # Copy every element to all the energy bins of its group. The response of a group is an effective area,
+        # so the sub-bins of a group have the same response as the group itself.
+        elsub = nsub[elgroup]
+        elem = np.repeat(np.arange(elgroup.size), elsub)
+        ebin = b1[elgroup][elem] + np.arange(elem.size) - np.repeat(np.cumsum(elsub) - elsub, elsub)
+
+        # Sum the elements with the same energy bin and channel
+        nchan = int(self.nchan[sel[0]])
+        keys = ebin.astype(np.int64) * (nchan + 1) + chan[elem]
+        (ukeys, inverse) = np.unique(keys, return_inverse=True)
+        mresp = np.bincount(inverse, weights=resp[elem], minlength=ukeys.size)
+        if self.resp_der:
+            mdresp = np.bincount(inverse, weights=dresp[elem], minlength=ukeys.size)
+        ubin = ukeys // (nchan + 1)
+        uchan = ukeys % (nchan + 1)
+
+        # New groups start at a new energy bin or after a gap in the channels
+        start = np.ones(ukeys.size, dtype=bool)
+        start[1:] = (ubin[1:] != ubin[:-1]) | (uchan[1:] != uchan[:-1] + 1)
+        first = np.where(start)[0]
+        mnc = np.diff(np.append(first, ukeys.size))
+        mic1 = uchan[first]
+
+        # Reassemble the arrays: the components before the first merged component, the merged component
+        # and the remaining components.
+        icomp = np.arange(self.neg.size)
+        before = (icomp < sel[0]) & ~mask_icomp
+        after = (icomp > sel[0]) & ~mask_icomp
+        gbefore = np.repeat(before, self.neg)
+        gafter = np.repeat(after, self.neg)
+        rbefore = np.repeat(gbefore, self.nc)
+        rafter = np.repeat(gafter, self.nc)
+
+        self.resp = np.concatenate((self.resp[rbefore], mresp.astype(self.resp.dtype), self.resp[rafter]))
+        if self.resp_der:
+            self.dresp = np.concatenate((self.dresp[rbefore], mdresp.astype(self.dresp.dtype), self.dresp[rafter]))
+
+        self.eg1 = np.concatenate((self.eg1[gbefore], bounds[ubin[first]].astype(self.eg1.dtype), self.eg1[gafter]))
+        self.eg2 = np.concatenate((self.eg2[gbefore], bounds[ubin[first] + 1].astype(self.eg2.dtype),
+                                   self.eg2[gafter]))
+        self.ic1 = np.concatenate((self.ic1[gbefore], mic1.astype(self.ic1.dtype), self.ic1[gafter]))
+        self.ic2 = np.concatenate((self.ic2[gbefore], (mic1 + mnc - 1).astype(self.ic2.dtype), self.ic2[gafter]))
+        self.nc = np.concatenate((self.nc[gbefore], mnc.astype(self.nc.dtype), self.nc[gafter]))
+        if self.area_scal:
+            self.relarea = np.concatenate((self.relarea[gbefore], np.ones(mnc.size, dtype=self.relarea.dtype),
+                                           self.relarea[gafter]))
+
+        merged = sel[:1]
+        self.nchan = np.concatenate((self.nchan[before], self.nchan[merged], self.nchan[after]))
+        self.neg = np.concatenate((self.neg[before], np.array([mnc.size], dtype=self.neg.dtype), self.neg[after]))
+        self.sector = np.concatenate((self.sector[before], self.sector[merged], self.sector[after]))
+        self.region = np.concatenate((self.region[before], self.region[merged], self.region[after]))
+        if self.share_comp:
+            self.shcomp = np.concatenate((self.shcomp[before], self.shcomp[merged], self.shcomp[after]))
+
+        self.ncomp = self.neg.size
+
+        return 0
+
+    def __remove_components(self, mask_icomp):
+        """Remove the components marked in mask_icomp, together with their groups and response elements."""
+
+        # Propagate the component selection to the groups and the response elements
+        mask_group = np.repeat(mask_icomp, self.neg)
+        mask_resp = np.repeat(mask_group, self.nc)
+
+        # Remove response values in SPEX_RESP_RESP
+        mask = np.invert(mask_resp)
         self.resp = self.resp[mask]
         if self.resp_der:
             self.dresp = self.dresp[mask]
 
         # Remove groups in SPEX_RESP_GROUP
-        mask = np.invert(self.mask_group)
+        mask = np.invert(mask_group)
         self.eg1 = self.eg1[mask]
         self.eg2 = self.eg2[mask]
         self.ic1 = self.ic1[mask]
@@ -239,8 +469,8 @@ class Res:
         if self.area_scal:
             self.relarea = self.relarea[mask]
 
-        # Remove groups in SPEX_RESP_ICOMP
-        mask = np.invert(self.mask_icomp)
+        # Remove components in SPEX_RESP_ICOMP
+        mask = np.invert(mask_icomp)
         self.nchan = self.nchan[mask]
         self.neg = self.neg[mask]
         self.sector = self.sector[mask]
@@ -248,33 +478,32 @@ class Res:
         if self.share_comp:
             self.shcomp = self.shcomp[mask]
 
-        # Fix the number of regions and sectors
-        icomp_trailing_rows = np.where(self.region > iregion)[0]
-        for i in icomp_trailing_rows:
-            self.region[i] = self.region[i] - 1
-
-        self.nregion = self.nregion - 1
-
-        return 0
+        self.ncomp = self.neg.size
 
     # -----------------------------------------------------
     # Function to read a response from a .res file
     # -----------------------------------------------------
 
-    def read_file(self, resfile):
-        """Function to read a response from a .res file.
+    def read_file(self, resfile, lazy=False):
+        """Function to read a response from a .res file. In lazy mode, the file is memory-mapped and
+        the columns are only read from disk when they are first used. Call the load method to read all
+        remaining columns into memory.
 
         :param resfile: Response filename to be read.
         :type resfile: str
+        :param lazy: Memory-map the file and load the columns when they are first used?
+        :type lazy: bool
         """
 
         # The filename is saved in the data object for reference.
         self.resname = resfile
 
         # Open the .res file with astropy.io.fits 
-        resfile = fits.open(self.resname)
+        if lazy:
+            resfile = fits.open(self.resname, memmap=True)
+        else:
+            resfile = fits.open(self.resname)
 
-        table = resfile['SPEX_RESP_ICOMP'].data
         header = resfile['SPEX_RESP_ICOMP'].header
 
         # Read number of sectors, regions and components
@@ -286,48 +515,223 @@ class Res:
         self.area_scal = header['AREASCAL']
         self.resp_der = header['RESPDER']
 
-        self.nchan = table['NCHAN']
-        self.neg = table['NEG']
-        self.sector = table['SECTOR']
-        self.region = table['REGION']
+        # Columns in SPEX_RESP_ICOMP
+        columns = {'nchan': ('SPEX_RESP_ICOMP', 'NCHAN'),
+                   'neg': ('SPEX_RESP_ICOMP', 'NEG'),
+                   'sector': ('SPEX_RESP_ICOMP', 'SECTOR'),
+                   'region': ('SPEX_RESP_ICOMP', 'REGION')}
         if self.share_comp:
-            self.shcomp = table['SHCOMP']
+            columns['shcomp'] = ('SPEX_RESP_ICOMP', 'SHCOMP')
+
+        # Group indices from SPEX_RESP_GROUP
+        columns['eg1'] = ('SPEX_RESP_GROUP', 'EG1')
+        columns['eg2'] = ('SPEX_RESP_GROUP', 'EG2')
+        columns['ic1'] = ('SPEX_RESP_GROUP', 'IC1')
+        columns['ic2'] = ('SPEX_RESP_GROUP', 'IC2')
+        columns['nc'] = ('SPEX_RESP_GROUP', 'NC')
+        if self.area_scal:
+            columns['relarea'] = ('SPEX_RESP_GROUP', 'RELAREA')
+
+        # Response values from SPEX_RESP_RESP
+        (respcol, drespcol) = self.__response_colnames(resfile['SPEX_RESP_RESP'].header, self.resp_der)
+
+        if respcol is not None:
+            columns['resp'] = ('SPEX_RESP_RESP', respcol)
+        if drespcol is not None:
+            columns['dresp'] = ('SPEX_RESP_RESP', drespcol)
+
+        self.empty = False
+        self.lazy = lazy
+
+        if lazy:
+            # Keep the memory-mapped file open and remove the current arrays, such that
+            # the columns are read from the file when they are first used.
+            self._lazyfile = resfile
+            self._lazycols = columns
+            for name in columns.keys():
+                self.__dict__.pop(name, None)
+        else:
+            for name, (extname, colname) in columns.items():
+                setattr(self, name, resfile[extname].data[colname])
+            resfile.close()
+
+    # -----------------------------------------------------
+    # Function to read one region from a .res file
+    # -----------------------------------------------------
+
+    def read_region(self, resfile, isector, iregion):
+        """Read only the rows of one sector and region combination from a .res file. The SPEX_RESP_ICOMP
+        extension is scanned first to find the components of the region. From these, the exact row ranges
+        in the SPEX_RESP_GROUP and SPEX_RESP_RESP extensions are calculated and only those rows are read
+        from the (memory-mapped) file.
+
+        :param resfile: Response filename to be read.
+        :type resfile: str
+        :param isector: Sector number of the region to be read.
+        :type isector: int
+        :param iregion: Region number of the region to be read.
+        :type iregion: int
+        """
+
+        self.resname = resfile
+
+        resfile = fits.open(self.resname, memmap=True)
+
+        table = resfile['SPEX_RESP_ICOMP'].data
+        header = resfile['SPEX_RESP_ICOMP'].header
 
-        # Read group indices from SPEX_RESP_GROUP
+        self.share_comp = header['SHARECOM']
+        self.area_scal = header['AREASCAL']
+        self.resp_der = header['RESPDER']
 
-        table = resfile['SPEX_RESP_GROUP'].data
+        # Find the components of the region in SPEX_RESP_ICOMP
+        neg = np.array(table['NEG'], dtype=int)
+        select = np.where((table['SECTOR'] == isector) & (table['REGION'] == iregion))[0]
+        if select.size == 0:
+            print("Error: Requested sector and region not available")
+            resfile.close()
+            return -1
 
-        self.eg1 = table['EG1']
-        self.eg2 = table['EG2']
-        self.ic1 = table['IC1']
-        self.ic2 = table['IC2']
-        self.nc = table['NC']
+        self.nchan = np.array(table['NCHAN'][select])
+        self.neg = neg[select]
+        self.sector = np.array(table['SECTOR'][select])
+        self.region = np.array(table['REGION'][select])
+        if self.share_comp:
+            self.shcomp = np.array(table['SHCOMP'][select])
+
+        # Row ranges of the components in SPEX_RESP_GROUP and SPEX_RESP_RESP
+        (group_rows, resp_rows) = self.__component_rows(resfile, neg, select)
+
+        # Read the selected rows from SPEX_RESP_GROUP
+        group = resfile['SPEX_RESP_GROUP'].data
+        self.eg1 = self.__read_rows(group['EG1'], group_rows)
+        self.eg2 = self.__read_rows(group['EG2'], group_rows)
+        self.ic1 = self.__read_rows(group['IC1'], group_rows)
+        self.ic2 = self.__read_rows(group['IC2'], group_rows)
+        self.nc = self.__read_rows(group['NC'], group_rows)
         if self.area_scal:
-            self.relarea = table['RELAREA']
+            self.relarea = self.__read_rows(group['RELAREA'], group_rows)
+
+        # Read the selected rows from SPEX_RESP_RESP
+        (respcol, drespcol) = self.__response_colnames(resfile['SPEX_RESP_RESP'].header, self.resp_der)
+        resp = resfile['SPEX_RESP_RESP'].data
+        if respcol is not None:
+            self.resp = self.__read_rows(resp[respcol], resp_rows)
+        if drespcol is not None:
+            self.dresp = self.__read_rows(resp[drespcol], resp_rows)
+
+        resfile.close()
+
+        self.ncomp = self.neg.size
+        self.nsector = 1
+        self.nregion = 1
+        self.empty = False
+        self.lazy = False
+
+        return self.check()
+
+    def __component_rows(self, resfile, neg, select):
+        """Calculate the row ranges of the selected components in the SPEX_RESP_GROUP and SPEX_RESP_RESP
+        extensions. If the file contains a SPEX_RESP_INDEX extension, the row ranges are taken from there.
+        Otherwise, the NC column is read up to the last selected group to find the response rows.
+
+        :param resfile: Opened .res file.
+        :type resfile: astropy.io.fits.HDUList
+        :param neg: Number of groups for every component in the file.
+        :type neg: numpy.ndarray
+        :param select: Indices of the selected components.
+        :type select: numpy.ndarray
+        """
+
+        # Use the component offset index if the file has one
+        names = [hdu.name for hdu in resfile]
+        if 'SPEX_RESP_INDEX' in names:
+            table = resfile['SPEX_RESP_INDEX'].data
+            if table['GROUP_START'].size == neg.size:
+                # The end of a component is the start of the next one, or the end of the table
+                gfirst = np.append(table['GROUP_START'], resfile['SPEX_RESP_GROUP'].header['NAXIS2'])
+                rfirst = np.append(table['RESP_START'], resfile['SPEX_RESP_RESP'].header['NAXIS2'])
+                group_rows = np.column_stack((gfirst[select], gfirst[select + 1]))
+                resp_rows = np.column_stack((rfirst[select], rfirst[select + 1]))
+                return group_rows, resp_rows
+            message.warning("Component index does not match SPEX_RESP_ICOMP. Ignoring the index.")
+
+        # First group row of every component
+        gfirst = np.cumsum(neg) - neg
+        group_rows = np.column_stack((gfirst[select], gfirst[select] + neg[select]))
+
+        # First response row of every selected group range
+        nc = resfile['SPEX_RESP_GROUP'].data['NC']
+        rfirst = np.cumsum(np.append(0, nc[0:np.amax(group_rows[:, 1])]))
+        resp_rows = rfirst[group_rows]
+
+        return group_rows, resp_rows
+
+    @staticmethod
+    def __read_rows(column, rows):
+        """Copy the row ranges from a (memory-mapped) column into memory.
+
+        :param column: Table column to read from.
+        :type column: numpy.ndarray
+        :param rows: Array of (first, last) row pairs, with the last row exclusive.
+        :type rows: numpy.ndarray
+        """
+        return np.concatenate([np.array(column[r1:r2]) for (r1, r2) in rows])
+
+    @staticmethod
+    def __response_colnames(header, resp_der):
+        """Return the names of the response and response derivative columns in SPEX_RESP_RESP.
 
-        # Read response values from SPEX_RESP_RESP
+        :param header: Header of the SPEX_RESP_RESP extension.
+        :type header: astropy.io.fits.Header
+        :param resp_der: Are there response derivatives?
+        :type resp_der: bool
+        """
 
-        table = resfile['SPEX_RESP_RESP'].data
-        header = resfile['SPEX_RESP_RESP'].header
+        respcol = None
+        drespcol = None
 
         if header['TTYPE1'] == "Response":
-            self.resp = table['Response']
+            respcol = 'Response'
         elif header['TTYPE1'] == "RESP":
-            self.resp = table['RESP']
+            respcol = 'RESP'
         else:
             print("Error: Response column not found in file.")
 
-        if self.resp_der:
+        if resp_der:
             if header['TTYPE2'] == "Response_Der":
-                self.dresp = table['Response_Der']
+                drespcol = 'Response_Der'
             elif header['TTYPE2'] == "DRESP":
-                self.dresp = table['DRESP']
+                drespcol = 'DRESP'
             else:
                 print("Error: Response derivative column not found.")
 
-        self.empty = False
+        return respcol, drespcol
 
-        resfile.close()
+    # -----------------------------------------------------
+    # Function to load all the columns of a lazily read file
+    # -----------------------------------------------------
+
+    def load(self):
+        """Read all the columns of a lazily read .res file into memory and close the file.
+        This method does nothing if the file was not read in lazy mode."""
+
+        if not self.lazy:
+            return 0
+
+        for name in list(self._lazycols.keys()):
+            getattr(self, name)
+
+        # Copy the memory-mapped arrays to memory
+        for name in ['nchan', 'neg', 'sector', 'region', 'shcomp', 'eg1', 'eg2', 'ic1', 'ic2', 'nc', 'relarea',
+                     'resp', 'dresp']:
+            setattr(self, name, np.array(getattr(self, name)))
+
+        self._lazyfile.close()
+        self._lazyfile = None
+        self.lazy = False
+
+        return 0
 
     # -----------------------------------------------------
     # Function to return a region from a res object
@@ -397,8 +801,12 @@ class Res:
     # Function to write a response to a .res file
     # -----------------------------------------------------
 
-    def write_file(self, resfile, overwrite=False, history=None):
-        """Write the response information to a .res file with name 'resfile'.
+    def write_file(self, resfile, overwrite=False, history=None, index=False, compress=False):
+        """Write the response information to a .res file with name 'resfile'. Optionally, an extra
+        SPEX_RESP_INDEX extension is written with the first row of every component in the SPEX_RESP_GROUP
+        and SPEX_RESP_RESP extensions. SPEX ignores this extension, but the partial readers in this class
+        use it to seek directly to a component. With the compress option, the file is written as a gzip
+        compressed FITS file, which can be read again with read_file. Compressed files cannot be memory-mapped.
 
         :param resfile: Name of the response file to write to.
         :type resfile: str
@@ -406,6 +814,10 @@ class Res:
         :type overwrite: bool
         :param history: History information
         :type history: List/Array of strings
+        :param index: Write the component offset index extension?
+        :type index: bool
+        :param compress: Write a gzip compressed file (True or a compression level from 1 to 9)?
+        :type compress: bool or int
         """
 
         check = self.check()
@@ -479,9 +891,33 @@ class Res:
         # Combine the extentions into one list
         thdulist = fits.HDUList([prihdu, tb_icomp, tb_group, tb_resp])
 
+        # Create the SPEX_RESP_INDEX extension (optional)
+        if index:
+            group_start = np.cumsum(self.neg) - self.neg
+            resp_start = np.append(0, np.cumsum(self.nc))[group_start]
+
+            col1 = fits.Column(name='GROUP_START', format='1K', array=group_start)
+            col2 = fits.Column(name='RESP_START', format='1K', array=resp_start)
+            cols = fits.ColDefs([col1, col2])
+
+            tb_index = fits.BinTableHDU.from_columns(cols)
+            tb_index.header['EXTNAME'] = 'SPEX_RESP_INDEX'
+            tb_index.header['COMMENT'] = 'Zero-based first rows of the components in SPEX_RESP_GROUP and SPEX_RESP_RESP'
+            thdulist.append(tb_index)
+
         # Write hdulist to file
+        if compress and os.path.exists(resfile) and not overwrite:
+            print("Error: File {0} already exists. I will not overwrite it!".format(resfile))
+            return 1
+
         try:
-            thdulist.writeto(resfile, overwrite=overwrite)
+            if compress:
+                # Write a gzip compressed FITS file. Astropy and SPEX decompress these transparently.
+                level = 6 if compress is True else int(compress)
+                with gzip.open(resfile, 'wb', compresslevel=level) as f:
+                    thdulist.writeto(f)
+            else:
+                thdulist.writeto(resfile, overwrite=overwrite)
         except IOError:
             print("Error: File {0} already exists. I will not overwrite it!".format(resfile))
             return 1
@@ -497,28 +933,24 @@ class Res:
         for example helpful for grating spectra, which are originally stored in wavelength order
         but must be flipped to energy order in SPEX format."""
 
-        # Loop over components to swap the channel numbers
-        n1 = 0   # Lowest channel number
-        r1 = 0   # Index of response array
+        # Number of channels of the component that each group belongs to
+        nchan = np.repeat(self.nchan, self.neg)
 
-        for i in np.arange(self.ncomp):
-            n2 = n1 + self.neg[i]
-            for j in (n1 + np.arange(self.neg[i])):
-                # Update group definition
-                ic2 = self.nchan[i] - self.ic1[j] + 1
-                ic1 = self.nchan[i] - self.ic2[j] + 1
+        # Update group definition
+        ic1 = nchan - self.ic2 + 1
+        ic2 = nchan - self.ic1 + 1
 
-                self.ic1[j] = ic1
-                self.ic2[j] = ic2
+        self.ic1 = ic1
+        self.ic2 = ic2
 
-                # Update response
-                r2 = r1 + self.nc[j]
-                self.resp[r1:r2] = np.flip(self.resp[r1:r2], 0)
-                if self.resp_der:
-                    self.dresp[r1:r2] = np.flip(self.dresp[r1:r2], 0)
-                r1 = r2
+        # Reverse the response values within each group with a single gather. The element at
+        # position p in a group starting at element s with nc channels moves to 2*s + nc - 1 - p.
+        start = np.cumsum(self.nc) - self.nc
+        order = np.repeat(2 * start + self.nc - 1, self.nc) - np.arange(self.resp.size)
 
-            n1 = n2 + 1
+        self.resp = self.resp[order]
+        if self.resp_der:
+            self.dresp = self.dresp[order]
 
     # -----------------------------------------------------
     # Add component to RES file
@@ -561,6 +993,47 @@ class Res:
 
         return 0
 
+    def append_components(self, reslist, iregion=1, isector=1):
+        """Append the components of a list of response objects in the order of the list. The arrays are
+        concatenated in a single pass, which avoids copying the growing response arrays for every component,
+        like repeated calls to append_component would do.
+
+        :param reslist: List of response objects to extract response information from.
+        :type reslist: list
+        :param iregion: Region number to add to the response.
+        :type iregion: int
+        :param isector: Sector number to add to the response.
+        :type isector: int
+        """
+
+        if len(reslist) == 0:
+            return 0
+
+        ncomp = sum(addres.ncomp for addres in reslist)
+
+        # Append lines to SPEX_RESP_ICOMP
+        self.nchan = np.concatenate([self.nchan] + [addres.nchan for addres in reslist])
+        self.neg = np.concatenate([self.neg] + [addres.neg for addres in reslist])
+        self.sector = np.append(self.sector, np.full(ncomp, isector, dtype=int))
+        self.region = np.append(self.region, np.full(ncomp, iregion, dtype=int))
+        if self.share_comp:
+            self.shcomp = np.concatenate([self.shcomp] + [addres.shcomp for addres in reslist])
+
+        self.ncomp = self.ncomp + ncomp
+
+        # Append response groups (SPEX_RESP_GROUP)
+        for name in ['eg1', 'eg2', 'ic1', 'ic2', 'nc']:
+            setattr(self, name, np.concatenate([getattr(self, name)] + [getattr(addres, name) for addres in reslist]))
+        if self.area_scal:
+            self.relarea = np.concatenate([self.relarea] + [addres.relarea for addres in reslist])
+
+        # Append response values (SPEX_RESP_RESP)
+        self.resp = np.concatenate([self.resp] + [addres.resp for addres in reslist])
+        if self.resp_der:
+            self.dresp = np.concatenate([self.dresp] + [addres.dresp for addres in reslist])
+
+        return 0
+
     # -----------------------------------------------------
     # Function to create a masks for a certain region
     # -----------------------------------------------------
@@ -649,16 +1122,13 @@ class Res:
             message.error("Entered shift is not an integer number. Not doing anything")
             return -1
 
-        ic1 = np.zeros(self.eg1.size, dtype=int)
-        ic2 = np.zeros(self.eg2.size, dtype=int)
+        ic1 = self.ic1 + shift
+        ic2 = self.ic2 + shift
 
-        for i in np.arange(self.eg1.size):
-            ic1[i] = self.ic1[i] + shift
-            ic2[i] = self.ic2[i] + shift
-            if ic2[i] > np.amax(self.nchan):
-                message.error("Maximum channel number is larger than actual channel range!")
-                print("Aborting shift.")
-                return -1
+        if ic2.size > 0 and np.amax(ic2) > np.amax(self.nchan):
+            message.error("Maximum channel number is larger than actual channel range!")
+            print("Aborting shift.")
+            return -1
 
         # Save the shifted channel numbers
         self.ic1 = ic1
@@ -666,6 +1136,86 @@ class Res:
 
         return 0
 
+    # -----------------------------------------------------
+    # Channel-major index of the response elements
+    # -----------------------------------------------------
+
+    def channel_index(self, rebuild=False):
+        """Return the channel-major index of the response elements (see pyspextools.io.index.ChannelIndex).
+        The index is cached and rebuilt automatically when the neg, nchan, ic1 or nc arrays are replaced.
+        If these arrays are changed in place, use rebuild=True to rebuild the index.
+
+        :param rebuild: Force a rebuild of the index.
+        :type rebuild: bool
+        """
+
+        arrays = (self.neg, self.nchan, self.ic1, self.nc)
+
+        if rebuild or self._chanindex is None or \
+                any(a is not b for (a, b) in zip(arrays, self._chanindex_arrays)):
+            self._chanindex = ChannelIndex(self.neg, self.nchan, self.ic1, self.nc)
+            self._chanindex_arrays = arrays
+
+        return self._chanindex
+
+    def channel_elements(self, channel, icomp=1):
+        """Return the groups (energy rows) and positions in the response array of all response elements
+        in a channel. The positions can be used to select the values from the resp and dresp arrays.
+
+        :param channel: Channel number (starting at 1).
+        :type channel: int
+        :param icomp: Component number (starting at 1).
+        :type icomp: int
+        """
+
+        if not 0 < icomp <= self.nchan.size:
+            message.error("Component number not found.")
+            return -1
+
+        if not 0 < channel <= self.nchan[icomp - 1]:
+            message.error("Channel number is outside the channel range of the component.")
+            return -1
+
+        index = self.channel_index()
+        (start, end) = index.rows(channel, icomp=icomp)
+
+        return index.group[start:end], index.element[start:end]
+
+    # -----------------------------------------------------
+    # Energy index of the response groups
+    # -----------------------------------------------------
+
+    def energy_index(self, icomp=1, rebuild=False):
+        """Return a binary search index for the energy groups of a component (see
+        pyspextools.io.index.EnergyIndex). The energy_row method of the index returns the
+        group number in the eg1 and eg2 arrays for a given energy. The index is cached and rebuilt
+        automatically when the neg, eg1 or eg2 arrays are replaced. If these arrays are changed in place,
+        use rebuild=True to rebuild the index.
+
+        :param icomp: Component number (starting at 1).
+        :type icomp: int
+        :param rebuild: Force a rebuild of the index.
+        :type rebuild: bool
+        """
+
+        if not 0 < icomp <= self.neg.size:
+            message.error("Component number not found.")
+            return -1
+
+        arrays = (self.neg, self.eg1, self.eg2)
+
+        if rebuild or self._energyindex_arrays is None or \
+                any(a is not b for (a, b) in zip(arrays, self._energyindex_arrays)):
+            self._energyindex = {}
+            self._energyindex_arrays = arrays
+
+        if icomp not in self._energyindex:
+            start = int(np.sum(self.neg[:icomp - 1]))
+            end = start + int(self.neg[icomp - 1])
+            self._energyindex[icomp] = EnergyIndex(self.eg1[start:end], self.eg2[start:end], offset=start)
+
+        return self._energyindex[icomp]
+
     # -----------------------------------------------------
     # Function to check the response arrays
     # -----------------------------------------------------
@@ -17,9 +17,11 @@
 # =========================================================
 
 import pyspextools.messages as message
+from .index import EnergyIndex
 import astropy.io.fits as fits
 import numpy as np
 import datetime
+import gzip
 import os
 
 
@@ -85,6 +87,9 @@ class Spo:
     :vartype mask_region: numpy.ndarray
     :ivar mask_spectrum: Mask for spectrum selection.
     :vartype mask_spectrum: numpy.ndarray
+
+    :ivar lazy: Are columns loaded from a memory-mapped file when first used?
+    :vartype lazy: bool
     """
 
     # -----------------------------------------------------
@@ -136,6 +141,31 @@ class Spo:
         self.mask_region = np.array([], dtype=bool)
         self.mask_spectrum = np.array([], dtype=bool)
 
+        # Lazy loading of columns from a memory-mapped file
+        self.lazy = False
+        self._lazyfile = None
+        self._lazycols = {}
+
+        # Cached energy indices for each region and the arrays they were built from
+        self._energyindex = {}
+        self._energyindex_arrays = None
+
+    # -----------------------------------------------------
+    # Load a lazy column from the memory-mapped file on first use
+    # -----------------------------------------------------
+
+    def __getattr__(self, name):
+        """Load a column of a lazily read .spo file when it is first used."""
+        lazycols = self.__dict__.get('_lazycols')
+        if not lazycols or name not in lazycols:
+            raise AttributeError("'Spo' object has no attribute '{0}'".format(name))
+
+        colname = lazycols.pop(name)
+        value = self._lazyfile['SPEX_SPECTRUM'].data[colname]
+        setattr(self, name, value)
+
+        return value
+
     # -----------------------------------------------------
     # Create a spo with zeros and size nchan
     # -----------------------------------------------------
@@ -195,6 +225,7 @@ class Spo:
         self.first = np.append(self.first, origspo.first[mask])
         self.last = np.append(self.last, origspo.last[mask])
 
+        self.nregion = self.nchan.size
         self.empty = False
 
     # -----------------------------------------------------
@@ -208,43 +239,57 @@ class Spo:
         :type iregion: int
         """
 
-        stat = self.get_mask(iregion)
-        if stat != 0:
+        return self.del_regions([iregion])
+
+    # -----------------------------------------------------
+    # Function to remove a list of regions from a spectrum
+    # -----------------------------------------------------
+
+    def del_regions(self, regions):
+        """Remove the spectra of several regions at once. The channels of all regions in the list
+        are marked first, after which all columns are compacted in a single pass.
+
+        :param regions: List of region numbers to delete from spo object.
+        :type regions: list
+        """
+
+        regions = np.unique(np.array(regions, dtype=int))
+
+        if np.any(regions < 1) or np.any(regions > self.nchan.size):
             print("Error: Cannot select region.")
             return -1
 
-        mask = np.invert(self.mask_region)
-        self.nchan = self.nchan[mask]
-
-        mask = np.invert(self.mask_spectrum)
-        self.echan1 = self.echan1[mask]
-        self.echan2 = self.echan2[mask]
-        self.tints = self.tints[mask]
-        self.ochan = self.ochan[mask]
-        self.dochan = self.dochan[mask]
-        self.mbchan = self.mbchan[mask]
-        self.dbchan = self.dbchan[mask]
-        self.brat = self.brat[mask]
-        self.ssys = self.ssys[mask]
-        self.bsys = self.bsys[mask]
-        self.used = self.used[mask]
-        self.first = self.first[mask]
-        self.last = self.last[mask]
-
-        self.nregion = self.nregion - 1
+        # Mark the regions in the SPEX_REGIONS extension and propagate to the channels
+        mask_region = np.zeros(self.nchan.size, dtype=bool)
+        mask_region[regions - 1] = True
+        mask_spectrum = np.repeat(mask_region, self.nchan)
+
+        self.nchan = self.nchan[np.invert(mask_region)]
+
+        mask = np.invert(mask_spectrum)
+        for name in self.anames.keys():
+            setattr(self, name, getattr(self, name)[mask])
+
+        self.nregion = self.nchan.size
 
         if self.nregion == 0:
             self.empty = True
 
+        return 0
+
     # -----------------------------------------------------
     # Function to read spectrum from a .spo file
     # -----------------------------------------------------
 
-    def read_file(self, spofile):
-        """ Function to read a spectrum from a .spo file.
+    def read_file(self, spofile, lazy=False):
+        """ Function to read a spectrum from a .spo file. In lazy mode, the file is memory-mapped and
+        the columns of the SPEX_SPECTRUM extension are only read from disk when they are first used.
+        Call the load method to read all remaining columns into memory.
 
         :param spofile: File name of .spo file.
         :type spofile: str
+        :param lazy: Memory-map the file and load the columns when they are first used?
+        :type lazy: bool
         """
 
         # The filename is saved in the data object for reference.
@@ -252,7 +297,10 @@ class Spo:
 
         # Open the .spo file with astropy.io.fits and open the table and header 
         # information in the SPEX_REGIONS extension in the FITS file.
-        spofile = fits.open(self.sponame)
+        if lazy:
+            spofile = fits.open(self.sponame, memmap=True)
+        else:
+            spofile = fits.open(self.sponame)
         table = spofile['SPEX_REGIONS'].data
         header = spofile['SPEX_REGIONS'].header
 
@@ -267,37 +315,111 @@ class Spo:
 
         # Now, we open the SPEX_SPECTRUM extension in the .spo file 
         # which contains the actual spectra.
-        table = spofile['SPEX_SPECTRUM'].data
         cols = spofile['SPEX_SPECTRUM'].columns
+        nrows = spofile['SPEX_SPECTRUM'].header['NAXIS2']
 
-        # Copy all the table columns
-        self.echan1 = table['Lower_Energy']
-        self.echan2 = table['Upper_Energy']
-        self.tints = table['Exposure_Time']
-        self.ochan = table['Source_Rate']
-        self.dochan = table['Err_Source_Rate']
-        self.mbchan = table['Back_Rate']
-        self.dbchan = table['Err_Back_Rate']
-        self.ssys = table['Sys_Source']
-        self.bsys = table['Sys_Back']
-        self.used = table['Used']
-        self.first = table['First']
-        self.last = table['Last']
-
-        for col in cols.names:
-            if col == "Exp_Rate":
-                self.brat = table['Exp_Rate']
-                self.brat_exist = True
-            else:
-                self.brat_exist = False
+        # The Exp_Rate column only exists in files written for SPEX >= 3.05.00
+        self.brat_exist = "Exp_Rate" in cols.names
+
+        columns = {}
+        for name in self.anames.keys():
+            if name == 'brat' and not self.brat_exist:
+                continue
+            columns[name] = self.anames[name]
 
         if not self.brat_exist:
-            self.brat = np.ones(self.ochan.size, dtype=float)
+            self.brat = np.ones(nrows, dtype=float)
+
+        self.empty = False
+        self.lazy = lazy
+
+        if lazy:
+            # Keep the memory-mapped file open and remove the current arrays, such that
+            # the columns are read from the file when they are first used.
+            self._lazyfile = spofile
+            self._lazycols = columns
+            for name in columns.keys():
+                self.__dict__.pop(name, None)
+        else:
+            # Copy all the table columns
+            table = spofile['SPEX_SPECTRUM'].data
+            for name, colname in columns.items():
+                setattr(self, name, table[colname])
+
+            # Close the .spo file
+            spofile.close()
+
+    # -----------------------------------------------------
+    # Function to read one region from a .spo file
+    # -----------------------------------------------------
+
+    def read_region(self, spofile, iregion):
+        """Read only the spectrum of region 'iregion' from a .spo file. The SPEX_REGIONS extension is
+        scanned first to find the row range of the region in the SPEX_SPECTRUM extension. Only those
+        rows are read from the (memory-mapped) file.
+
+        :param spofile: File name of .spo file.
+        :type spofile: str
+        :param iregion: Region number to read.
+        :type iregion: int
+        """
+
+        self.sponame = spofile
+
+        spofile = fits.open(self.sponame, memmap=True)
+        nchan = np.array(spofile['SPEX_REGIONS'].data['NCHAN'], dtype=int)
+
+        # Check if iregion is in an allowed range
+        if iregion > nchan.size or iregion < 1:
+            print("Error: Requested region not available.")
+            spofile.close()
+            return -1
+
+        # Row range of the region in the SPEX_SPECTRUM table
+        frow = np.sum(nchan[0:iregion - 1])
+        lrow = frow + nchan[iregion - 1]
+
+        self.nregion = 1
+        self.nchan = nchan[iregion - 1:iregion]
+
+        cols = spofile['SPEX_SPECTRUM'].columns
+        table = spofile['SPEX_SPECTRUM'].data
+
+        self.brat_exist = "Exp_Rate" in cols.names
+
+        for name in self.anames.keys():
+            if name == 'brat' and not self.brat_exist:
+                self.brat = np.ones(lrow - frow, dtype=float)
+            else:
+                setattr(self, name, np.array(table[self.anames[name]][frow:lrow]))
 
-        # Close the .spo file
         spofile.close()
 
         self.empty = False
+        self.lazy = False
+
+        return self.check()
+
+    # -----------------------------------------------------
+    # Function to load all the columns of a lazily read file
+    # -----------------------------------------------------
+
+    def load(self):
+        """Read all the columns of a lazily read .spo file into memory and close the file.
+        This method does nothing if the file was not read in lazy mode."""
+
+        if not self.lazy:
+            return 0
+
+        # Copy the memory-mapped arrays to memory
+        for name in self.anames.keys():
+            setattr(self, name, np.array(getattr(self, name)))
+
+        self._lazyfile.close()
+        self._lazyfile = None
+        self.lazy = False
+
+        return 0
 
     # -----------------------------------------------------
     # Function to return one spectrum for one region
@@ -324,6 +446,7 @@ class Spo:
 
         mask = self.mask_region
         sporeg.nchan = self.nchan[mask]
+        sporeg.nregion = sporeg.nchan.size
 
         mask = self.mask_spectrum
         sporeg.echan1 = self.echan1[mask]
@@ -350,11 +473,12 @@ class Spo:
     # Function to write all spectra to a .spo file
     # -----------------------------------------------------
 
-    def write_file(self, sponame, exp_rate=True, overwrite=False, history=None):
+    def write_file(self, sponame, exp_rate=True, overwrite=False, history=None, compress=False):
         """Function to write the spectrum to a .spo file with the name 'sponame'.
         The exp_rate flag determines whether the Exp_Rate column is added containing
         the ratio between the backscales of the source and background spectra. This column
-        can only be read by SPEX >=3.05.00.
+        can only be read by SPEX >=3.05.00. With the compress option, the file is written as a gzip
+        compressed FITS file, which can be read again with read_file.
 
         :param sponame: File name of the .spo file to write.
         :type sponame: str
@@ -364,6 +488,8 @@ class Spo:
         :type overwrite: bool
         :param history: History strings to be added to the file.
         :type history: str
+        :param compress: Write a gzip compressed file (True or a compression level from 1 to 9)?
+        :type compress: bool or int
         """
 
         # First check whether object is complete and consistent
@@ -428,8 +554,18 @@ class Spo:
         thdulist = fits.HDUList([prihdu, tb_regions, tb_spectrum])
 
         # Write hdulist to file
+        if compress and os.path.exists(sponame) and not overwrite:
+            print("Error: File {0} already exists. I will not overwrite it!".format(sponame))
+            return 1
+
         try:
-            thdulist.writeto(sponame, overwrite=overwrite)
+            if compress:
+                # Write a gzip compressed FITS file. Astropy and SPEX decompress these transparently.
+                level = 6 if compress is True else int(compress)
+                with gzip.open(sponame, 'wb', compresslevel=level) as f:
+                    thdulist.writeto(f)
+            else:
+                thdulist.writeto(sponame, overwrite=overwrite)
         except IOError:
             print("Error: File {0} already exists. I will not overwrite it!".format(sponame))
             return 1
@@ -450,6 +586,41 @@ class Spo:
                 inarr = getattr(self, var)
                 setattr(self, var, np.flip(inarr, 0))
 
+    # -----------------------------------------------------
+    # Energy index of the spectral channels
+    # -----------------------------------------------------
+
+    def energy_index(self, iregion=1, rebuild=False):
+        """Return a binary search index for the channels of a region (see pyspextools.io.index.EnergyIndex).
+        The energy_row method of the index returns the row in the channel arrays for a given energy, and the
+        number_row method returns the row for a channel number (starting at 1 for each region). The index is
+        cached and rebuilt automatically when the nchan, echan1 or echan2 arrays are replaced. If these arrays
+        are changed in place, use rebuild=True to rebuild the index.
+
+        :param iregion: Region number (starting at 1).
+        :type iregion: int
+        :param rebuild: Force a rebuild of the index.
+        :type rebuild: bool
+        """
+
+        if not 0 < iregion <= self.nchan.size:
+            message.error("Region number not found.")
+            return -1
+
+        arrays = (self.nchan, self.echan1, self.echan2)
+
+        if rebuild or self._energyindex_arrays is None or \
+                any(a is not b for (a, b) in zip(arrays, self._energyindex_arrays)):
+            self._energyindex = {}
+            self._energyindex_arrays = arrays
+
+        if iregion not in self._energyindex:
+            start = int(np.sum(self.nchan[:iregion - 1]))
+            end = start + int(self.nchan[iregion - 1])
+            self._energyindex[iregion] = EnergyIndex(self.echan1[start:end], self.echan2[start:end], offset=start)
+
+        return self._energyindex[iregion]
+
     # -----------------------------------------------------
     # Sanity check whether object is complete and consistent
     # -----------------------------------------------------
@@ -0,0 +1,343 @@
+#!/usr/bin/env python
+
+# =========================================================
+"""
+  Python module to read and write SPEX spectra and responses in a
+  native binary store. A store is a directory with one .npy file
+  per column and a small JSON manifest. Uncompressed columns are
+  memory-mapped when the store is opened, such that intermediate
+  pipeline products can be saved and opened without the FITS
+  encoding and decoding cost. The spo and res objects can be
+  converted exactly to and from the .spo and .res formats.
+
+  Store layout:
+
+    manifest.json      Format version, scalar values and column list
+    spo/<column>.npy   Columns of the spo object
+    res/<column>.npy   Columns of the res object
+
+  Columns can optionally be compressed with gzip (.npy.gz). Compressed
+  columns are read into memory instead of memory-mapped.
+
+  Dependencies:
+    - numpy:      Array operations and .npy files
+    - spo:        The spo class from this pyspextools data module
+    - res:        The res class from this pyspextools data module
+"""
+# =========================================================
+
+import os
+import gzip
+import json
+import numpy as np
+import pyspextools.messages as message
+
+from .spo import Spo
+from .res import Res
+
+# Version of the store format
+STORE_VERSION = 1
+
+# Scalar values to save for each object type
+spo_scalars = ['nregion', 'brat_exist', 'swap']
+res_scalars = ['nsector', 'nregion', 'ncomp', 'share_comp', 'area_scal', 'resp_der', 'swap']
+
+
+# -----------------------------------------------------
+# Column names to save for spo and res objects
+# -----------------------------------------------------
+
+def spo_columns(spo):
+    """Return the names of the columns of a spo object that are saved in a store.
+
+    :param spo: Input spo object.
+    :type spo: pyspextools.io.Spo
+    """
+    return ['nchan'] + list(spo.anames.keys())
+
+
+def res_columns(res):
+    """Return the names of the columns of a res object that are saved in a store.
+
+    :param res: Input res object.
+    :type res: pyspextools.io.Res
+    """
+    columns = ['nchan', 'neg', 'sector', 'region']
+    if res.share_comp:
+        columns.append('shcomp')
+    columns = columns + ['eg1', 'eg2', 'ic1', 'ic2', 'nc']
+    if res.area_scal:
+        columns.append('relarea')
+    columns.append('resp')
+    if res.resp_der:
+        columns.append('dresp')
+    return columns
+
+
+# -----------------------------------------------------
+# Write spo and res objects to a store
+# -----------------------------------------------------
+
+def write_store(path, spo=None, res=None, compress=None, overwrite=False):
+    """Write a spo and/or res object to a store directory. The compress option can be True to
+    compress all columns, or a list of column names (for example ['resp']) to compress only those.
+
+    :param path: Directory name of the store.
+    :type path: str
+    :param spo: Spo object to write (optional).
+    :type spo: pyspextools.io.Spo
+    :param res: Res object to write (optional).
+    :type res: pyspextools.io.Res
+    :param compress: Columns to compress with gzip (True for all columns).
+    :type compress: bool or list
+    :param overwrite: Overwrite an existing store?
+    :type overwrite: bool
+    """
+
+    if spo is None and res is None:
+        message.error("No spo or res object to write to the store.")
+        return 1
+
+    manifest_file = os.path.join(path, 'manifest.json')
+
+    if os.path.isfile(manifest_file):
+        if not overwrite:
+            message.error("Store {0} already exists. I will not overwrite it!".format(path))
+            return 1
+        # Remove the column files of the existing store
+        old = __read_manifest(path)
+        if isinstance(old, dict):
+            for part in ('spo', 'res'):
+                if part in old:
+                    for col in old[part]['columns'].values():
+                        colfile = os.path.join(path, part, col['file'])
+                        if os.path.isfile(colfile):
+                            os.remove(colfile)
+
+    manifest = {'format': 'pyspextools-store', 'version': STORE_VERSION}
+
+    if spo is not None:
+        if spo.check() != 0:
+            message.error("Spo object is not internally consistent.")
+            return 1
+        manifest['spo'] = __write_part(path, 'spo', spo, spo_scalars, spo_columns(spo), compress)
+
+    if res is not None:
+        if res.check() != 0:
+            message.error("Res object is not internally consistent.")
+            return 1
+        manifest['res'] = __write_part(path, 'res', res, res_scalars, res_columns(res), compress)
+
+    # Write the manifest last, such that an incomplete store is never valid
+    with open(manifest_file, 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    return 0
+
+
+def __write_part(path, part, obj, scalars, columns, compress):
+    """Write the columns of a spo or res object and return the manifest entry.
+
+    :param path: Directory name of the store.
+    :type path: str
+    :param part: Name of the part ('spo' or 'res').
+    :type part: str
+    :param obj: Spo or res object to write.
+    :type obj: pyspextools.io.Spo or pyspextools.io.Res
+    :param scalars: Names of the scalar values to save.
+    :type scalars: list
+    :param columns: Names of the columns to save.
+    :type columns: list
+    :param compress: Columns to compress with gzip (True for all columns).
+    :type compress: bool or list
+    """
+
+    os.makedirs(os.path.join(path, part), exist_ok=True)
+
+    entry = {'scalars': {}, 'columns': {}}
+
+    for name in scalars:
+        value = getattr(obj, name)
+        if isinstance(value, (bool, np.bool_)):
+            entry['scalars'][name] = bool(value)
+        else:
+            entry['scalars'][name] = int(value)
+
+    for name in columns:
+        array = np.asarray(getattr(obj, name))
+
+        if compress is True or (isinstance(compress, (list, tuple)) and name in compress):
+            colfile = name + '.npy.gz'
+            with gzip.open(os.path.join(path, part, colfile), 'wb') as f:
+                np.save(f, array)
+            compression = 'gzip'
+        else:
+            colfile = name + '.npy'
+            np.save(os.path.join(path, part, colfile), array)
+            compression = None
+
+        entry['columns'][name] = {'file': colfile, 'dtype': array.dtype.str, 'size': int(array.size),
+                                  'compression': compression}
+
+    return entry
+
+
+# -----------------------------------------------------
+# Read spo and res objects from a store
+# -----------------------------------------------------
+
+def read_store(path, mmap=True):
+    """Read the spo and res objects from a store directory. Uncompressed columns are memory-mapped
+    (copy-on-write) if mmap is True. The method returns a (spo, res) tuple, where a part that is not
+    in the store is None.
+
+    :param path: Directory name of the store.
+    :type path: str
+    :param mmap: Memory-map the uncompressed columns?
+    :type mmap: bool
+    """
+
+    manifest = __read_manifest(path)
+    if not isinstance(manifest, dict):
+        return 1
+
+    spo = None
+    res = None
+
+    if 'spo' in manifest:
+        spo = Spo()
+        __read_part(path, 'spo', spo, manifest['spo'], mmap)
+        spo.sponame = path
+        spo.empty = False
+
+    if 'res' in manifest:
+        res = Res()
+        __read_part(path, 'res', res, manifest['res'], mmap)
+        res.resname = path
+        res.empty = False
+
+    return spo, res
+
+
+def __read_manifest(path):
+    """Read and check the manifest of a store.
+
+    :param path: Directory name of the store.
+    :type path: str
+    """
+
+    manifest_file = os.path.join(path, 'manifest.json')
+    if not os.path.isfile(manifest_file):
+        message.error("No store manifest found in {0}.".format(path))
+        return 1
+
+    with open(manifest_file, 'r') as f:
+        manifest = json.load(f)
+
+    if manifest.get('format') != 'pyspextools-store':
+        message.error("Directory {0} does not contain a pyspextools store.".format(path))
+        return 1
+
+    if manifest.get('version', 0) > STORE_VERSION:
+        message.error("Store version {0} is not supported by this version of pyspextools.".format(
+            manifest.get('version')))
+        return 1
+
+    return manifest
+
+
+def __read_part(path, part, obj, entry, mmap):
+    """Read the scalars and columns of a part of the store into a spo or res object.
+
+    :param path: Directory name of the store.
+    :type path: str
+    :param part: Name of the part ('spo' or 'res').
+    :type part: str
+    :param obj: Spo or res object to fill.
+    :type obj: pyspextools.io.Spo or pyspextools.io.Res
+    :param entry: Manifest entry of the part.
+    :type entry: dict
+    :param mmap: Memory-map the uncompressed columns?
+    :type mmap: bool
+    """
+
+    for name, value in entry['scalars'].items():
+        setattr(obj, name, value)
+
+    for name, col in entry['columns'].items():
+        colfile = os.path.join(path, part, col['file'])
+        if col['compression'] == 'gzip':
+            with gzip.open(colfile, 'rb') as f:
+                array = np.load(f)
+        elif mmap:
+            array = np.load(colfile, mmap_mode='c')
+        else:
+            array = np.load(colfile)
+        setattr(obj, name, array)
+
+
+# -----------------------------------------------------
+# Convert between SPEX files and a store
+# -----------------------------------------------------
+
+def spex_to_store(spofile, resfile, path, compress=None, overwrite=False):
+    """Convert a .spo and .res file to a store directory.
+
+    :param spofile: File name of the input .spo file.
+    :type spofile: str
+    :param resfile: File name of the input .res file.
+    :type resfile: str
+    :param path: Directory name of the store.
+    :type path: str
+    :param compress: Columns to compress with gzip (True for all columns).
+    :type compress: bool or list
+    :param overwrite: Overwrite an existing store?
+    :type overwrite: bool
+    """
+
+    spo = Spo()
+    spo.read_file(spofile)
+
+    res = Res()
+    res.read_file(resfile)
+
+    return write_store(path, spo=spo, res=res, compress=compress, overwrite=overwrite)
+
+
+def store_to_spex(path, spofile, resfile, exp_rate=True, overwrite=False, history=None):
+    """Convert a store directory to a .spo and .res file.
+
+    :param path: Directory name of the store.
+    :type path: str
+    :param spofile: File name of the output .spo file.
+    :type spofile: str
+    :param resfile: File name of the output .res file.
+    :type resfile: str
+    :param exp_rate: Write an EXP_RATE column or not.
+    :type exp_rate: bool
+    :param overwrite: Should we overwrite existing files?
+    :type overwrite: bool
+    :param history: History information.
+    :type history: List/Array of strings
+    """
+
+    store = read_store(path)
+    if not isinstance(store, tuple):
+        return 1
+
+    (spo, res) = store
+    if spo is None or res is None:
+        message.error("Store {0} does not contain both a spectrum and a response.".format(path))
+        return 1
+
+    stat = spo.write_file(spofile, exp_rate=exp_rate, overwrite=overwrite, history=history)
+    if stat != 0:
+        message.error("Writing SPO file failed.")
+        return 1
+
+    stat = res.write_file(resfile, overwrite=overwrite, history=history)
+    if stat != 0:
+        message.error("Writing RES file failed.")
+        return 1
+
+    return 0
@@ -3,6 +3,7 @@
 import os
 import numpy as np
 import pyspextools.messages as message
+import pyspextools.parallel as parallel
 
 from .region import Region
 from .res import Res
@@ -11,7 +12,7 @@ from .pha2 import Pha2
 from .pha import Pha
 from .rmf import Rmf
 from .arf import Arf
-from .convert import rmf_to_res
+from .convert import rmfs_to_res
 from .convert import pha_to_spo
 
 
@@ -21,6 +22,8 @@ class TGRegion(Region):
 
     :ivar grating: Grating name.
     :vartype grating: str
+    :ivar orders: Grating order of each response component (for merged orders, a label like '-1+1').
+    :vartype orders: list
     """
 
     def __init__(self):
@@ -28,17 +31,21 @@ class TGRegion(Region):
         Region.__init__(self)
 
         self.grating = ''   # Grating name
+        self.orders = []    # Grating order of each response component
 
     # -----------------------------------------------------
     # Read a set of Chandra grating files into a region
     # -----------------------------------------------------
 
-    def read_region(self, pha2file, rmflist, arflist, grating, bkgsubtract=True):
+    def read_region(self, pha2file, rmflist, arflist, grating, bkgsubtract=True, workers=None, catalog=None):
         """Add a Chandra spectrum and response to a SPEX region. The pha2 file and the rmf and arf file lists
-        are mandatory. The grating option can be either HETG, METG or LETG.
+        are mandatory. The grating option can be either HETG, METG or LETG. Instead of a file name, an already
+        read Pha2 object can be provided, which avoids reading the same PHA2 file again for each grating.
+        If a response catalog is provided, the orders of the files are taken from the catalog, such that
+        the order pairs are checked before the files are read.
 
-        :param pha2file: PHA2 file name to read.
-        :type pha2file: str
+        :param pha2file: PHA2 file name to read or Pha2 object.
+        :type pha2file: str or pyspextools.io.Pha2
         :param rmflist: List of RMF response files.
         :type rmflist: list
         :param arflist: List of ARF effective area files.
@@ -47,6 +54,10 @@ class TGRegion(Region):
         :type grating: str
         :param bkgsubtract: Subtract the background?
         :type bkgsubtract: bool
+        :param workers: Number of processes to convert the orders with (default: number of orders and CPUs).
+        :type workers: int
+        :param catalog: Catalog of the response files (optional).
+        :type catalog: pyspextools.io.ResponseCatalog
         """
 
         self.grating = grating
@@ -57,10 +68,10 @@ class TGRegion(Region):
             message.error("Failed to read spectrum file.")
             return 1
 
-        # Convert the PHA2 file to spo
+        # Convert the PHA2 file to spo. Only the channel energies are needed from the response.
 
         rmf = Rmf()
-        rmf.read(rmflist[0])
+        rmf.ebounds.read(rmflist[0])
 
         self.spo = pha_to_spo(src, rmf, back=bkg)
         if not isinstance(self.spo, Spo):
@@ -68,7 +79,7 @@ class TGRegion(Region):
             return 1
 
         # Convert the responses to res
-        self.res = self.__rmflist_to_res(rmflist, arflist)
+        self.res = self.__rmflist_to_res(rmflist, arflist, workers=workers, catalog=catalog)
         if not isinstance(self.res, Res):
             message.error("Failed to combine and convert response files.")
             return 1
@@ -77,11 +88,62 @@ class TGRegion(Region):
 
         return 0
 
+    def del_components(self, icomps):
+        """Remove response components (grating orders) from this region. Component numbers start at 1.
+
+        :param icomps: List of component numbers to be removed.
+        :type icomps: list
+        """
+
+        stat = self.res.del_components(icomps)
+        if stat == 0 and len(self.orders) != 0:
+            remove = set(int(icomp) - 1 for icomp in icomps)
+            self.orders = [order for (i, order) in enumerate(self.orders) if i not in remove]
+
+        return stat
+
+    def merge_components(self, icomps):
+        """Replace response components (grating orders) of this region by a single component with the summed
+        response. Component numbers start at 1.
+
+        :param icomps: List of component numbers to be merged.
+        :type icomps: list
+        """
+
+        icomps = sorted(set(int(icomp) for icomp in icomps))
+        stat = self.res.merge_components(icomps)
+        if stat == 0 and len(self.orders) != 0:
+            label = "+".join([str(self.orders[icomp - 1]) for icomp in icomps])
+            self.orders = [order for (i, order) in enumerate(self.orders) if i + 1 not in icomps[1:]]
+            self.orders[icomps[0] - 1] = label
+
+        return stat
+
+    def merge_orders(self, orders=None):
+        """Replace the response components of a list of grating orders by a single component with the
+        summed response. If no orders are given, all orders are merged.
+
+        :param orders: List of grating orders to merge (for example [-1, 1]).
+        :type orders: list
+        """
+
+        if orders is None or len(orders) == 0:
+            orders = self.orders
+
+        icomps = []
+        for order in orders:
+            if order not in self.orders:
+                message.error("Order {0} is not available in the {1} response.".format(order, self.grating))
+                return 1
+            icomps.append(self.orders.index(order) + 1)
+
+        return self.merge_components(icomps)
+
     def __read_pha2(self, pha2file, grating, bkgsubtract=True):
         """Method to read a PHA type II file.
 
-        :param pha2file: PHA type II file name to read.
-        :type pha2file: str
+        :param pha2file: PHA type II file name to read or Pha2 object.
+        :type pha2file: str or pyspextools.io.Pha2
         :param grating: Name of the grating to read (HETG, METG or LETG).
         :type grating: str
         :param bkgsubtract: Subtract the background?
@@ -93,8 +155,10 @@ class TGRegion(Region):
         spec = Pha2()
 
         # Is the source spectrum there?
-        message.proc_start("Read source spectrum")
-        if os.path.isfile(pha2file):
+        if isinstance(pha2file, Pha2):
+            spec = pha2file
+        elif os.path.isfile(pha2file):
+            message.proc_start("Read source spectrum")
             stat = spec.read(pha2file, background=bkgsubtract)
             if stat != 0:
                 message.proc_end(stat)
@@ -103,7 +167,6 @@ class TGRegion(Region):
             else:
                 message.proc_end(stat)
         else:
-            message.proc_end(1)
             message.error("Spectrum file {0} not found in path.".format(pha2file))
             return 1
 
@@ -133,7 +196,7 @@ class TGRegion(Region):
     # Return a res object derived from Chandra grating data
     # -----------------------------------------------------
 
-    def __rmflist_to_res(self, rmflist, arflist):
+    def __rmflist_to_res(self, rmflist, arflist, workers=None, catalog=None):
         """Convert a list of compatible rmf and arf file into one res file. This is convenient for combining responses
         that are provided separately, like the Transmission Grating spectra from Chandra.
 
@@ -141,58 +204,84 @@ class TGRegion(Region):
         :type rmflist: list
         :param arflist: List of ARF file names.
         :type arflist: list
+        :param workers: Number of processes to convert the orders with (default: number of orders and CPUs).
+        :type workers: int
+        :param catalog: Catalog of the response files to take the orders from (optional).
+        :type catalog: pyspextools.io.ResponseCatalog
         """
 
         if len(rmflist) != len(arflist):
             message.error("ARF list and RMF list do not have the same length.")
             return 0
 
-        rmfobjs = np.zeros(len(rmflist), dtype=object)
-        arfobjs = np.zeros(len(arflist), dtype=object)
-        rmf_orders = np.zeros(len(rmflist), dtype=int)
-        arf_orders = np.zeros(len(arflist), dtype=int)
-
-        i = 0
-        for file in rmflist:
-            message.proc_start("Reading response for order")
-            rmf = Rmf()
-            rmf.read(file)
-            rmf_orders[i] = rmf.matrix[0].Order
-            print(str(rmf_orders[i])+"  ", end='')
-            if len(np.where(rmf_orders == rmf.matrix[0].Order)) != 1:
-                message.error("There are two response files with the same order.")
-                message.proc_end(1)
-                return 1
-            else:
-                rmfobjs[i] = rmf
-                message.proc_end(0)
-            i = i + 1
-
-        i = 0
-        for file in arflist:
-            message.proc_start("Reading effective area for order")
-            arf = Arf()
-            arf.read(file)
-            arf_orders[i] = arf.Order
-            print(str(arf_orders[i])+"  ", end='')
-            if len(np.where(arf_orders == arf.Order)) != 1:
-                message.error("There are two effective area files for the same order.")
-                message.proc_end(1)
+        # Take the orders from the catalog if all files are in there. Otherwise, the orders are taken from
+        # the files after reading them.
+        rmf_orders = None
+        arf_orders = None
+        if catalog is not None:
+            rmf_orders = catalog.orders(rmflist)
+            arf_orders = catalog.orders(arflist)
+            if rmf_orders is not None and arf_orders is not None:
+                stat = self.__check_orders(rmf_orders, arf_orders)
+                if stat != 0:
+                    return 1
+
+        # Read the response and effective area files concurrently
+        rmfobjs = [Rmf() for file in rmflist]
+        arfobjs = [Arf() for file in arflist]
+        tasks = [(rmf.read, (file,), {}) for (rmf, file) in zip(rmfobjs, rmflist)]
+        tasks = tasks + [(arf.read, (file,), {}) for (arf, file) in zip(arfobjs, arflist)]
+
+        message.proc_start("Reading responses and effective areas")
+        results = parallel.run_tasks(tasks)
+        labels = ["Could not read file {0}.".format(file) for file in list(rmflist) + list(arflist)]
+        if parallel.report_failures(results, labels, status=False) != 0:
+            message.proc_end(1)
+            return 1
+        message.proc_end(0)
+
+        if rmf_orders is None or arf_orders is None:
+            rmf_orders = [rmf.matrix[0].Order for rmf in rmfobjs]
+            arf_orders = [arf.Order for arf in arfobjs]
+            stat = self.__check_orders(rmf_orders, arf_orders)
+            if stat != 0:
                 return 1
-            else:
-                arfobjs[i] = arf
-                message.proc_end(0)
-            i = i + 1
 
         arfsort = np.argsort(arf_orders)
         rmfsort = np.argsort(rmf_orders)
+        self.orders = [int(order) for order in np.sort(rmf_orders)]
 
-        # Calculate first response:
-        res = rmf_to_res(rmfobjs[rmfsort[0]], arf=arfobjs[arfsort[0]])
-
-        # Append the components from the other responses
-        for i in np.arange(len(rmfsort)-1)+1:
-            restmp = rmf_to_res(rmfobjs[rmfsort[i]], arf=arfobjs[arfsort[i]])
-            res.append_component(restmp)
+        # Convert the orders concurrently. The components are stored in order of increasing grating order.
+        message.proc_start("Converting responses to res format")
+        jobs = [(rmfobjs[rmfsort[i]], 0, arfobjs[arfsort[i]]) for i in range(len(rmfsort))]
+        res = rmfs_to_res(jobs, workers=workers)
+        if not isinstance(res, Res):
+            message.proc_end(1)
+            return 1
+        message.proc_end(0)
 
         return res
+
+    @staticmethod
+    def __check_orders(rmf_orders, arf_orders):
+        """Print the orders and check that every order occurs only once in the response and effective area files.
+
+        :param rmf_orders: Orders of the response files.
+        :type rmf_orders: list
+        :param arf_orders: Orders of the effective area files.
+        :type arf_orders: list
+        """
+
+        rmf_orders = np.array(rmf_orders, dtype=int)
+        arf_orders = np.array(arf_orders, dtype=int)
+        print("Orders: " + "  ".join([str(order) for order in np.sort(rmf_orders)]))
+
+        if np.unique(rmf_orders).size != rmf_orders.size:
+            message.error("There are two response files with the same order.")
+            return 1
+
+        if np.unique(arf_orders).size != arf_orders.size:
+            message.error("There are two effective area files for the same order.")
+            return 1
+
+        return 0
@@ -32,6 +32,12 @@ def set_color(setcol):
         color.set_color(False)
 
 
+def get_color():
+    """Return whether text output is currently colored (True/False)."""
+
+    return color.ENDC != ''
+
+
 # Create methods to do show processes and their result
 def proc_start(text):
     """Print text to terminal at the start of the procedure.
@@ -0,0 +1,227 @@
+#!/usr/bin/env python
+
+# =========================================================
+"""
+Methods to run independent tasks concurrently on a thread or process pool.
+"""
+# =========================================================
+
+import io
+import sys
+import json
+import time
+import contextlib
+import concurrent.futures
+import pyspextools.messages as message
+
+
+def run_tasks(tasks, workers=None, processes=False, callback=None):
+    """Run a list of independent tasks concurrently and return their results in the order of the input list.
+    Every task is a tuple (function, args, kwargs). If a task raises an exception, the exception object is
+    returned in its place, such that the other tasks are not affected. By default, the tasks run on a thread
+    pool, which suits file I/O. Set processes to True to use a process pool for CPU-bound tasks. In that case,
+    the functions and arguments must be picklable. An optional callback function is called in the main thread
+    as callback(index, result) as soon as a task finishes, for example to report progress.
+
+    :param tasks: List of (function, args, kwargs) tuples.
+    :type tasks: list
+    :param workers: Maximum number of workers (default: number of tasks, limited by the executor default).
+    :type workers: int
+    :param processes: Use a process pool instead of a thread pool?
+    :type processes: bool
+    :param callback: Function to call with the task index and result when a task finishes (optional).
+    :type callback: function
+    """
+
+    if len(tasks) == 0:
+        return []
+
+    if workers is None:
+        workers = len(tasks)
+
+    # Run serially if there is only one worker, which avoids the pool overhead
+    if workers <= 1:
+        results = []
+        for (function, args, kwargs) in tasks:
+            try:
+                results.append(function(*args, **kwargs))
+            except Exception as exc:
+                results.append(exc)
+            if callback is not None:
+                callback(len(results) - 1, results[-1])
+        return results
+
+    if processes:
+        executor = concurrent.futures.ProcessPoolExecutor(max_workers=workers)
+    else:
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers)
+
+    with executor:
+        futures = {}
+        for i, (function, args, kwargs) in enumerate(tasks):
+            futures[executor.submit(function, *args, **kwargs)] = i
+
+        results = [None] * len(tasks)
+        for future in concurrent.futures.as_completed(futures):
+            i = futures[future]
+            try:
+                results[i] = future.result()
+            except Exception as exc:
+                results[i] = exc
+            if callback is not None:
+                callback(i, results[i])
+
+    return results
+
+
+def report_failures(results, labels, status=True):
+    """Print an error for every failed task and return the number of failures. A task failed if it raised an
+    exception or, when status is True, if it returned a non-zero status code.
+
+    :param results: List of task results returned by run_tasks.
+    :type results: list
+    :param labels: Error message for every task.
+    :type labels: list
+    :param status: Interpret the task results as status codes (0 is success)?
+    :type status: bool
+    """
+
+    nfail = 0
+
+    for (result, label) in zip(results, labels):
+        if isinstance(result, Exception):
+            message.error("{0} ({1}: {2})".format(label, type(result).__name__, result))
+            nfail = nfail + 1
+        elif status and result != 0:
+            message.error(label)
+            nfail = nfail + 1
+
+    return nfail
+
+
+def run_captured(function, *args, **kwargs):
+    """Call a function with its standard output captured, such that the output of tasks running in parallel does
+    not get mixed up. Colors are switched off while the output is captured and the previous setting is restored
+    afterwards, because with one worker the task runs in the main process. An exception raised by the function is
+    caught and returned as an error message. Returns a tuple (result, error, time, log) with the return value of
+    the function (None if it raised an exception), the error message (None if successful), the run time in
+    seconds and the captured output.
+
+    :param function: Function to call with the remaining positional and keyword arguments.
+    :type function: function
+    """
+
+    colored = message.get_color()
+    message.set_color(False)
+
+    log = io.StringIO()
+    result = None
+    error = None
+    start = time.perf_counter()
+
+    with contextlib.redirect_stdout(log):
+        try:
+            result = function(*args, **kwargs)
+        except Exception as exc:
+            error = "{0}: {1}".format(type(exc).__name__, exc)
+        finally:
+            message.set_color(colored)
+
+    return result, error, round(time.perf_counter() - start, 3), log.getvalue()
+
+
+def run_reported(tasks, labels, records, workers=None, describe=None):
+    """Run a list of batch tasks on a process pool (see run_tasks) and print the status of every task as soon
+    as it finishes. Every task returns a dictionary with at least the keys 'status' ('ok', 'skipped' or
+    'failed'), 'error', 'time' and 'log'. Tasks lost with a crashed worker process are reported as failures,
+    for which the result is the record of the task completed with the error. Returns a tuple with the list of
+    result dictionaries and the wall time in seconds.
+
+    :param tasks: List of (function, args, kwargs) tuples.
+    :type tasks: list
+    :param labels: Name of every task in the report.
+    :type labels: list
+    :param records: Dictionary with the known properties of every task, used as result for failed workers.
+    :type records: list
+    :param workers: Maximum number of worker processes.
+    :type workers: int
+    :param describe: Function that returns the description of a finished task from its result (default: label).
+    :type describe: function
+    """
+
+    ntasks = len(tasks)
+
+    def report(i, result):
+        """Print the status of a task when it has finished."""
+        if isinstance(result, Exception):
+            print("[{0}/{1}] FAILED {2}: {3}".format(i + 1, ntasks, labels[i], result))
+        elif result['status'] == 'failed':
+            print("[{0}/{1}] FAILED {2}".format(i + 1, ntasks, labels[i]))
+            if result['error'] is not None:
+                print("    {0}".format(result['error']))
+        else:
+            text = describe(result) if describe is not None else labels[i]
+            if result['status'] == 'skipped':
+                print("[{0}/{1}] SKIP   {2} (up to date)".format(i + 1, ntasks, text))
+            else:
+                print("[{0}/{1}] OK     {2} ({3:.2f} s)".format(i + 1, ntasks, text, result['time']))
+        sys.stdout.flush()
+
+    start = time.perf_counter()
+    results = run_tasks(tasks, workers=workers, processes=True, callback=report)
+    walltime = time.perf_counter() - start
+
+    for i, result in enumerate(results):
+        if isinstance(result, Exception):
+            results[i] = dict(records[i], status='failed', error="{0}: {1}".format(type(result).__name__, result),
+                              time=None, log='')
+
+    return results, walltime
+
+
+def write_summary(summaryfile, header, results, workers, walltime, name='tasks'):
+    """Write a JSON summary of the results of run_reported and print the number of successful, skipped and
+    failed tasks. Returns 0 if all tasks were successful.
+
+    :param summaryfile: Name of the output JSON file.
+    :type summaryfile: str
+    :param header: Dictionary with the items at the start of the summary (for example the input files).
+    :type header: dict
+    :param results: List of result dictionaries returned by run_reported.
+    :type results: list
+    :param workers: Number of worker processes.
+    :type workers: int
+    :param walltime: Wall time of the batch in seconds.
+    :type walltime: float
+    :param name: Name of the tasks in the printed report (for example 'jobs').
+    :type name: str
+    """
+
+    ntasks = len(results)
+    nfail = len([result for result in results if result['status'] == 'failed'])
+    nskip = len([result for result in results if result['status'] == 'skipped'])
+
+    summary = dict(header)
+    summary.update({'succeeded': ntasks - nfail - nskip, 'skipped': nskip, 'failed': nfail, 'workers': workers,
+                    'walltime': round(walltime, 3), 'results': results})
+
+    with open(summaryfile, 'w') as f:
+        json.dump(summary, f, indent=2)
+
+    lines = [("Number of successful {0}:".format(name), ntasks - nfail - nskip),
+             ("Number of skipped {0}:".format(name), nskip),
+             ("Number of failed {0}:".format(name), nfail),
+             ("Total time:", "{0:.2f} s".format(walltime))]
+    width = max([len(text) for (text, value) in lines]) + 1
+
+    print("")
+    for (text, value) in lines:
+        print("{0}{1}".format(text.ljust(width), value))
+    print("Summary written to: {0}".format(summaryfile))
+
+    if nfail != 0:
+        message.error("{0} of {1} {2} failed. See the summary file for the output of these "
+                      "{2}.".format(nfail, ntasks, name))
+        return 1
+
+    return 0
@@ -2,45 +2,75 @@
 
 import os
 import sys
+import csv
+import glob
 import argparse
+import astropy.io.fits as fits
 import pyspextools
-from pyspextools.io.ogip import OGIPRegion
+from pyspextools.io.ogip import OGIPRegion, ResponseCache, find_companion_files
 from pyspextools.data.badchannels import clean_region
+from pyspextools.data.stack import RegionStack
 import pyspextools.messages as message
+import pyspextools.parallel as parallel
+import pyspextools.incremental as incremental
+from pyspextools.io.spo import Spo
+from pyspextools.io.res import Res
+from pyspextools.io.region import Region
+
+# Columns in a manifest file
+manifest_required = ['phafile', 'rmffile', 'spofile', 'resfile']
+manifest_optional = ['bkgfile', 'arffile', 'corrfile']
+
+# Command line options that change the output (used for the fingerprint in incremental mode)
+fingerprint_options = ['badchan', 'group', 'exprate', 'force_poisson']
+
+# File name patterns of spectra to convert in directory mode
+spectrum_patterns = ['*.pha', '*.pi', '*.pha.gz', '*.pi.gz', '*.fits', '*.fits.gz']
+
+# Responses that are shared between spectra are read only once per process
+response_cache = ResponseCache()
 
 
 def main():
     """The OGIP2spex script offers a quick way to convert OGIP type spectra to SPEX format.
     It reads OGIP PHA type I spectra and responses. After the conversion to SPEX format, the
-    files are filtered for bad channels (optional)."""
+    files are filtered for bad channels (optional). With the --manifest option, a list of
+    conversion jobs is read from a CSV file and converted in parallel. With the --auto option,
+    the background, response, effective area and correction files are taken from the PHA header.
+    The --directory option converts all spectra in a directory this way. With the --incremental option,
+    conversions are skipped if the output files were created from the same input files and options.
+    With the --stack option, the spectra of a manifest or directory are stacked into a single region."""
 
     # Obtain command line arguments
     parser = ogip2spex_arguments()
     args = parser.parse_args()
 
+    # Directory mode always finds the companion files from the PHA headers
+    if args.directory is not None:
+        args.auto = True
+
+    # Stacking needs a list of spectra and a single pair of output files
+    if args.stack:
+        if args.manifest is None and args.directory is None:
+            parser.error("--stack requires --manifest or --directory")
+        if args.spofile is None or args.resfile is None:
+            parser.error("--stack requires --spofile and --resfile")
+
+    # The input and output files are required, unless a manifest or directory is given. In auto mode,
+    # only the PHA file is required.
+    if args.manifest is None and args.directory is None:
+        required = ['phafile'] if args.auto else manifest_required
+        for name in required:
+            if getattr(args, name) is None:
+                parser.error("the following argument is required: --{0} (or use --manifest or --directory)".format(
+                    name))
+
     # Print message header
     message.print_header(os.path.basename(__file__))
 
     # Set color in the terminal
     message.set_color(args.color)
 
-    # Load OGIP spectra and response files
-    ogip = OGIPRegion()
-
-    print("Input PHA file: {0}".format(args.phafile))
-    print("Input Background file: {0}".format(args.bkgfile))
-    print("Input Response file: {0}".format(args.rmffile))
-    print("Input Effective area file: {0}".format(args.arffile))
-
-    ogip.read_region(args.phafile, args.rmffile, bkgfile=args.bkgfile, arffile=args.arffile, grouping=args.group,
-                     force_poisson=args.force_poisson)
-
-    # Filter for bad channels (if not blocked by command line argument)
-    if args.badchan:
-        ogip = clean_region(ogip)
-        if not isinstance(ogip, OGIPRegion):
-            sys.exit(1)
-
     # Add the ogip2spex command to the file history
     history = []
     history.append("OGIP2SPEX version: {0}".format(pyspextools.__version__))
@@ -53,28 +83,522 @@ def main():
         line = "{0} : {1}".format(arg, getattr(args, arg))
         history.append(line)
 
+    if args.manifest is not None:
+        jobs = read_manifest(args.manifest, auto=args.auto, outdir=args.outdir, outputs=not args.stack)
+        if not isinstance(jobs, list):
+            sys.exit(1)
+        print("Read {0} jobs from manifest: {1}".format(len(jobs), args.manifest))
+        summaryfile = os.path.splitext(args.manifest)[0] + '_summary.json'
+        if args.stack:
+            stat = stack_jobs(jobs, args, history)
+        else:
+            stat = run_jobs(jobs, args, history, summaryfile)
+    elif args.directory is not None:
+        jobs = find_spectra(args.directory, outdir=args.outdir)
+        if not isinstance(jobs, list):
+            sys.exit(1)
+        nresp = len(set([job['rmffile'] for job in jobs if job['rmffile'] is not None]))
+        print("Found {0} spectra with {1} different response files in: {2}".format(len(jobs), nresp,
+                                                                                   args.directory))
+        outdir = args.outdir if args.outdir is not None else args.directory
+        summaryfile = os.path.join(outdir, 'ogip2spex_summary.json')
+        if args.stack:
+            stat = stack_jobs(jobs, args, history)
+        else:
+            stat = run_jobs(jobs, args, history, summaryfile)
+    else:
+        job = {'phafile': args.phafile, 'bkgfile': args.bkgfile, 'rmffile': args.rmffile, 'arffile': args.arffile,
+               'corrfile': args.corrfile, 'spofile': args.spofile, 'resfile': args.resfile}
+        (spofile, resfile) = output_files(args.phafile, outdir=args.outdir)
+        if job['spofile'] is None:
+            job['spofile'] = spofile
+        if job['resfile'] is None:
+            job['resfile'] = resfile
+        (skip, fingerprint) = check_incremental(job, args)
+        if skip:
+            print("Output files {0} and {1} are up to date.".format(job['spofile'], job['resfile']))
+            stat = 0
+        else:
+            stat = convert(job, args, history, fingerprint=fingerprint)
+
+    if stat != 0:
+        sys.exit(1)
+
+
+def convert(job, args, history, fingerprint=None):
+    """Convert one set of OGIP files to a spo and res file. Returns 0 if successful.
+
+    :param job: Dictionary with the input and output file names (see manifest_required and manifest_optional).
+    :type job: dict
+    :param args: Command line arguments with the conversion options.
+    :type args: argparse.Namespace
+    :param history: History information for the output files.
+    :type history: list
+    :param fingerprint: Fingerprint of the inputs to store in the output files (incremental mode).
+    :type fingerprint: str
+    """
+
+    # Load OGIP spectra and response files
+    ogip = OGIPRegion()
+
+    # In auto mode, files that are not given are taken from the PHA header
+    files = dict(job)
+    for name in manifest_optional + ['rmffile']:
+        if files.get(name) is None and args.auto:
+            files[name] = 'from PHA header'
+
+    print("Input PHA file: {0}".format(files['phafile']))
+    print("Input Background file: {0}".format(files.get('bkgfile')))
+    print("Input Response file: {0}".format(files.get('rmffile')))
+    print("Input Effective area file: {0}".format(files.get('arffile')))
+    if files.get('corrfile') is not None:
+        print("Input Correction file: {0}".format(files.get('corrfile')))
+
+    stat = ogip.read_region(job['phafile'], job.get('rmffile'), bkgfile=job.get('bkgfile'),
+                            arffile=job.get('arffile'), corrfile=job.get('corrfile'), grouping=args.group,
+                            force_poisson=args.force_poisson, auto=args.auto, cache=response_cache)
+    if stat != 0:
+        return 1
+
+    # Filter for bad channels (if not blocked by command line argument)
+    if args.badchan:
+        ogip = clean_region(ogip)
+        if not isinstance(ogip, OGIPRegion):
+            return 1
+
     # Check output file names
-    spofile = ogip.spo.check_filename(args.spofile)
-    resfile = ogip.res.check_filename(args.resfile)
+    spofile = ogip.spo.check_filename(job['spofile'])
+    resfile = ogip.res.check_filename(job['resfile'])
 
     # Write output spo and res file
     print("Writing SPO to file: {0}".format(spofile))
-    ogip.spo.write_file(spofile, exp_rate=args.exprate, overwrite=args.overwrite, history=history)
+    print("Writing RES to file: {0}".format(resfile))
+    # In incremental mode, outdated output files are replaced
+    overwrite = args.overwrite
+    if fingerprint is not None:
+        history = history + [incremental.history_line(fingerprint)]
+        overwrite = True
+    return ogip.write_files(spofile, resfile, exp_rate=args.exprate, overwrite=overwrite, history=history)
+
+
+def check_incremental(job, args):
+    """Calculate the fingerprint of the input files and options of a job in incremental mode. Returns a tuple
+    with a flag that is True if the output files are up to date, and the fingerprint. Outside incremental mode,
+    or if not all input files exist, the flag is False and the fingerprint None.
+
+    :param job: Dictionary with the input and output file names (see manifest_required and manifest_optional).
+    :type job: dict
+    :param args: Command line arguments with the conversion options.
+    :type args: argparse.Namespace
+    """
+
+    if not args.incremental:
+        return False, None
+
+    files = input_files(job, args)
+    if files is None:
+        return False, None
+
+    options = {name: getattr(args, name) for name in fingerprint_options}
+    fingerprint = incremental.fingerprint(files, options)
+
+    outputs = [Spo().check_filename(job['spofile']), Res().check_filename(job['resfile'])]
+
+    return incremental.up_to_date(outputs, fingerprint), fingerprint
+
+
+def check_stack_incremental(jobs, args):
+    """Calculate the fingerprint of the input files of all stacked jobs and the options in incremental mode.
+    Returns a tuple with a flag that is True if the stacked output files are up to date, and the fingerprint.
+    Outside incremental mode, or if not all input files exist, the flag is False and the fingerprint None.
+
+    :param jobs: List of jobs (dictionaries with the input file names).
+    :type jobs: list
+    :param args: Command line arguments with the conversion options.
+    :type args: argparse.Namespace
+    """
+
+    if not args.incremental:
+        return False, None
+
+    files = {}
+    for (i, job) in enumerate(jobs):
+        jobfiles = input_files(job, args)
+        if jobfiles is None:
+            return False, None
+        for (name, filename) in jobfiles.items():
+            files["{0}_{1}".format(name, i + 1)] = filename
+
+    options = {name: getattr(args, name) for name in fingerprint_options}
+    options['stack'] = True
+    fingerprint = incremental.fingerprint(files, options)
+
+    outputs = [Spo().check_filename(args.spofile), Res().check_filename(args.resfile)]
+
+    return incremental.up_to_date(outputs, fingerprint), fingerprint
+
+
+def input_files(job, args):
+    """Return a dictionary with the input files of a job, including the companion files from the PHA header in
+    auto mode. Returns None if one of the input files does not exist.
+
+    :param job: Dictionary with the input file names (see manifest_required and manifest_optional).
+    :type job: dict
+    :param args: Command line arguments with the conversion options.
+    :type args: argparse.Namespace
+    """
+
+    files = {name: job.get(name) for name in ['phafile', 'rmffile'] + manifest_optional}
+
+    # In auto mode, files that are not given are taken from the PHA header
+    if args.auto and os.path.isfile(job['phafile']):
+        companions = find_companion_files(job['phafile'])
+        if isinstance(companions, dict):
+            for name in companions:
+                if files.get(name) is None:
+                    files[name] = companions[name]
+
+    # Missing input files are reported by the conversion itself
+    for filename in files.values():
+        if filename is not None and not os.path.isfile(filename):
+            return None
+
+    return files
+
+
+def output_files(phafile, outdir=None):
+    """Return the default output spo and res file names for a PHA file. The names are the PHA file name with
+    the .spo and .res extension, in the output directory or else in the directory of the PHA file.
+
+    :param phafile: Name of the PHA file.
+    :type phafile: str
+    :param outdir: Output directory (optional).
+    :type outdir: str
+    """
+
+    name = os.path.basename(phafile)
+    if name.endswith('.gz'):
+        name = name[:-3]
+    name = os.path.splitext(name)[0]
+
+    if outdir is None:
+        outdir = os.path.dirname(phafile)
+
+    return os.path.join(outdir, name + '.spo'), os.path.join(outdir, name + '.res')
+
 
+def read_manifest(manifest, auto=False, outdir=None, outputs=True):
+    """Read the conversion jobs from a manifest file. The manifest is a CSV file with a header line containing
+    the column names phafile, rmffile, spofile and resfile, and optionally bkgfile, arffile and corrfile. Empty
+    lines and lines starting with '#' are ignored. In auto mode, only the phafile column is required. Missing
+    companion files are then taken from the PHA header and missing output files get the PHA file name.
+    If outputs is False, the spofile and resfile columns are not required (for example when stacking).
+    Returns a list of jobs, or 1 if the manifest cannot be read.
+
+    :param manifest: File name of the manifest.
+    :type manifest: str
+    :param auto: Find missing files from the PHA header?
+    :type auto: bool
+    :param outdir: Output directory for the default output file names (optional).
+    :type outdir: str
+    :param outputs: Are the output file columns required?
+    :type outputs: bool
+    """
+
+    if not os.path.isfile(manifest):
+        message.error("Manifest file {0} not found.".format(manifest))
+        return 1
+
+    with open(manifest, 'r', newline='') as f:
+        lines = [(i + 1, line) for i, line in enumerate(f) if line.strip() != '' and not line.startswith('#')]
+
+    if len(lines) == 0:
+        message.error("Manifest file {0} is empty.".format(manifest))
+        return 1
+
+    reader = csv.DictReader([line for (number, line) in lines], skipinitialspace=True)
+    columns = [name.strip() for name in reader.fieldnames]
+    reader.fieldnames = columns
+
+    if auto:
+        required = ['phafile']
+    elif outputs:
+        required = manifest_required
+    else:
+        required = ['phafile', 'rmffile']
+
+    for name in required:
+        if name not in columns:
+            message.error("Column {0} missing in manifest file {1}.".format(name, manifest))
+            return 1
+
+    for name in columns:
+        if name not in manifest_required + manifest_optional:
+            message.error("Unknown column {0} in manifest file {1}.".format(name, manifest))
+            return 1
+
+    jobs = []
+    for (number, line), row in zip(lines[1:], reader):
+        job = {'line': number}
+        for name in manifest_required + manifest_optional:
+            value = row.get(name)
+            value = value.strip() if value is not None else ''
+            job[name] = value if value != '' else None
+        for name in required:
+            if job[name] is None:
+                message.error("Line {0} in manifest file {1} has no {2}.".format(number, manifest, name))
+                return 1
+        (spofile, resfile) = output_files(job['phafile'], outdir=outdir)
+        if job['spofile'] is None:
+            job['spofile'] = spofile
+        if job['resfile'] is None:
+            job['resfile'] = resfile
+        jobs.append(job)
+
+    return jobs
+
+
+def find_spectra(directory, outdir=None):
+    """Find the source spectra in a directory and their companion files from the PHA headers. Background
+    spectra (HDUCLAS2 = BKG), type II spectra and spectra that are referenced as background or correction file
+    by another spectrum are skipped. The jobs are sorted by response file. Returns a list of jobs, or 1 if no
+    spectra are found.
+
+    :param directory: Directory to search for spectra.
+    :type directory: str
+    :param outdir: Output directory for the spo and res files (default: the input directory).
+    :type outdir: str
+    """
+
+    if not os.path.isdir(directory):
+        message.error("Directory {0} not found.".format(directory))
+        return 1
+
+    filenames = set()
+    for pattern in spectrum_patterns:
+        filenames.update(glob.glob(os.path.join(directory, pattern)))
+
+    jobs = []
+    companions = set()
+    for phafile in sorted(filenames):
+        try:
+            header = fits.getheader(phafile, 'SPECTRUM')
+        except (OSError, KeyError):
+            continue
+
+        if str(header.get('HDUCLAS2', '')).strip().upper() == 'BKG':
+            continue
+        if 'II' in str(header.get('HDUCLAS4', '')).strip().upper():
+            continue
+
+        files = find_companion_files(phafile, header=header)
+        for name in ('bkgfile', 'corrfile'):
+            if files[name] is not None:
+                companions.add(os.path.realpath(files[name]))
+
+        (spofile, resfile) = output_files(phafile, outdir=outdir)
+        job = {'line': None, 'phafile': phafile, 'spofile': spofile, 'resfile': resfile}
+        job.update(files)
+        jobs.append(job)
+
+    jobs = [job for job in jobs if os.path.realpath(job['phafile']) not in companions]
+
+    if len(jobs) == 0:
+        message.error("No source spectra found in directory {0}.".format(directory))
+        return 1
+
+    # Jobs with the same response are next to each other, such that cached responses are re-used
+    jobs.sort(key=lambda job: (str(job['rmffile']), str(job['arffile']), job['phafile']))
+
+    return jobs
+
+
+def convert_job(job, args, history):
+    """Convert one manifest job, or skip it in incremental mode if the output files are up to date. Returns a
+    tuple with the status (0 if successful) and whether the job was skipped.
+
+    :param job: Dictionary with the input and output file names.
+    :type job: dict
+    :param args: Command line arguments with the conversion options.
+    :type args: argparse.Namespace
+    :param history: History information for the output files.
+    :type history: list
+    """
+
+    (skip, fingerprint) = check_incremental(job, args)
+    if skip:
+        print("Output files {0} and {1} are up to date.".format(job['spofile'], job['resfile']))
+        return 0, True
+
+    stat = convert(job, args, history + ["Input PHA file: {0}".format(job['phafile'])], fingerprint=fingerprint)
+
+    return stat, False
+
+
+def job_record(job):
+    """Return the dictionary with the file names of a job, which starts its entry in the summary file."""
+
+    return {'line': job['line'], 'phafile': job['phafile'], 'rmffile': job.get('rmffile'),
+            'spofile': job['spofile'], 'resfile': job['resfile']}
+
+
+def run_job(job, args, history):
+    """Run one manifest job and return its status, timing and output. The output of the conversion is
+    captured, such that the output of jobs running in parallel does not get mixed up.
+
+    :param job: Dictionary with the input and output file names.
+    :type job: dict
+    :param args: Command line arguments with the conversion options.
+    :type args: argparse.Namespace
+    :param history: History information for the output files.
+    :type history: list
+    """
+
+    hits = response_cache.hits
+    (value, error, runtime, log) = parallel.run_captured(convert_job, job, args, history)
+    (stat, skip) = value if error is None else (1, False)
+
+    result = job_record(job)
+    result.update({'status': 'failed' if stat != 0 else 'skipped' if skip else 'ok', 'error': error,
+                   'time': runtime, 'cache_hits': response_cache.hits - hits, 'log': log})
+
+    return result
+
+
+def run_jobs(jobs, args, history, summaryfile):
+    """Convert a list of jobs on a process pool and write a JSON summary of the timings and failures.
+    Returns 0 if all jobs were successful.
+
+    :param jobs: List of jobs (dictionaries with the input and output file names).
+    :type jobs: list
+    :param args: Command line arguments with the conversion options.
+    :type args: argparse.Namespace
+    :param history: History information for the output files.
+    :type history: list
+    :param summaryfile: Default name of the JSON summary file (overruled by the --summary argument).
+    :type summaryfile: str
+    """
+
+    print("Number of parallel jobs: {0}".format(args.jobs))
+
+    def describe(result):
+        """Return the input and output file of a finished job."""
+        return "{0} -> {1}".format(result['phafile'], result['spofile'])
+
+    tasks = [(run_job, (job, args, history), {}) for job in jobs]
+    records = [dict(job_record(job), cache_hits=0) for job in jobs]
+    (results, walltime) = parallel.run_reported(tasks, [job['phafile'] for job in jobs], records,
+                                                workers=args.jobs, describe=describe)
+
+    if args.summary is not None:
+        summaryfile = args.summary
+
+    header = {'manifest': args.manifest, 'directory': args.directory, 'jobs': len(jobs)}
+
+    return parallel.write_summary(summaryfile, header, results, args.jobs, walltime, name='jobs')
+
+
+def stack_jobs(jobs, args, history):
+    """Stack the spectra and responses of a list of jobs into a single region and write it to the spo and res
+    file given on the command line. The observations are read one at a time, such that only one observation and
+    the stacked sums are in memory. Bad channels are removed from the stacked region. In incremental mode, the
+    stacking is skipped if the output files were created from the same input files and options. Returns 0 if
+    successful.
+
+    :param jobs: List of jobs (dictionaries with the input file names).
+    :type jobs: list
+    :param args: Command line arguments with the conversion options.
+    :type args: argparse.Namespace
+    :param history: History information for the output files.
+    :type history: list
+    """
+
+    # In incremental mode, skip the stacking if the output files are up to date
+    (skip, fingerprint) = check_stack_incremental(jobs, args)
+    if skip:
+        print("Output files {0} and {1} are up to date.".format(args.spofile, args.resfile))
+        return 0
+
+    stack = RegionStack()
+
+    for (i, job) in enumerate(jobs):
+        print("[{0}/{1}] Stacking {2}".format(i + 1, len(jobs), job['phafile']))
+        ogip = OGIPRegion()
+        stat = ogip.read_region(job['phafile'], job.get('rmffile'), bkgfile=job.get('bkgfile'),
+                                arffile=job.get('arffile'), corrfile=job.get('corrfile'), grouping=args.group,
+                                force_poisson=args.force_poisson, auto=args.auto, cache=response_cache)
+        if stat != 0:
+            message.error("Failed to read {0}.".format(job['phafile']))
+            return 1
+
+        if stack.add(ogip) != 0:
+            message.error("Failed to stack {0}.".format(job['phafile']))
+            return 1
+
+        history = history + ["Stacked PHA file: {0}".format(job['phafile'])]
+
+    message.proc_start("Calculating the stacked spectrum and response")
+    region = stack.region()
+    stat = 0 if isinstance(region, Region) else 1
+    message.proc_end(stat)
+    if stat != 0:
+        return 1
+
+    print("Total exposure time: {0:.1f} s".format(region.spo.tints.max()))
+
+    # Filter for bad channels (if not blocked by command line argument)
+    if args.badchan:
+        region = clean_region(region)
+        if not isinstance(region, Region):
+            return 1
+
+    spofile = region.spo.check_filename(args.spofile)
+    resfile = region.res.check_filename(args.resfile)
+
+    print("Writing SPO to file: {0}".format(spofile))
     print("Writing RES to file: {0}".format(resfile))
-    ogip.res.write_file(resfile, overwrite=args.overwrite, history=history)
+
+    # In incremental mode, outdated output files are replaced
+    overwrite = args.overwrite
+    if fingerprint is not None:
+        history = history + [incremental.history_line(fingerprint)]
+        overwrite = True
+
+    return region.write_files(spofile, resfile, exp_rate=args.exprate, overwrite=overwrite, history=history)
 
 
 # Get command line arguments
 def ogip2spex_arguments():
     """Obtain command line arguments."""
     parser = argparse.ArgumentParser(description=message.docs)
-    parser.add_argument('--phafile', help='Input PHA source spectrum (required)', type=str, required=True)
+    parser.add_argument('--phafile', help='Input PHA source spectrum (required)', type=str)
     parser.add_argument('--bkgfile', help='Input Background spectrum', type=str)
-    parser.add_argument('--rmffile', help='Input Response matrix (required)', type=str, required=True)
+    parser.add_argument('--rmffile', help='Input Response matrix (required)', type=str)
     parser.add_argument('--arffile', help='Input Effective area file', type=str)
-    parser.add_argument('--spofile', help='Output SPEX spectrum file (.spo, required)', type=str, required=True)
-    parser.add_argument('--resfile', help='Output SPEX response file (.res, required)', type=str, required=True)
+    parser.add_argument('--corrfile', help='Input Correction spectrum', type=str)
+    parser.add_argument('--spofile', help='Output SPEX spectrum file (.spo, required)', type=str)
+    parser.add_argument('--resfile', help='Output SPEX response file (.res, required)', type=str)
+    parser.add_argument('--manifest', help='CSV file with a list of conversion jobs (columns: phafile, rmffile, '
+                                           'spofile, resfile and optionally bkgfile, arffile, corrfile). Replaces '
+                                           'the input and output file arguments.', type=str)
+    parser.add_argument('--auto', help='Take the background, response, effective area and correction files that are '
+                                       'not given from the BACKFILE, RESPFILE, ANCRFILE and CORRFILE keywords in the '
+                                       'PHA file.', action="store_true", default=False)
+    parser.add_argument('--directory', help='Convert all source spectra in this directory (implies --auto).',
+                        type=str)
+    parser.add_argument('--outdir', help='Output directory for spo and res files without a given name '
+                                         '(default: directory of the PHA file).', type=str)
+    parser.add_argument('--jobs', help='Number of parallel conversion jobs for a manifest or directory '
+                                       '(default: 1).', type=int, default=1)
+    parser.add_argument('--summary', help='Output JSON summary file for a manifest or directory '
+                                          '(default: <manifest>_summary.json or ogip2spex_summary.json).', type=str)
+    parser.add_argument('--stack', help='Stack the spectra and responses of a manifest or directory into a single '
+                                        'region with exposure-weighted rates and response, written to --spofile '
+                                        'and --resfile.', action="store_true", default=False)
+    parser.add_argument('--incremental', help='Skip conversions of which the output files were created from the same '
+                                              'input files and options (stored as a fingerprint in the output '
+                                              'headers). Outdated output files are overwritten.',
+                        action="store_true", default=False)
     parser.add_argument('--keep-badchannels', help='Do not remove bad channels.', dest="badchan", action="store_false",
                         default=True)
     parser.add_argument('--keep-grouping', help='Retain the grouping information from the PHA file.', dest="group",
@@ -7,7 +7,7 @@ import numpy as np
 import argparse
 from pyspextools.io.arf import Arf
 from pyspextools.io.rmf import Rmf, RmfMatrix
-from pyspextools.data.response import gaussrsp
+from pyspextools.data.response import gaussrsp_array
 
 import pyspextools.messages as message
 
@@ -61,12 +61,10 @@ def main():
     # Calculate new arrays
     rsp_out.matrix[0].LowEnergy = low + step * np.arange(rsp_out.matrix[0].NumberEnergyBins,dtype=float)
     rsp_out.matrix[0].HighEnergy = low + step * (np.arange(rsp_out.matrix[0].NumberEnergyBins,dtype=float)+1.0)
-    EffArea = np.zeros(rsp_out.matrix[0].NumberEnergyBins, dtype=float)
 
     # Linear interpolation of Effective area
-    for i in np.arange(rsp_out.matrix[0].NumberEnergyBins):
-        e = (rsp_out.matrix[0].LowEnergy[i] + rsp_out.matrix[0].HighEnergy[i]) / 2.0
-        EffArea[i] = np.interp(e, x, arf_in.EffArea)
+    e = (rsp_out.matrix[0].LowEnergy + rsp_out.matrix[0].HighEnergy) / 2.0
+    EffArea = np.interp(e, x, arf_in.EffArea)
 
     # Assume same binning for energy channels (Not optimal, but ok...)
     rsp_out.ebounds.NumberChannels = rsp_out.matrix[0].NumberEnergyBins
@@ -87,52 +85,46 @@ def main():
 
     nbin_group = math.ceil(10 * args.resolution * 1E-3 / step)
 
-    try:
-        rsp_out.matrix[0].Matrix = np.zeros(nbin_group * rsp_out.matrix[0].NumberEnergyBins, dtype=float)
-    except MemoryError:
-        message.error('Not enough memory to create matrix...')
-
-    rsp_out.matrix[0].NumberChannelsGroup = np.zeros(rsp_out.matrix[0].NumberEnergyBins, dtype=int)
-    rsp_out.matrix[0].FirstChannelGroup = np.zeros(rsp_out.matrix[0].NumberEnergyBins, dtype=int)
+    nenergy = rsp_out.matrix[0].NumberEnergyBins
+    nchan = rsp_out.ebounds.NumberChannels
 
     # Generate response matrix
-    print("Number of energy bins: {0}".format(rsp_out.matrix[0].NumberEnergyBins))
+    print("Number of energy bins: {0}".format(nenergy))
     print("Number of channels per group: {0}".format(nbin_group))
 
     message.proc_start('Calculate response matrix')
 
-    r = 0
-    for i in np.arange(rsp_out.matrix[0].NumberEnergyBins):
-        # The number of channels per group is nbin_group
-        rsp_out.matrix[0].NumberChannelsGroup[i] = nbin_group
-
-        # Calculate the start channel of the group
-        rsp_out.matrix[0].FirstChannelGroup[i] = int(1 + i - math.ceil(nbin_group / 2))
-        if rsp_out.matrix[0].FirstChannelGroup[i] < 1:
-            rsp_out.matrix[0].FirstChannelGroup[i] = 1
-        if rsp_out.matrix[0].FirstChannelGroup[i] > rsp_out.ebounds.NumberChannels - nbin_group:
-            rsp_out.matrix[0].FirstChannelGroup[i] = int(rsp_out.ebounds.NumberChannels - nbin_group)
-
-        # Fill the Matrix
-        mu = (rsp_out.ebounds.ChannelLowEnergy[i] + rsp_out.ebounds.ChannelHighEnergy[i]) / 2.0
-        sum = 0
-        for j in np.arange(nbin_group):
-            k = rsp_out.matrix[0].FirstChannelGroup[i] + j
-            e = (rsp_out.ebounds.ChannelLowEnergy[k - 1] + rsp_out.ebounds.ChannelHighEnergy[k - 1]) / 2.0
-            resp = gaussrsp(e, mu, args.resolution, args.resgradient)
-            if resp < 0.:
-                message.error('Negative response value detected. Quitting program...')
-                sys.exit(0)
-            rsp_out.matrix[0].Matrix[r] = resp * step
-            if (rsp_out.matrix[0].Matrix[r] < rsp_out.matrix[0].ResponseThreshold):
-                rsp_out.matrix[0].Matrix[r] = 0.
-            if not args.noarea:
-                rsp_out.matrix[0].Matrix[r] = rsp_out.matrix[0].Matrix[r] * EffArea[i]
-            sum = sum + rsp_out.matrix[0].Matrix[r]
-            r = r + 1
+    # The number of channels per group is nbin_group. The groups are centred on the channel of the energy bin,
+    # but they are shifted to stay within the channel range.
+    rsp_out.matrix[0].NumberChannelsGroup = np.full(nenergy, nbin_group, dtype=int)
+    first = 1 + np.arange(nenergy) - math.ceil(nbin_group / 2)
+    first = np.minimum(np.maximum(first, 1), nchan - nbin_group)
+    rsp_out.matrix[0].FirstChannelGroup = first.astype(int)
+
+    # Channel energies of all the response elements (one row per energy bin) and the centers of the energy bins
+    echan = (rsp_out.ebounds.ChannelLowEnergy + rsp_out.ebounds.ChannelHighEnergy) / 2.0
+    try:
+        egroup = echan[first[:, np.newaxis] - 1 + np.arange(nbin_group)]
+    except MemoryError:
+        message.error('Not enough memory to create matrix...')
+        sys.exit(1)
+    mu = echan[:nenergy, np.newaxis]
+
+    # Fill the Matrix
+    resp = gaussrsp_array(egroup, mu, args.resolution, args.resgradient)
+    if not isinstance(resp, np.ndarray) or np.any(resp < 0.):
+        message.error('Negative response value detected. Quitting program...')
+        sys.exit(0)
+
+    matrix = resp * step
+    matrix[matrix < rsp_out.matrix[0].ResponseThreshold] = 0.
+    if not args.noarea:
+        matrix = matrix * EffArea[:, np.newaxis]
+
+    rsp_out.matrix[0].Matrix = matrix.ravel()
 
     rsp_out.matrix[0].NumberTotalGroups = rsp_out.matrix[0].NumberEnergyBins
-    rsp_out.matrix[0].NumberTotalElements = r
+    rsp_out.matrix[0].NumberTotalElements = rsp_out.matrix[0].Matrix.size
     message.proc_end(0)
 
     if args.noarea:
@@ -4,6 +4,9 @@ import os
 import sys
 import argparse
 import pyspextools
+import pyspextools.incremental as incremental
+from pyspextools.io.spo import Spo
+from pyspextools.io.res import Res
 from pyspextools.io.ogip import OGIPRegion
 from pyspextools.data.badchannels import clean_region
 
@@ -13,7 +16,8 @@ import pyspextools.messages as message
 def main():
     """The simres program generates a spo and res file from an input arf and rmf file, and optionally a background
     file. This is particularly useful for simulating spectra for future missions, where the source spectrum file is
-    not supplied."""
+    not supplied. With the --incremental option, the conversion is skipped if the output files were created from
+    the same input files and options."""
 
     # Obtain command line arguments
     parser = simres_arguments()
@@ -25,6 +29,17 @@ def main():
     # Set color in the terminal
     message.set_color(args.color)
 
+    # In incremental mode, skip the conversion if the output files are up to date
+    fingerprint = None
+    if args.incremental:
+        files = {'rmffile': args.rmffile, 'arffile': args.arffile, 'bkgfile': args.bkgfile}
+        options = {'badchan': args.badchan, 'exprate': args.exprate, 'backscale': args.backscale}
+        fingerprint = incremental.fingerprint(files, options)
+        outputs = [Spo().check_filename(args.spofile), Res().check_filename(args.resfile)]
+        if incremental.up_to_date(outputs, fingerprint):
+            print("Output files {0} and {1} are up to date.".format(outputs[0], outputs[1]))
+            return
+
     # Load OGIP response files and background spectrum if provided
     ogipreg = OGIPRegion()
 
@@ -74,6 +89,8 @@ def main():
     for arg in vars(args):
         line = "{0} : {1}".format(arg, getattr(args, arg))
         history.append(line)
+    if fingerprint is not None:
+        history.append(incremental.history_line(fingerprint))
 
     # Check output file names
     spofile = ogipreg.spo.check_filename(args.spofile)
@@ -81,10 +98,12 @@ def main():
 
     # Write output spo and res file
     print("Writing SPO to file: {0}".format(spofile))
-    ogipreg.spo.write_file(spofile, exp_rate=args.exprate, overwrite=args.overwrite, history=history)
-
     print("Writing RES to file: {0}".format(resfile))
-    ogipreg.res.write_file(resfile, overwrite=args.overwrite, history=history)
+    # In incremental mode, outdated output files are replaced
+    overwrite = args.overwrite or fingerprint is not None
+    stat = ogipreg.write_files(spofile, resfile, exp_rate=args.exprate, overwrite=overwrite, history=history)
+    if stat != 0:
+        sys.exit(1)
 
 
 # Get command line arguments
@@ -96,6 +115,10 @@ def simres_arguments():
     parser.add_argument('--arffile', help='Input Effective area file', type=str)
     parser.add_argument('--spofile', help='Output SPEX spectrum file (.spo, required)', type=str, required=True)
     parser.add_argument('--resfile', help='Output SPEX response file (.res, required)', type=str, required=True)
+    parser.add_argument('--incremental', help="Skip the conversion if the output files were created from the same "
+                                              "input files and options (stored as a fingerprint in the output "
+                                              "headers). Outdated output files are overwritten.",
+                        action="store_true", default=False)
     parser.add_argument('--keep-badchannels', help='Do not remove bad channels.', dest="badchan", action="store_false",
                         default=True)
     parser.add_argument('--overwrite', help="Overwrite existing spo and res files with same name.", action="store_true",
@@ -1,21 +1,38 @@
 #!/usr/bin/env python
 
+import io
 import os
 import sys
 import glob
 import argparse
+import contextlib
 import astropy.io.fits as fits
 import pyspextools
 import pyspextools.io
+import pyspextools.parallel as parallel
+import pyspextools.incremental as incremental
 from pyspextools.io.tg import TGRegion
+from pyspextools.io.pha2 import Pha2
+from pyspextools.io.catalog import ResponseCatalog
 from pyspextools.io.dataset import Dataset
 from pyspextools.data.badchannels import clean_region
+from pyspextools.data.components import prune_components
 
 import pyspextools.messages as message
 
+# Response file names for each grating
+grating_names = {'HETG': ['heg', 'meg'], 'LETG': ['leg']}
+
+# Command line options that change the output (used for the fingerprint in incremental mode)
+fingerprint_options = ['bkgsubtract', 'badchan', 'exprate', 'prune_orders', 'prune_index',
+                       'merge_orders']
+
 
 def main():
-    """Program to convert Chandra grating spectra to SPEX format."""
+    """Program to convert Chandra grating spectra to SPEX format. With the --batch option, the path is
+    searched for TGCAT and CIAO observation directories, which are all converted on a process pool. With the
+    --incremental option, observations are skipped if the output files were created from the same input files
+    and options."""
 
     # Obtain command line arguments
     parser = tg2spex_arguments()
@@ -42,183 +59,525 @@ def main():
         line = "{0} : {1}".format(arg, getattr(args, arg))
         history.append(line)
 
-    # Find out the origin of the observation (CIAO or TGCAT) and set filename mode.
+    # Build or update the response catalog
+    catalog = None
+    if args.catalog is not None:
+        catalog = update_catalog(args.catalog, path)
+        if not isinstance(catalog, ResponseCatalog):
+            sys.exit(1)
+
+    if args.batch:
+        observations = find_observations(path, args.input_prefix)
+        if len(observations) == 0:
+            message.error("No PHA2 files found in directory tree: {0}".format(path))
+            sys.exit(1)
+        print("Found {0} observations in: {1}".format(len(observations), path))
+        stat = run_observations(observations, args, history, catalog=catalog)
+    else:
+        (stat, info) = convert_observation(path, args, history, catalog=catalog)
+
+    if stat != 0:
+        sys.exit(1)
+
+
+# Find the PHA2 file in an observation directory
+def find_pha2(path, input_prefix):
+    """Find out the origin of the observation (CIAO or TGCAT) and the PHA2 file name. Returns a tuple with the
+    PHA2 file name, a flag that is True for TGCAT observations and the (detected) input prefix, or None if no
+    unique PHA2 file was found.
+
+    :param path: Path to the observation directory.
+    :type path: str
+    :param input_prefix: Input filename prefix (CIAO).
+    :type input_prefix: str
+    """
+
     print("Origin of the observation is: ", end='')
-    input_prefix = args.input_prefix
 
     # Check if default TGCAT filenames are there
     if os.path.isfile(path+"/pha2.gz"):
-        tgcat = True
-        phafile = path+"/pha2.gz"
         print("TGCAT")
+        return path+"/pha2.gz", True, input_prefix
     elif os.path.isfile(path+"/pha2"):
-        tgcat = True
-        phafile = path+"/pha2"
         print("TGCAT")
+        return path+"/pha2", True, input_prefix
+
     # If not, start detecting the CIAO type file names ('prefix'_pha2.fits)
-    else:
-        tgcat = False
-        print("CIAO")
-        # Check if the input prefix is specified.
-        if input_prefix != '':
-            # If input prefix is specified
-            if os.path.isfile(path+input_prefix+'pha2.fits'):
-                # Is the suggested file there? If yes, save the name and path, and cheer.
-                phafile = path+input_prefix+'pha2.fits'
-                print("Found PHA2 file at: {0}".format(phafile))
-            else:
-                # If the file is not there, suggest to change the flag.
-                message.error("Could not find file with name: {0}".format(path+input_prefix+'pha2.fits'))
-                print("Please change the '--input-prefix flag to a correct name.")
-                sys.exit()
+    print("CIAO")
+
+    # Check if the input prefix is specified.
+    if input_prefix != '':
+        # If input prefix is specified
+        phafile = os.path.join(path, input_prefix+'pha2.fits')
+        if os.path.isfile(phafile):
+            # Is the suggested file there? If yes, save the name and path, and cheer.
+            print("Found PHA2 file at: {0}".format(phafile))
+            return phafile, False, input_prefix
         else:
-            # If there is no prefix specified, do a detection
-            filelist = glob.glob(path+"/*pha2.fits")
-            if len(filelist) > 1:
-                # If there are more pha2 files, ask for a more detailed specification.
-                message.error("More than one pha2 files found. Please provide the input prefix through the "
-                              "'--input-prefix' flag.")
-                sys.exit()
-            elif len(filelist) == 1:
-                # If there is one pha2 file, this is probably the right one:
-                phafile = filelist[0]
-                print("Found PHA2 file at: {0}".format(phafile))
-                # Deduce input_prefix from
-                input_prefix = phafile.replace(path+"/", '')
-                input_prefix = input_prefix.replace('pha2.fits', '')
-                print("Autodetected input file prefix to be: {0}".format(input_prefix))
-            else:
-                # If there is no pha2 file, we are obviously looking in the wrong place.
-                message.error("No PHA2 file found at this path. Check your input.")
-                sys.exit()
-
-    # Read the data and header of the PHA2 file to get the origin right
-    (phadata, phaheader) = fits.getdata(phafile, 'SPECTRUM', header=True)
+            # If the file is not there, suggest to change the flag.
+            message.error("Could not find file with name: {0}".format(phafile))
+            print("Please change the '--input-prefix flag to a correct name.")
+            return None
+
+    # If there is no prefix specified, do a detection
+    filelist = glob.glob(path+"/*pha2.fits")
+    if len(filelist) > 1:
+        # If there are more pha2 files, ask for a more detailed specification.
+        message.error("More than one pha2 files found. Please provide the input prefix through the "
+                      "'--input-prefix' flag.")
+        return None
+    elif len(filelist) == 1:
+        # If there is one pha2 file, this is probably the right one:
+        phafile = filelist[0]
+        print("Found PHA2 file at: {0}".format(phafile))
+        # Deduce input_prefix from the file name
+        input_prefix = os.path.basename(phafile).replace('pha2.fits', '')
+        print("Autodetected input file prefix to be: {0}".format(input_prefix))
+        return phafile, False, input_prefix
+
+    # If there is no pha2 file, we are obviously looking in the wrong place.
+    message.error("No PHA2 file found at this path. Check your input.")
+    return None
+
+
+# Convert one observation
+def convert_observation(path, args, history, outdir='', workers=None, catalog=None):
+    """Convert the grating spectra of one observation to a spo and res file. Returns a tuple with the status
+    (0 if successful) and a dictionary with the PHA2 file, grating and output file names.
+
+    :param path: Path to the observation directory.
+    :type path: str
+    :param args: Command line arguments with the conversion options.
+    :type args: argparse.Namespace
+    :param history: History information for the output files.
+    :type history: list
+    :param outdir: Output directory for the spo and res files (default: current directory).
+    :type outdir: str
+    :param workers: Number of processes for the gratings and orders. For HETG, the HEG and MEG orders each get half
+        of the processes (default: number of CPUs).
+    :type workers: int
+    :param catalog: Catalog of the response files (optional).
+    :type catalog: pyspextools.io.ResponseCatalog
+    """
+
+    info = {'phafile': None, 'grating': None, 'spofile': None, 'resfile': None, 'skipped': False}
+
+    found = find_pha2(path, args.input_prefix)
+    if found is None:
+        return 1, info
+    (phafile, tgcat, input_prefix) = found
+    info['phafile'] = phafile
+
+    # In incremental mode, skip the conversion if the output files are up to date
+    fingerprint = None
+    if args.incremental:
+        grating = fits.getheader(phafile, 'SPECTRUM')['GRATING']
+        (spofile, resfile) = output_files(grating, args.output_prefix, outdir)
+        files = {'phafile': phafile}
+        for gname in grating_names.get(grating, []):
+            (rmflist, arflist) = glob_response_files(path, tgcat, input_prefix, gname, catalog=catalog)
+            for filename in rmflist + arflist:
+                files[os.path.basename(filename)] = filename
+        options = {name: getattr(args, name) for name in fingerprint_options}
+        digests = catalog.digests(files.values()) if catalog is not None else None
+        fingerprint = incremental.fingerprint(files, options, digests=digests)
+        if incremental.up_to_date([spofile, resfile], fingerprint):
+            print("Output files {0} and {1} are up to date.".format(spofile, resfile))
+            info.update({'grating': grating, 'spofile': spofile, 'resfile': resfile, 'skipped': True})
+            return 0, info
+
+    # Read the PHA2 file once. The spectra of all gratings are taken from this object.
+    message.proc_start("Read PHA2 file")
+    spec = Pha2()
+    stat = spec.read(phafile, background=args.bkgsubtract)
+    message.proc_end(stat)
+    if stat != 0:
+        message.error("Failed to read PHA2 file {0}.".format(phafile))
+        return 1, info
 
     # Detected instrument and gratings
     print("Autodetected mission and instruments:")
-    print("Mission:  {0}".format(phaheader['TELESCOP']))
-    print("Grating:  {0}".format(phaheader['GRATING']))
-    print("Detector: {0}".format(phaheader['INSTRUME']))
+    print("Mission:  {0}".format(spec.telescope))
+    print("Grating:  {0}".format(spec.grating))
+    print("Detector: {0}".format(spec.instrument))
+    info['grating'] = spec.grating
 
     # Do the conversion from PHA2 to SPEX format for each grating
     dataset = Dataset()
 
-    if phaheader['GRATING'] == 'HETG':
-        hetg = TGRegion()
-        metg = TGRegion()
-
-        # Obtain rmf and arf file list for hetg and metg
-        print("Start HETG file conversion:")
-        (heg_rmf_list, heg_arf_list) = search_response_files(path, tgcat, input_prefix, 'heg')
-        if len(heg_rmf_list) == 0:
-            message.error("HETG response list generation failed.")
-            sys.exit()
-        stat = hetg.read_region(phafile, heg_rmf_list, heg_arf_list, 'HETG', bkgsubtract=args.bkgsubtract)
-        if stat != 0:
-            message.error("HETG conversion failed")
-            sys.exit()
-
-        # Clean bad channels
-        if args.badchan:
-            print("Clean bad channels for HETG:")
-            hetg = clean_region(hetg)
-
-        dataset.append_region(hetg, 1, 1)
-
-        print("Start METG file conversion:")
-        (meg_rmf_list, meg_arf_list) = search_response_files(path, tgcat, input_prefix, 'meg')
-        if len(meg_rmf_list) == 0:
-            message.error("METG response list generation failed.")
-            sys.exit()
-        stat = metg.read_region(phafile, meg_rmf_list, meg_arf_list, 'METG', bkgsubtract=args.bkgsubtract)
-        if stat != 0:
-            message.error("METG conversion failed")
-            sys.exit()
-
-        # Clean bad channels
-
-        if args.badchan:
-            print("Clean bad channels for METG:")
-            metg = clean_region(metg)
-
-        dataset.append_region(metg, 1, 2)
-
-    elif phaheader['GRATING'] == 'LETG':
-
-        letg = TGRegion()
-
-        # Obtain rmf and arf file list for letg
-        print("Start LETG file conversion:")
-        (leg_rmf_list, leg_arf_list) = search_response_files(path, tgcat, input_prefix, 'leg')
-        if len(leg_rmf_list) == 0:
-            message.error("LETG response list generation failed.")
-            sys.exit()
-        stat = letg.read_region(phafile, leg_rmf_list, leg_arf_list, 'LETG', bkgsubtract=args.bkgsubtract)
-        if stat != 0:
+    if spec.grating == 'HETG':
+        # Convert HEG and MEG concurrently. The output of each conversion is printed when both are finished.
+        # Both gratings convert their orders on their own process pool, so each grating gets half of the
+        # workers. This keeps the total number of processes close to the number of workers.
+        total = workers if workers is not None else (os.cpu_count() or 1)
+        order_workers = max(1, total // 2)
+        tasks = [(run_grating, (spec, path, tgcat, input_prefix, 'heg', 'HETG', args, order_workers, catalog), {}),
+                 (run_grating, (spec, path, tgcat, input_prefix, 'meg', 'METG', args, order_workers, catalog), {})]
+        results = parallel.run_tasks(tasks, workers=min(2, total), processes=True)
+
+        for (result, grating) in zip(results, ['HETG', 'METG']):
+            if isinstance(result, Exception):
+                message.error("{0} conversion failed ({1}: {2})".format(grating, type(result).__name__, result))
+                return 1, info
+            (region, log) = result
+            print(log, end='')
+            if not isinstance(region, TGRegion):
+                message.error("{0} conversion failed".format(grating))
+                return 1, info
+
+        dataset.append_region(results[0][0], 1, 1)
+        dataset.append_region(results[1][0], 1, 2)
+
+    elif spec.grating == 'LETG':
+
+        letg = convert_grating(spec, path, tgcat, input_prefix, 'leg', 'LETG', args, workers=workers,
+                               catalog=catalog)
+        if not isinstance(letg, TGRegion):
             message.error("LETG conversion failed")
-            sys.exit()
-
-        # Clean bad channels
-        if args.badchan:
-            print("Clean bad channels for LETG:")
-            letg = clean_region(letg)
+            return 1, info
 
         dataset.append_region(letg, 1, 1)
 
     else:
         message.error("Grating name not recognized.")
-        sys.exit()
+        return 1, info
 
     # Set the file names for the res and spo file.
-    if args.output_prefix == '':
-        args.output_prefix = phaheader['GRATING']
-    spofile = args.output_prefix+'.spo'
-    resfile = args.output_prefix+'.res'
+    (info['spofile'], info['resfile']) = output_files(spec.grating, args.output_prefix, outdir)
+
+    # In incremental mode, the fingerprint is stored in the output files
+    if fingerprint is not None:
+        history = history + [incremental.history_line(fingerprint)]
 
     # Write regions to file
     message.proc_start("Write spectra and response to SPEX format")
-    stat = dataset.write_all_regions(spofile, resfile, exp_rate=args.exprate, overwrite=args.overwrite, history=history)
+    stat = dataset.write_all_regions(info['spofile'], info['resfile'], exp_rate=args.exprate,
+                                     overwrite=args.overwrite, history=history)
     message.proc_end(stat)
 
+    return stat, info
+
+
+# Output file names
+def output_files(grating, output_prefix, outdir=''):
+    """Return the spo and res file names for an observation. The file names start with the output prefix,
+    or with the grating name if no prefix is given.
+
+    :param grating: Grating name (HETG or LETG).
+    :type grating: str
+    :param output_prefix: Output filename prefix.
+    :type output_prefix: str
+    :param outdir: Output directory.
+    :type outdir: str
+    """
+
+    if output_prefix == '':
+        output_prefix = grating
+
+    return os.path.join(outdir, output_prefix+'.spo'), os.path.join(outdir, output_prefix+'.res')
+
+
+# Find the observations in a directory tree
+def find_observations(root, input_prefix=''):
+    """Walk through a directory tree and return a sorted list of the observation directories, which are the
+    directories containing a TGCAT (pha2 or pha2.gz) or CIAO (*pha2.fits) PHA2 file. The subdirectories of an
+    observation directory are not searched.
+
+    :param root: Root of the directory tree.
+    :type root: str
+    :param input_prefix: Input filename prefix (CIAO).
+    :type input_prefix: str
+    """
+
+    observations = []
+
+    for (dirpath, dirnames, filenames) in os.walk(root):
+        if 'pha2.gz' in filenames or 'pha2' in filenames:
+            found = True
+        elif input_prefix != '':
+            found = input_prefix + 'pha2.fits' in filenames
+        else:
+            found = len([name for name in filenames if name.endswith('pha2.fits')]) > 0
+
+        if found:
+            observations.append(dirpath)
+            dirnames[:] = []
+        else:
+            dirnames.sort()
+
+    return sorted(observations)
+
+
+def run_observation(path, outdir, args, history, catalog=None):
+    """Convert one observation in batch mode and return its status, timing and output. The output of the
+    conversion is captured, such that the output of observations converted in parallel does not get mixed up.
+    The gratings and orders of the observation are converted serially, because the observations already
+    run in parallel.
+
+    :param path: Path to the observation directory.
+    :type path: str
+    :param outdir: Output directory for the spo and res files.
+    :type outdir: str
+    :param args: Command line arguments with the conversion options.
+    :type args: argparse.Namespace
+    :param history: History information for the output files.
+    :type history: list
+    :param catalog: Catalog of the response files (optional).
+    :type catalog: pyspextools.io.ResponseCatalog
+    """
+
+    def convert():
+        """Create the output directory and convert the observation."""
+        os.makedirs(outdir, exist_ok=True)
+        return convert_observation(path, args, history + ["Observation directory: {0}".format(path)],
+                                   outdir=outdir, workers=1, catalog=catalog)
+
+    (value, error, runtime, log) = parallel.run_captured(convert)
+    (stat, info) = value if error is None else (1, observation_record(path))
+
+    result = {'path': path, 'phafile': info['phafile'], 'grating': info['grating'], 'spofile': info['spofile'],
+              'resfile': info['resfile'],
+              'status': 'failed' if stat != 0 else 'skipped' if info['skipped'] else 'ok',
+              'error': error, 'time': runtime, 'log': log}
+
+    return result
+
+
+def observation_record(path):
+    """Return the dictionary with the files of an observation that are not known yet, which starts its entry in
+    the summary file."""
+
+    return {'path': path, 'phafile': None, 'grating': None, 'spofile': None, 'resfile': None}
+
+
+def run_observations(observations, args, history, catalog=None):
+    """Convert a list of observation directories on a process pool and write a JSON status report.
+    Returns 0 if all observations were converted successfully.
+
+    :param observations: List of observation directories.
+    :type observations: list
+    :param args: Command line arguments with the conversion options.
+    :type args: argparse.Namespace
+    :param history: History information for the output files.
+    :type history: list
+    :param catalog: Catalog of the response files (optional).
+    :type catalog: pyspextools.io.ResponseCatalog
+    """
+
+    print("Number of parallel jobs: {0}".format(args.jobs))
+
+    # Output directories: the observation directory, or the same relative path in the output directory
+    outdirs = []
+    for path in observations:
+        if args.outdir is None:
+            outdirs.append(path)
+        else:
+            outdirs.append(os.path.normpath(os.path.join(args.outdir, os.path.relpath(path, args.path))))
+
+    def describe(result):
+        """Return the observation, grating and output file of a finished observation."""
+        return "{0} ({1}) -> {2}".format(result['path'], result['grating'], result['spofile'])
+
+    tasks = [(run_observation, (path, outdir, args, history, catalog), {})
+             for (path, outdir) in zip(observations, outdirs)]
+    records = [observation_record(path) for path in observations]
+    (results, walltime) = parallel.run_reported(tasks, observations, records, workers=args.jobs,
+                                                describe=describe)
+
+    summaryfile = args.summary
+    if summaryfile is None:
+        outdir = args.outdir if args.outdir is not None else args.path
+        summaryfile = os.path.join(outdir, 'tg2spex_summary.json')
+
+    header = {'path': args.path, 'observations': len(observations)}
+
+    return parallel.write_summary(summaryfile, header, results, args.jobs, walltime, name='observations')
+
+
+# Convert the spectrum and responses of one grating
+def convert_grating(spec, path, tgcat, prefix, gname, grating, args, workers=None, catalog=None):
+    """Convert the spectrum and responses for one grating to a TGRegion and clean the bad channels. Returns
+    the region or 1 if the conversion failed. gname can be 'heg', 'meg' or 'leg' and grating can be 'HETG',
+    'METG' or 'LETG'.
+
+    :param spec: PHA2 spectrum object.
+    :type spec: pyspextools.io.Pha2
+    :param path: Path to the observation directory.
+    :type path: str
+    :param tgcat: Is this a TGCAT observation directory?
+    :type tgcat: bool
+    :param prefix: Input filename prefix (CIAO).
+    :type prefix: str
+    :param gname: Grating name in the response file names.
+    :type gname: str
+    :param grating: Grating name.
+    :type grating: str
+    :param args: Command line arguments with the conversion options.
+    :type args: argparse.Namespace
+    :param workers: Number of processes to convert the orders with (default: number of orders and CPUs).
+    :type workers: int
+    :param catalog: Catalog of the response files (optional).
+    :type catalog: pyspextools.io.ResponseCatalog
+    """
+
+    print("Start {0} file conversion:".format(grating))
+    region = TGRegion()
+
+    # Obtain rmf and arf file list for the grating
+    (rmf_list, arf_list) = search_response_files(path, tgcat, prefix, gname, catalog=catalog)
+    if len(rmf_list) == 0:
+        message.error("{0} response list generation failed.".format(grating))
+        return 1
+
+    stat = region.read_region(spec, rmf_list, arf_list, grating, bkgsubtract=args.bkgsubtract, workers=workers,
+                              catalog=catalog)
+    if stat != 0:
+        return 1
+
+    # Merge orders into a single component
+    if args.merge_orders is not None:
+        message.proc_start("Merging {0} orders".format(grating))
+        stat = region.merge_orders(args.merge_orders)
+        message.proc_end(stat)
+        if stat != 0:
+            return 1
+        print("Orders: " + "  ".join([str(order) for order in region.orders]))
+
+    # Remove orders with a small contribution to the spectrum
+    if args.prune_orders is not None:
+        print("Prune orders for {0}:".format(grating))
+        region = prune_components(region, threshold=args.prune_orders, index=args.prune_index,
+                                  labels=region.orders)
+        if not isinstance(region, TGRegion):
+            message.error("Pruning the {0} orders failed.".format(grating))
+            return 1
+
+    # Clean bad channels
+    if args.badchan:
+        print("Clean bad channels for {0}:".format(grating))
+        region = clean_region(region)
+
+    return region
+
+
+def run_grating(spec, path, tgcat, prefix, gname, grating, args, workers=None, catalog=None):
+    """Run convert_grating and capture its output, such that the output of gratings that are converted
+    in parallel does not get mixed up. Returns a tuple with the result and the output."""
+
+    log = io.StringIO()
+    with contextlib.redirect_stdout(log):
+        region = convert_grating(spec, path, tgcat, prefix, gname, grating, args, workers=workers, catalog=catalog)
+
+    return region, log.getvalue()
+
 
 # Search RMF and ARF files for certain grating
-def search_response_files(path, tgcat, prefix, gname):
-    """Search the accompanying response file for a certain grating. gname can be 'heg', 'meg' or 'leg'."""
+def search_response_files(path, tgcat, prefix, gname, catalog=None):
+    """Search the accompanying response file for a certain grating. gname can be 'heg', 'meg' or 'leg'.
+    If a response catalog is given, the files are looked up in the catalog instead of the directory."""
 
-    if tgcat:
-        rmflist = glob.glob(path+'/'+gname+'*.rmf.gz')
-        arflist = glob.glob(path+'/'+gname+'*.arf.gz')
-    else:
-        rmflist = glob.glob(path+'/'+prefix+gname+'*.rmf')
-        arflist = glob.glob(path+'/'+prefix+gname+'*.arf')
-        if len(rmflist) <= 0 or len(arflist) <= 0:
-            rmflist = glob.glob(path+'/tg/'+prefix+gname+'*.rmf')
-            arflist = glob.glob(path+'/tg/'+prefix+gname+'*.arf')
+    (rmflist, arflist) = glob_response_files(path, tgcat, prefix, gname, catalog=catalog)
 
     if len(rmflist) <= 0 or len(arflist) <= 0:
         message.error("Could not find suitable rmf or arf files in path.")
         print("We suggest to run the 'mktgresp' task from CIAO to obtain all the responses.")
 
+    return rmflist, arflist
+
+
+def glob_response_files(path, tgcat, prefix, gname, catalog=None):
+    """Return the sorted lists of RMF and ARF files in an observation directory for a certain grating.
+    gname can be 'heg', 'meg' or 'leg'. If a response catalog is given, the files are looked up in the
+    catalog instead of the directory."""
+
+    def find(directory, pattern):
+        """Return the files matching a pattern in a directory."""
+        if catalog is not None:
+            return catalog.query(directory=directory, pattern=pattern)
+        return glob.glob(directory+'/'+pattern)
+
+    if tgcat:
+        rmflist = find(path, gname+'*.rmf.gz')
+        arflist = find(path, gname+'*.arf.gz')
+    else:
+        rmflist = find(path, prefix+gname+'*.rmf')
+        arflist = find(path, prefix+gname+'*.arf')
+        if len(rmflist) <= 0 or len(arflist) <= 0:
+            rmflist = find(path+'/tg', prefix+gname+'*.rmf')
+            arflist = find(path+'/tg', prefix+gname+'*.arf')
+
     rmflist.sort()
     arflist.sort()
 
     return rmflist, arflist
 
 
+# Build or update the response catalog
+def update_catalog(catalogfile, path):
+    """Read the response catalog file if it exists, add the new and changed response files below the path
+    and write the catalog file. Returns the catalog or 1 if the catalog file cannot be read.
+
+    :param catalogfile: Name of the catalog file (JSON).
+    :type catalogfile: str
+    :param path: Directory tree with response files.
+    :type path: str
+    """
+
+    catalog = ResponseCatalog()
+    if os.path.isfile(catalogfile):
+        if catalog.read(catalogfile) != 0:
+            return 1
+
+    message.proc_start("Update response catalog")
+    nread = catalog.scan(path)
+    catalog.write(catalogfile)
+    message.proc_end(0)
+    print("Response catalog {0} contains {1} files ({2} new or changed).".format(catalogfile,
+                                                                                  len(catalog.entries), nread))
+
+    return catalog
+
+
 # Get command line arguments
 def tg2spex_arguments():
     """Obtain command line arguments."""
     parser = argparse.ArgumentParser(description=message.docs)
-    parser.add_argument('path', help="Path to the observation directory where the pha2, arfs and rmfs are.")
+    parser.add_argument('path', help="Path to the observation directory where the pha2, arfs and rmfs are "
+                                     "(with --batch: the root of a tree of observation directories).")
+    parser.add_argument('--batch', help="Convert all TGCAT and CIAO observations found in the directory tree.",
+                        action="store_true", default=False)
+    parser.add_argument('--outdir', help="Output directory for batch mode. The spo and res files are written to the "
+                                         "same relative path as the observation (default: observation directory).",
+                        type=str)
+    parser.add_argument('--jobs', help="Number of observations to convert in parallel in batch mode (default: 1).",
+                        type=int, default=1)
+    parser.add_argument('--summary', help="Output JSON status report for batch mode "
+                                          "(default: tg2spex_summary.json in the output or root directory).", type=str)
     parser.add_argument('--input-prefix', help="Input filename prefix (example: 'hrcf04149_repro_').",
                         dest="input_prefix", default='')
     parser.add_argument('--output-prefix', help="Output filename prefix (names the output to 'prefix'leg.spo/res",
                         dest="output_prefix", default='')
     parser.add_argument('--no-bkgsubtract', help="Substract the background spectrum.", dest="bkgsubtract",
                         action="store_false", default=True)
+    parser.add_argument('--catalog', help="Response catalog file (JSON). The response files below the path are "
+                                          "indexed from their headers and looked up in the catalog. The catalog is "
+                                          "created if it does not exist and updated with new and changed files.",
+                        type=str)
+    parser.add_argument('--incremental', help="Skip observations of which the output files were created from the "
+                                              "same input files and options (stored as a fingerprint in the output "
+                                              "headers).", action="store_true", default=False)
     parser.add_argument('--keep-badchannels', help='Do not remove bad channels.', dest="badchan", action="store_false",
                         default=True)
+    parser.add_argument('--prune-orders', help="Remove grating orders that contribute less than this fraction of "
+                                               "the counts for a reference power-law spectrum (example: 1e-3).",
+                        type=float, default=None)
+    parser.add_argument('--prune-index', help="Photon index of the reference power-law spectrum for "
+                                              "--prune-orders (default: 2, use 0 for a flat spectrum).",
+                        type=float, default=2.0)
+    parser.add_argument('--merge-orders', help="Merge the responses of the given grating orders into a single "
+                                               "component with the summed response (example: --merge-orders -1 1). "
+                                               "Without orders, all orders are merged.",
+                        type=int, nargs='*', default=None)
     parser.add_argument('--overwrite', help="Overwrite existing spo and res files with same name.", action="store_true",
                         default=True)
     parser.add_argument('--no-exprate', help="Do not write additional Exp_Rate column (SPEX <=3.04.00).",
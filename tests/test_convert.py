@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+
+import copy
+import numpy as np
+import astropy.io.fits as fits
+
+from pyspextools.io.rmf import Rmf
+from pyspextools.io.convert import rmfs_to_res
+from pyspextools.io.ogip import OGIPRegion, ResponseCache
+from pyspextools.data import clean_region
+
+
+def write_ogip(path, nchan=50, nen=60, width=5):
+    """Write a small PHA, RMF and ARF set with bad channels at the start of the spectrum."""
+
+    channel = np.arange(nchan) + 1
+    echan = np.linspace(0.3, 10., nchan + 1)
+    energy = np.linspace(0.25, 10.2, nen + 1)
+
+    ebounds = fits.BinTableHDU.from_columns([
+        fits.Column('CHANNEL', 'J', array=channel),
+        fits.Column('E_MIN', 'E', array=echan[:-1], unit='keV'),
+        fits.Column('E_MAX', 'E', array=echan[1:], unit='keV')], name='EBOUNDS')
+
+    centre = np.clip(np.searchsorted(echan, (energy[:-1] + energy[1:]) / 2.) - 1, 0, nchan - 1)
+    first = np.clip(centre - width // 2, 0, nchan - width)
+    matrix = [np.exp(-0.5 * ((np.arange(width) + first[i] - centre[i]) / 1.5) ** 2) * 0.2 for i in range(nen)]
+    hdu = fits.BinTableHDU.from_columns([
+        fits.Column('ENERG_LO', 'E', array=energy[:-1], unit='keV'),
+        fits.Column('ENERG_HI', 'E', array=energy[1:], unit='keV'),
+        fits.Column('N_GRP', 'I', array=np.ones(nen, dtype=int)),
+        fits.Column('F_CHAN', 'J', array=first + 1),
+        fits.Column('N_CHAN', 'J', array=np.full(nen, width)),
+        fits.Column('MATRIX', 'PE()', array=np.array(matrix, dtype=object))], name='MATRIX')
+    hdu.header['TLMIN4'] = 1
+    rmffile = str(path / 'src.rmf')
+    fits.HDUList([fits.PrimaryHDU(), hdu, ebounds]).writeto(rmffile)
+
+    hdu = fits.BinTableHDU.from_columns([
+        fits.Column('ENERG_LO', 'E', array=energy[:-1], unit='keV'),
+        fits.Column('ENERG_HI', 'E', array=energy[1:], unit='keV'),
+        fits.Column('SPECRESP', 'E', array=np.full(nen, 100.), unit='cm**2')], name='SPECRESP')
+    arffile = str(path / 'src.arf')
+    fits.HDUList([fits.PrimaryHDU(), hdu]).writeto(arffile)
+
+    quality = np.zeros(nchan, dtype=int)
+    quality[:10] = 1
+    hdu = fits.BinTableHDU.from_columns([
+        fits.Column('CHANNEL', 'J', array=channel),
+        fits.Column('COUNTS', 'J', array=np.full(nchan, 10)),
+        fits.Column('QUALITY', 'I', array=quality),
+        fits.Column('GROUPING', 'I', array=np.ones(nchan, dtype=int))], name='SPECTRUM')
+    for (key, value) in dict(DETCHANS=nchan, EXPOSURE=1000., POISSERR=True, CORRSCAL=1.0, BACKSCAL=1.0,
+                             AREASCAL=1.0, HDUCLASS='OGIP', HDUCLAS1='SPECTRUM', HDUCLAS2='TOTAL',
+                             HDUCLAS3='COUNT').items():
+        hdu.header[key] = value
+    phafile = str(path / 'src.pha')
+    fits.HDUList([fits.PrimaryHDU(), hdu]).writeto(phafile)
+
+    return phafile, rmffile, arffile
+
+
+def test_cached_rmf_unchanged_by_clean_region(tmp_path):
+    """Cleaning a converted region must not change a cached Rmf, which is shared with later conversions."""
+
+    (phafile, rmffile, arffile) = write_ogip(tmp_path)
+    cache = ResponseCache()
+
+    rmf = cache.rmf(rmffile)
+    ic1 = rmf.matrix[0].FirstChannelGroup.copy()
+    nc = rmf.matrix[0].NumberChannelsGroup.copy()
+
+    regions = []
+    for i in range(2):
+        region = OGIPRegion()
+        assert region.read_region(phafile, rmffile, arffile=arffile, cache=cache) == 0
+        regions.append(clean_region(region, verbose=False))
+
+    assert np.array_equal(rmf.matrix[0].FirstChannelGroup, ic1)
+    assert np.array_equal(rmf.matrix[0].NumberChannelsGroup, nc)
+    assert np.array_equal(regions[0].res.ic1, regions[1].res.ic1)
+    assert np.array_equal(regions[0].spo.echan1, regions[1].spo.echan1)
+
+
+def test_rmfs_to_res_failed_extension(tmp_path):
+    """A matrix extension that fails to convert makes rmfs_to_res return 1 instead of raising."""
+
+    (phafile, rmffile, arffile) = write_ogip(tmp_path)
+    rmf = Rmf()
+    assert rmf.read(rmffile) == 0
+
+    # An extension with an inconsistent total number of groups cannot be converted (rmf_to_res returns 0)
+    bad = copy.deepcopy(rmf)
+    bad.matrix[0].NumberTotalGroups = bad.matrix[0].NumberTotalGroups + 1
+
+    jobs = [(rmf, 0, None), (bad, 0, None)]
+    assert rmfs_to_res(jobs, workers=1) == 1